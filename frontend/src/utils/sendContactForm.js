@@ -1,3 +1,5 @@
+import i18n from "../i18n/i18n";
+
 export async function sendContactForm({
   formData,
   executeRecaptcha,
@@ -16,6 +18,7 @@ export async function sendContactForm({
       ...formData,
       _hp: "", // honeypot obligatorio
       recaptchaToken,
+      locale: i18n.resolvedLanguage || i18n.language, // idioma del correo de confirmación
     };
 
     // 3) POST al API Gateway
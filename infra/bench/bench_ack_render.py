@@ -0,0 +1,65 @@
+"""
+Micro-benchmark del ack al cliente: costo de armar el mensaje por request.
+
+  before: lo que hacía _send_customer_ack_via_zoho antes (f-string de la plantilla +
+          EmailMessage nuevo con ambas alternativas + serialización en send_message).
+  after:  ack_renderer.AckRenderer (plantillas compiladas + cuerpo MIME cacheado).
+
+Uso:
+  python infra/bench/bench_ack_render.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from email.message import EmailMessage
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "terraform", "modules", "contact-form-lambda", "src")
+sys.path.insert(0, os.path.abspath(SRC))
+
+import ack_renderer  # noqa: E402
+
+FROM_NAME, FROM_EMAIL, TO_EMAIL = "Orbit Studio", "admin@orbit.com.mx", "cliente@example.com"
+
+
+def _legacy_build(html_source: str) -> bytes:
+    # Equivalente al f-string de ~200 líneas: se vuelve a construir el str completo por request
+    html = f"""{html_source}"""
+    msg = EmailMessage()
+    msg["Subject"] = "¡Gracias por contactarnos!"
+    msg["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
+    msg["To"] = TO_EMAIL
+    msg.set_content("Tu cliente no soporta HTML.")
+    msg.add_alternative(html, subtype="html")
+    return msg.as_bytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(os.path.join(ack_renderer.TEMPLATE_DIR, "es.html"), encoding="utf-8") as f:
+        html_source = f.read().replace("{{year}}", "2025")
+
+    renderer = ack_renderer.AckRenderer()
+    renderer.render("es", FROM_NAME, FROM_EMAIL, TO_EMAIL)  # calienta la caché como en un contenedor warm
+
+    n = args.iterations
+    before = timeit.timeit(lambda: _legacy_build(html_source), number=n) / n
+    after = timeit.timeit(lambda: renderer.render("es", FROM_NAME, FROM_EMAIL, TO_EMAIL), number=n) / n
+    cold = timeit.timeit(lambda: ack_renderer.AckRenderer().render("es", FROM_NAME, FROM_EMAIL, TO_EMAIL),
+                         number=max(1, n // 20)) / max(1, n // 20)
+
+    print(json.dumps({
+        "iterations": n,
+        "before_us": round(before * 1e6, 2),
+        "after_us": round(after * 1e6, 2),
+        "after_cold_container_us": round(cold * 1e6, 2),
+        "speedup": round(before / after, 1) if after else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Harness de circuit breakers: inyecta fallas y lentitud en los stand-ins locales y
+verifica que contact-form falle rápido mientras la dependencia está caída y se
+recupere (half-open -> closed) cuando vuelve.
+
+Escenarios (uno por dependencia, cada uno con fases healthy -> degraded -> recovered):
+  recaptcha_outage, recaptcha_slow, dispatcher_outage, ses_outage (transporte inprocess),
+  smtp_outage.
+
+Por fase reporta latencia p50/max, códigos de estado, llamadas que sí salieron a la
+dependencia y el estado del breaker; las transiciones salen de los logs. Exit 1 si
+algún escenario no abre el circuito durante la falla o no lo cierra al recuperarse.
+
+Uso:
+  python infra/bench/bench_breakers.py [--requests 12] [--scenario smtp_outage] [--no-breakers]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+CONTACT_SRC = os.path.join(MODULES, "contact-form-lambda", "src")
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+
+# Ventana y apertura cortas para que el harness corra en segundos
+WINDOW_SECONDS = 1.0
+OPEN_SECONDS = 1.0
+SLOW_CALL_MS = 150
+
+# escenario -> (breaker, stand-in afectado, falla inyectada, transporte)
+SCENARIOS = {
+    "recaptcha_outage": ("recaptcha", "recaptcha", {"failure_rate": 1.0}, "invoke"),
+    "recaptcha_slow": ("recaptcha", "recaptcha", {"latency_ms": SLOW_CALL_MS * 2}, "invoke"),
+    "dispatcher_outage": ("email_dispatcher", "invoke", {"failure_rate": 1.0}, "invoke"),
+    "ses_outage": ("ses", "ses", {"failure_rate": 1.0}, "inprocess"),
+    "smtp_outage": ("zoho_smtp", "smtp_send", {"failure_rate": 1.0}, "invoke"),
+}
+
+
+def _env(siteverify_url: str, breakers: bool) -> dict:
+    return {
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "RECAPTCHA_SECRET": "bench-secret",
+        "RECAPTCHA_VERIFY_URL": siteverify_url,
+        "EMAIL_DISPATCHER_FUNCTION_NAME": "bench-email-dispatcher",
+        "ZOHO_SMTP_HOST": "smtp.bench.local",
+        "ZOHO_SMTP_PORT": "465",
+        "ZOHO_SMTP_USER": "bench@orbit.com.mx",
+        "ZOHO_SMTP_PASS": "bench-pass",
+        "FROM_EMAIL": "no-reply@orbit.com.mx",
+        "SES_FROM_EMAIL": "no-reply@orbit.com.mx",
+        "VENDOR_EMAIL": "vendor@orbit.com.mx",
+        "RATE_LIMIT_IP_PER_MINUTE": "0",
+        "RATE_LIMIT_GLOBAL_PER_SECOND": "0",
+        "CIRCUIT_BREAKER_ENABLED": "true" if breakers else "false",
+        "CIRCUIT_MIN_CALLS": "4",
+        "CIRCUIT_WINDOW_SECONDS": str(WINDOW_SECONDS),
+        "CIRCUIT_OPEN_SECONDS": str(OPEN_SECONDS),
+        "RECAPTCHA_SLOW_CALL_MS": str(SLOW_CALL_MS),
+        "DISPATCHER_SLOW_CALL_MS": str(SLOW_CALL_MS),
+        "SMTP_SLOW_CALL_MS": str(SLOW_CALL_MS),
+        "SES_SLOW_CALL_MS": str(SLOW_CALL_MS),
+    }
+
+
+def _event(i: int) -> dict:
+    body = {"name": f"Bench {i}", "email": f"bench{i}@example.com", "phone": "5555555555",
+            "projectType": "web", "message": f"Mensaje de prueba {i} {time.time_ns()}", "_hp": "",
+            "recaptchaToken": f"breaker-token-{i}-{time.time_ns()}", "locale": "es"}
+    return {"version": "2.0", "requestContext": {"http": {"method": "POST", "sourceIp": "198.51.100.7"}},
+            "body": json.dumps(body), "isBase64Encoded": False}
+
+
+class _Counting:
+    """Envuelve un método de un stand-in para contar las llamadas que sí salieron."""
+
+    def __init__(self, obj, method: str):
+        self.calls = 0
+        original = getattr(obj, method)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return original(*args, **kwargs)
+
+        setattr(obj, method, counted)
+
+
+def run_scenario(name: str, requests: int, contact, standins, behaviors: dict) -> dict:
+    from orbit_shared import circuit_breaker
+
+    breaker_name, target, fault, transport = SCENARIOS[name]
+    contact.DISPATCH_TRANSPORT = transport
+    circuit_breaker.reset()
+    behavior = behaviors[target]
+    counters = {
+        "recaptcha": None,
+        "invoke": _Counting(contact.lambda_client, "invoke"),
+        "ses": _Counting(contact.ses_client, "send_email"),
+        "smtp_send": None,
+    }
+
+    phases = []
+    for phase in ("healthy", "degraded", "recovered"):
+        if phase == "degraded":
+            # Dejar que la ventana móvil olvide las llamadas sanas antes de inyectar la falla
+            time.sleep(WINDOW_SECONDS + 0.1)
+            for k, v in fault.items():
+                setattr(behavior, k, v)
+        elif phase == "recovered":
+            behavior.failure_rate, behavior.latency_ms = 0.0, 0.0
+            time.sleep(OPEN_SECONDS + 0.1)
+        counter = counters.get(target)
+        before = counter.calls if counter else None
+
+        latencies, statuses, log = [], Counter(), io.StringIO()
+        with contextlib.redirect_stdout(log):
+            for i in range(requests):
+                t0 = time.perf_counter()
+                resp = contact.handler(_event(i), standins.FakeContext())
+                latencies.append((time.perf_counter() - t0) * 1000)
+                statuses[str(resp["statusCode"])] += 1
+
+        transitions = [json.loads(line.split(" ", 1)[1]) for line in log.getvalue().splitlines()
+                       if line.startswith("circuit_breaker ")]
+        breaker = circuit_breaker.get(breaker_name)
+        phases.append({
+            "phase": phase,
+            "p50_ms": round(statistics.median(latencies), 2),
+            "max_ms": round(max(latencies), 2),
+            "status_codes": dict(statuses),
+            "dependency_calls": (counter.calls - before) if counter else None,
+            "breaker_state": breaker.state,
+            "transitions": [f"{t['from']}->{t['to']} ({t['reason']})" for t in transitions
+                            if t["name"] == breaker_name],
+        })
+
+    snapshot = circuit_breaker.get(breaker_name).snapshot()
+    degraded, recovered = phases[1], phases[2]
+    checks = {
+        "opened_during_failure": snapshot["opened"] >= 1,
+        "failed_fast_while_open": snapshot["rejected"] >= 1,
+        "closed_after_recovery": recovered["breaker_state"] == "closed",
+    }
+    return {"scenario": name, "breaker": breaker_name, "fault": fault, "transport": transport,
+            "phases": phases, "snapshot": snapshot, "checks": checks,
+            "passed": all(checks.values()), "degraded_p50_ms": degraded["p50_ms"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=12, help="requests por fase")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="escenario a correr (repetible; default: todos)")
+    parser.add_argument("--no-breakers", action="store_true",
+                        help="correr con CIRCUIT_BREAKER_ENABLED=false (línea base, sin checks)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, CONTACT_SRC)
+    sys.path.append(LAYER_PYTHON)
+    import standins
+
+    behaviors = {k: standins.Behavior(seed=1) for k in ("recaptcha", "invoke", "ses", "smtp_connect", "smtp_send")}
+    with standins.SiteverifyServer(behaviors["recaptcha"]) as sv:
+        os.environ.update(_env(sv.url, breakers=not args.no_breakers))
+        import index as contact
+        import smtp_session
+
+        contact.ses_client = standins.FakeSesClient(behaviors["ses"])
+        contact.lambda_client = standins.FakeLambdaClient(behaviors["invoke"], lambda event, ctx: {"ok": True})
+        standins.FakeSMTP.connect_behavior = behaviors["smtp_connect"]
+        standins.FakeSMTP.send_behavior = behaviors["smtp_send"]
+        env = os.environ
+        smtp_session._session = smtp_session.SmtpSessionManager(
+            env["ZOHO_SMTP_HOST"], int(env["ZOHO_SMTP_PORT"]), env["ZOHO_SMTP_USER"], env["ZOHO_SMTP_PASS"],
+            factory=standins.FakeSMTP,
+        )
+
+        results = [run_scenario(name, args.requests, contact, standins, behaviors)
+                   for name in (args.scenario or SCENARIOS)]
+
+    report = {"breakers_enabled": not args.no_breakers, "requests_per_phase": args.requests,
+              "window_seconds": WINDOW_SECONDS, "open_seconds": OPEN_SECONDS, "slow_call_ms": SLOW_CALL_MS, "scenarios": results}
+    print(json.dumps(report, indent=2))
+    if not args.no_breakers and not all(r["passed"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
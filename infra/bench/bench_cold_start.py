@@ -0,0 +1,116 @@
+"""
+Benchmark de cold start de ambas Lambdas (import del módulo + primera invocación).
+
+Cada muestra corre en un proceso nuevo con `python -B` sobre una copia limpia del código,
+igual que en Lambda (/var/task es de solo lectura: sin .pyc precompilados, el runtime
+compila las fuentes en cada cold start). Con --bytecode la copia se arma con
+infra/scripts/build_lambda.py --precompile, como el empaquetado precompile_bytecode.
+
+Eventos de la primera invocación (no salen a la red):
+  - contact-form:     honeypot lleno -> 400 antes de reCAPTCHA
+  - email-dispatcher: preflight OPTIONS -> 200
+
+Falla (exit 1) si la mediana supera el presupuesto configurado.
+
+Uso:
+  python infra/bench/bench_cold_start.py [--samples 15] [--bytecode]
+      [--import-budget-ms 150] [--first-invoke-budget-ms 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = os.path.join(ROOT, "terraform", "modules")
+# Capa compartida (en Lambda queda montada en /opt/python)
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import build_lambda  # noqa: E402
+
+TARGETS = {
+    "contact-form": {
+        "src": os.path.join(MODULES, "contact-form-lambda", "src"),
+        "handler": "handler",
+        "event": {"body": json.dumps({"name": "x", "email": "x@example.com", "phone": "5555555555",
+                                      "projectType": "web", "message": "x", "_hp": "bot",
+                                      "recaptchaToken": "x"})},
+    },
+    "email-dispatcher": {
+        "src": os.path.join(MODULES, "email-dispatcher-lambda", "src"),
+        "handler": "lambda_handler",
+        "event": {"requestContext": {"http": {"method": "OPTIONS"}}, "body": None},
+    },
+}
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import index
+t1 = time.perf_counter()
+getattr(index, sys.argv[1])(json.loads(sys.argv[2]), None)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_invoke_ms": (t2 - t1) * 1000}))
+"""
+
+
+def _sample(code_dir: str, handler: str, event: dict) -> dict:
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+               PYTHONPATH=LAYER_PYTHON)
+    out = subprocess.run(
+        [sys.executable, "-B", "-c", _CHILD, handler, json.dumps(event)],
+        cwd=code_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _summary(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "median_ms": round(statistics.median(values), 2),
+        "p90_ms": round(values[min(len(values) - 1, int(len(values) * 0.9))], 2),
+        "min_ms": round(values[0], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=15)
+    parser.add_argument("--bytecode", action="store_true", help="medir con .pyc precompilados")
+    parser.add_argument("--import-budget-ms", type=float,
+                        default=float(os.getenv("COLD_START_IMPORT_BUDGET_MS", "150")))
+    parser.add_argument("--first-invoke-budget-ms", type=float,
+                        default=float(os.getenv("COLD_START_FIRST_INVOKE_BUDGET_MS", "50")))
+    args = parser.parse_args()
+
+    runtime = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    report = {"python": runtime, "bytecode": args.bytecode, "samples": args.samples,
+              "budget": {"import_ms": args.import_budget_ms, "first_invoke_ms": args.first_invoke_budget_ms},
+              "targets": {}}
+    over_budget = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, target in TARGETS.items():
+            code_dir = os.path.join(tmp, name)
+            build_lambda.build(target["src"], code_dir, precompile=args.bytecode, runtime=runtime)
+            samples = [_sample(code_dir, target["handler"], target["event"]) for _ in range(args.samples)]
+            imp = _summary([s["import_ms"] for s in samples])
+            first = _summary([s["first_invoke_ms"] for s in samples])
+            report["targets"][name] = {"import": imp, "first_invoke": first}
+            if imp["median_ms"] > args.import_budget_ms:
+                over_budget.append(f"{name}: import {imp['median_ms']} ms > {args.import_budget_ms} ms")
+            if first["median_ms"] > args.first_invoke_budget_ms:
+                over_budget.append(f"{name}: first invoke {first['median_ms']} ms > {args.first_invoke_budget_ms} ms")
+
+    report["over_budget"] = over_budget
+    print(json.dumps(report, indent=2))
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
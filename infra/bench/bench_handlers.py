@@ -0,0 +1,387 @@
+"""
+Benchmark local end-to-end de latencia y throughput de ambas Lambdas.
+
+Genera eventos HTTP API v2 (plain, base64, malformed, preflight, oversized, invalid) y los corre contra
+`handler` (contact-form) y `lambda_handler` (email-dispatcher). Cada "contenedor"
+simulado es un proceso aparte (estado de módulo propio, como en Lambda) que atiende
+un evento a la vez; los contenedores corren en paralelo.
+
+Las dependencias externas se reemplazan por stand-ins (infra/bench/standins.py):
+Google siteverify (servidor HTTP local), Lambda invoke (en proceso contra el
+dispatcher), SES y Zoho SMTP, cada uno con latencia/tasa de fallas configurable.
+
+Reporta p50/p95/p99, throughput total y por contenedor, y tiempo por etapa.
+El resultado se escribe en JSON (con el commit actual) para comparar corridas.
+
+Uso:
+  python infra/bench/bench_handlers.py --requests 400 --containers 4 \\
+      --recaptcha latency=80,jitter=20 --invoke latency=25 --ses latency=40,fail=0.01 \\
+      --smtp-connect latency=300 --smtp-send latency=120 --transport inprocess \\
+      --output bench_output.json [--compare previous.json]
+"""
+import argparse
+import base64
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+CONTACT_SRC = os.path.join(MODULES, "contact-form-lambda", "src")
+DISPATCHER_SRC = os.path.join(MODULES, "email-dispatcher-lambda", "src")
+# Capa compartida (en Lambda queda montada en /opt/python)
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+
+# Funciones envueltas para medir tiempo por etapa (se buscan en el módulo al llamar)
+CONTACT_STAGES = ["_parse_event_body", "verify_recaptcha", "_fan_out_sends",
+                  "_dispatch_vendor_email", "_invoke_email_dispatcher", "_send_customer_ack_via_zoho"]
+DISPATCHER_STAGES = ["_normalize_event_to_data", "_send_templated_email", "_send_batch"]
+
+DEFAULT_MIX = "plain=70,base64=10,malformed=10,preflight=10"
+
+
+# -----------------------------
+# Generación de eventos
+# -----------------------------
+def _submission(i: int) -> dict:
+    return {
+        "name": f"Bench {i}",
+        "email": f"bench{i}@example.com",
+        "phone": "+52 55 0000 0000",
+        "projectType": random.choice(["web", "aws", "software"]),
+        "message": "Hola, quiero cotizar un proyecto. " * random.randint(1, 8),
+        "_hp": "",
+        "recaptchaToken": f"bench-token-{i}-{random.getrandbits(64):x}",
+        "locale": random.choice(["es", "en"]),
+    }
+
+
+def _http_event(kind: str, body: dict | None, source_ip: str) -> dict:
+    event = {
+        "version": "2.0",
+        "routeKey": "POST /contact",
+        "rawPath": "/contact",
+        "headers": {"content-type": "application/json", "accept-language": "es-MX,es;q=0.9"},
+        "requestContext": {"http": {"method": "POST", "path": "/contact", "sourceIp": source_ip}},
+        "isBase64Encoded": False,
+    }
+    raw = json.dumps(body) if body is not None else None
+    if kind == "base64":
+        event["body"] = base64.b64encode(raw.encode("utf-8")).decode("ascii")
+        event["isBase64Encoded"] = True
+    elif kind == "malformed":
+        event["body"] = raw[: len(raw) // 2]
+    elif kind == "oversized":
+        event["body"] = json.dumps({**body, "message": "x" * 256 * 1024})
+    elif kind == "invalid":
+        event["body"] = json.dumps({**body, "email": "not-an-email", "phone": 5550000000})
+    elif kind == "preflight":
+        event["requestContext"]["http"]["method"] = "OPTIONS"
+        event["body"] = None
+    else:
+        event["body"] = raw
+    return event
+
+
+def generate_events(n: int, mix: dict[str, float], seed: int) -> list[tuple[str, str, dict]]:
+    """Lista de (handler, kind, event) mezclando contact-form y dispatcher."""
+    random.seed(seed)
+    kinds, weights = zip(*mix.items())
+    events = []
+    for i in range(n):
+        kind = random.choices(kinds, weights)[0]
+        ip = f"203.0.113.{i % 250 + 1}"
+        sub = _submission(i)
+        if i % 2 == 0:
+            events.append(("contact-form", kind, _http_event(kind, sub, ip)))
+        else:
+            vendor = {"template": "VendorNotifyTemplate",
+                      **{k: sub[k] for k in ("name", "email", "phone", "projectType", "message")}}
+            events.append(("email-dispatcher", kind, _http_event(kind, vendor, ip)))
+    return events
+
+
+# -----------------------------
+# Contenedor simulado (proceso hijo)
+# -----------------------------
+_container = {}
+
+
+def _load(name: str, path: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _wrap_stages(module, names: list[str], prefix: str, sink: list, lock: threading.Lock):
+    for name in names:
+        fn = getattr(module, name, None)
+        if fn is None:
+            continue
+
+        def timed(*args, __fn=fn, __stage=f"{prefix}.{name}", **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return __fn(*args, **kwargs)
+            finally:
+                with lock:
+                    sink.append((__stage, (time.perf_counter() - t0) * 1000))
+
+        setattr(module, name, timed)
+
+
+def _init_container(cfg: dict):
+    os.environ.update(cfg["env"])
+    if not cfg["show_logs"]:
+        # Los print() de los handlers se siguen ejecutando, pero no ensucian el reporte
+        sys.stdout = open(os.devnull, "w")
+    # Otro árbol de módulos (bench_replay: una versión extraída con git archive)
+    modules = cfg.get("modules") or MODULES
+    contact_src = os.path.join(modules, "contact-form-lambda", "src")
+    dispatcher_src = os.path.join(modules, "email-dispatcher-lambda", "src")
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, contact_src)
+    # Módulos propios del dispatcher (vendor_digest); su index se carga por ruta
+    sys.path.append(dispatcher_src)
+    sys.path.append(os.path.join(modules, "lambda-shared-layer", "layer", "python"))
+    import standins
+
+    dispatcher = _load("dispatcher_index", os.path.join(dispatcher_src, "index.py"))
+    contact = _load("index", os.path.join(contact_src, "index.py"))
+
+    b = {k: standins.Behavior(**v, seed=os.getpid()) for k, v in cfg["behaviors"].items()}
+    dispatcher.ses = standins.FakeSesClient(b["ses"])
+    contact.ses_client = standins.FakeSesClient(b["ses"])
+    contact.lambda_client = standins.FakeLambdaClient(b["invoke"], dispatcher.lambda_handler)
+    standins.FakeSMTP.connect_behavior = b["smtp_connect"]
+    standins.FakeSMTP.send_behavior = b["smtp_send"]
+
+    import smtp_session
+    env = cfg["env"]
+    smtp_session._session = smtp_session.SmtpSessionManager(
+        env["ZOHO_SMTP_HOST"], int(env["ZOHO_SMTP_PORT"]), env["ZOHO_SMTP_USER"], env["ZOHO_SMTP_PASS"],
+        factory=standins.FakeSMTP,
+    )
+
+    sink, lock = [], threading.Lock()
+    _wrap_stages(contact, CONTACT_STAGES, "contact", sink, lock)
+    _wrap_stages(dispatcher, DISPATCHER_STAGES, "dispatcher", sink, lock)
+    _container.update(contact=contact, dispatcher=dispatcher, sink=sink, lock=lock, standins=standins,
+                      lambda_timeout_ms=cfg["lambda_timeout_ms"])
+
+
+def _run_one(item: tuple[str, str, dict]) -> dict:
+    target, kind, event = item
+    c = _container
+    handler = c["contact"].handler if target == "contact-form" else c["dispatcher"].lambda_handler
+    with c["lock"]:
+        c["sink"].clear()
+    t0 = time.perf_counter()
+    try:
+        resp = handler(event, c["standins"].FakeContext(timeout_ms=c["lambda_timeout_ms"]))
+        status = resp.get("statusCode") if isinstance(resp, dict) else None
+        outcome = _outcome(resp)
+    except Exception as e:
+        status = outcome = f"exception:{e.__class__.__name__}"
+    latency = (time.perf_counter() - t0) * 1000
+    with c["lock"]:
+        stages = list(c["sink"])
+    return {"target": target, "kind": kind, "status": status, "outcome": outcome, "latency_ms": latency,
+            "stages": stages, "pid": os.getpid(), "start": t0}
+
+
+def _outcome(resp) -> str:
+    """Resultado comparable entre versiones: "<status>[:<error>]" por HTTP, "ok" / "error:<...>" directo."""
+    if not isinstance(resp, dict):
+        return type(resp).__name__
+    if "statusCode" in resp:
+        try:
+            body = json.loads(resp.get("body") or "null")
+        except (TypeError, ValueError):
+            body = None
+        error = body.get("error") if isinstance(body, dict) else None
+        return f"{resp['statusCode']}:{error}" if isinstance(error, str) else str(resp["statusCode"])
+    if resp.get("error"):
+        return f"error:{resp['error']}"
+    if "results" in resp:
+        return "batch:" + ",".join("ok" if r.get("ok") else f"error:{r.get('error')}" for r in resp["results"])
+    return "ok" if resp.get("ok", True) else "not_ok"
+
+
+# -----------------------------
+# Reporte
+# -----------------------------
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def _dist(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(_pct(values, 50), 3),
+        "p95_ms": round(_pct(values, 95), 3),
+        "p99_ms": round(_pct(values, 99), 3),
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "max_ms": round(max(values), 3) if values else 0.0,
+    }
+
+
+def summarize(results: list[dict], wall_s: float) -> dict:
+    out = {}
+    for target in ("contact-form", "email-dispatcher"):
+        rows = [r for r in results if r["target"] == target]
+        if not rows:
+            continue
+        per_container = defaultdict(lambda: {"requests": 0, "busy_ms": 0.0})
+        stages = defaultdict(list)
+        for r in rows:
+            pc = per_container[r["pid"]]
+            pc["requests"] += 1
+            pc["busy_ms"] += r["latency_ms"]
+            for stage, ms in r["stages"]:
+                stages[stage].append(ms)
+        out[target] = {
+            "latency": _dist([r["latency_ms"] for r in rows]),
+            "latency_by_kind": {k: _dist([r["latency_ms"] for r in rows if r["kind"] == k])
+                                for k in sorted({r["kind"] for r in rows})},
+            "status_codes": dict(Counter(str(r["status"]) for r in rows)),
+            "throughput_rps": round(len(rows) / wall_s, 2),
+            "per_container": [
+                {"requests": pc["requests"],
+                 "busy_rps": round(pc["requests"] / (pc["busy_ms"] / 1000), 2) if pc["busy_ms"] else None}
+                for pc in per_container.values()
+            ],
+            "stages": {k: _dist(v) for k, v in sorted(stages.items())},
+        }
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """Deltas de p50/p95/p99 (ms) por handler contra una corrida anterior."""
+    deltas = {}
+    for target, cur in current["handlers"].items():
+        prev = previous.get("handlers", {}).get(target)
+        if not prev:
+            continue
+        deltas[target] = {
+            k: round(cur["latency"][k] - prev["latency"][k], 3) for k in ("p50_ms", "p95_ms", "p99_ms")
+        }
+    return {"against_commit": previous.get("meta", {}).get("commit"), "latency_delta": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--containers", type=int, default=4)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por tipo de evento ({DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--recaptcha", default="latency=80,jitter=20", help="latency=ms,jitter=ms,fail=rate")
+    parser.add_argument("--invoke", default="latency=25,jitter=5")
+    parser.add_argument("--ses", default="latency=40,jitter=10")
+    parser.add_argument("--smtp-connect", default="latency=300,jitter=50")
+    parser.add_argument("--smtp-send", default="latency=120,jitter=30")
+    parser.add_argument("--transport", choices=["invoke", "event", "inprocess"], default="invoke",
+                        help="DISPATCH_TRANSPORT de contact-form (notificación al vendor)")
+    parser.add_argument("--lambda-timeout-ms", type=int, default=10000,
+                        help="timeout de Lambda simulado (presupuesto del context; 503 deadline_exceeded si no alcanza)")
+    parser.add_argument("--tls-cert", help="servir siteverify por HTTPS con este certificado")
+    parser.add_argument("--tls-key")
+    parser.add_argument("--show-logs", action="store_true", help="mostrar los logs de los handlers")
+    parser.add_argument("--output", help="archivo JSON de salida (default: stdout)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para calcular deltas")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    import standins
+
+    mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))}
+    behaviors = {
+        "recaptcha": standins.Behavior.parse(args.recaptcha),
+        "invoke": standins.Behavior.parse(args.invoke),
+        "ses": standins.Behavior.parse(args.ses),
+        "smtp_connect": standins.Behavior.parse(args.smtp_connect),
+        "smtp_send": standins.Behavior.parse(args.smtp_send),
+    }
+    events = generate_events(args.requests, mix, args.seed)
+
+    with standins.SiteverifyServer(behaviors["recaptcha"], certfile=args.tls_cert, keyfile=args.tls_key) as sv:
+        env = {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "RECAPTCHA_SECRET": "bench-secret",
+            "RECAPTCHA_VERIFY_URL": sv.url,
+            "EMAIL_DISPATCHER_FUNCTION_NAME": "bench-email-dispatcher",
+            "ZOHO_SMTP_HOST": "smtp.bench.local",
+            "ZOHO_SMTP_PORT": "465",
+            "ZOHO_SMTP_USER": "bench@orbit.com.mx",
+            "ZOHO_SMTP_PASS": "bench-pass",
+            "FROM_EMAIL": "no-reply@orbit.com.mx",
+            "VENDOR_EMAIL": "vendor@orbit.com.mx",
+            "DISPATCH_TRANSPORT": args.transport,
+            "SES_FROM_EMAIL": "no-reply@orbit.com.mx",
+            # El benchmark mide el camino completo: sin rate limiting (todo sale de pocas IPs)
+            "RATE_LIMIT_IP_PER_MINUTE": "0",
+            "RATE_LIMIT_GLOBAL_PER_SECOND": "0",
+        }
+        if args.tls_cert:
+            env["SSL_CERT_FILE"] = args.tls_cert
+        cfg = {"env": env, "behaviors": {k: v.to_dict() for k, v in behaviors.items()},
+               "show_logs": args.show_logs, "lambda_timeout_ms": args.lambda_timeout_ms}
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(args.containers, initializer=_init_container, initargs=(cfg,)) as pool:
+            t0 = time.perf_counter()
+            results = pool.map(_run_one, events, chunksize=1)
+            wall = time.perf_counter() - t0
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "containers": args.containers,
+            "transport": args.transport,
+            "mix": mix,
+            "behaviors": cfg["behaviors"],
+            "wall_seconds": round(wall, 3),
+        },
+        "handlers": summarize(results, wall),
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Prewarm con fan-out contra una flota simulada de contenedores Lambda.
+
+Cada contenedor es un proceso aparte (estado de módulo propio) que atiende un evento
+a la vez; si todos los de una función están ocupados, la flota arranca uno nuevo
+(cold start: proceso + imports). contact-form y email-dispatcher corren en la misma
+flota y se invocan entre sí por un cliente "lambda" que habla con ella.
+
+Escenarios (cada uno con una flota nueva):
+  cold:    ráfaga de N envíos reales concurrentes sin calentar
+  prewarm: ping {"warmup": {"concurrency": N}} a contact-form y luego la misma ráfaga
+
+Reporta latencias de la ráfaga, contenedores arrancados durante la ráfaga y el reporte
+del warm-up (qué abrió y cuántos contenedores alcanzó el fan-out). Exit 1 si después
+del prewarm la ráfaga todavía arranca contenedores de contact-form.
+
+Con --logs DIR cada contenedor escribe su salida (líneas EMF y orbit_trace) en
+DIR/<función>-<pid>.log, lista para infra/scripts/trace_waterfall.py.
+
+Uso:
+  python infra/bench/bench_prewarm.py [--burst 4] [--smtp-connect latency=300] [--recaptcha latency=80]
+  python infra/bench/bench_prewarm.py --logs /tmp/orbit-logs && python infra/scripts/trace_waterfall.py /tmp/orbit-logs/*.log
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+CONTACT_SRC = os.path.join(MODULES, "contact-form-lambda", "src")
+DISPATCHER_SRC = os.path.join(MODULES, "email-dispatcher-lambda", "src")
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+
+CONTACT_FN = "bench-contact-form"
+DISPATCHER_FN = "bench-email-dispatcher"
+AUTHKEY = b"orbit-bench"
+
+
+class FleetLambdaClient:
+    """Cliente boto3 "lambda" (invoke) que enruta a la flota por su Listener local."""
+
+    def __init__(self, address):
+        self.address = address
+
+    def invoke(self, FunctionName, InvocationType="RequestResponse", Payload=b"{}", **kwargs):
+        with Client(self.address, authkey=AUTHKEY) as conn:
+            conn.send((FunctionName.rsplit(":", 1)[-1], json.loads(Payload)))
+            result = conn.recv()
+        return {"StatusCode": 200, "Payload": io.BytesIO(json.dumps(result["response"]).encode("utf-8"))}
+
+
+def _container_main(function: str, conn, address, cfg: dict):
+    """Proceso contenedor: imports (cold start) y luego un evento a la vez por el Pipe."""
+    os.environ.update(cfg["env"])
+    if cfg.get("logs"):
+        sys.stdout = open(os.path.join(cfg["logs"], f"{function}-{os.getpid()}.log"), "w", buffering=1)
+    else:
+        sys.stdout = open(os.devnull, "w")
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.append(LAYER_PYTHON)
+    import standins
+    b = {k: standins.Behavior(**v, seed=os.getpid()) for k, v in cfg["behaviors"].items()}
+
+    if function == CONTACT_FN:
+        sys.path.insert(0, CONTACT_SRC)
+        import index
+        import smtp_session
+        index.ses_client = standins.FakeSesClient(b["ses"])
+        index.lambda_client = FleetLambdaClient(address)
+        standins.FakeSMTP.connect_behavior = b["smtp_connect"]
+        standins.FakeSMTP.send_behavior = b["smtp_send"]
+        env = cfg["env"]
+        smtp_session._session = smtp_session.SmtpSessionManager(
+            env["ZOHO_SMTP_HOST"], int(env["ZOHO_SMTP_PORT"]), env["ZOHO_SMTP_USER"], env["ZOHO_SMTP_PASS"],
+            factory=standins.FakeSMTP)
+        handler = index.handler
+    else:
+        sys.path.insert(0, DISPATCHER_SRC)
+        import index
+        index.ses = standins.FakeSesClient(b["ses"])
+        handler = index.lambda_handler
+
+    conn.send("ready")
+    while True:
+        event = conn.recv()
+        if event is None:
+            break
+        try:
+            resp = handler(event, standins.FakeContext(function, timeout_ms=10000))
+        except Exception as e:
+            resp = {"error": f"{e.__class__.__name__}: {e}"}
+        conn.send(resp)
+
+
+class Fleet:
+    """Contenedores por función: reutiliza uno libre o arranca uno nuevo (cold)."""
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._idle = {CONTACT_FN: [], DISPATCHER_FN: []}
+        self._all = []
+        self.started = {CONTACT_FN: 0, DISPATCHER_FN: 0}
+        self._listener = Listener(("127.0.0.1", 0), authkey=AUTHKEY)
+        self.address = self._listener.address
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_one, args=(conn,), daemon=True).start()
+
+    def _serve_one(self, conn):
+        with conn:
+            function, event = conn.recv()
+            conn.send(self.invoke(function, event))
+
+    def invoke(self, function: str, event: dict) -> dict:
+        t0 = time.perf_counter()
+        with self._lock:
+            container = self._idle[function].pop() if self._idle[function] else None
+            if container is None:
+                parent, child = self._ctx.Pipe()
+                proc = self._ctx.Process(target=_container_main, args=(function, child, self.address, self.cfg),
+                                         daemon=True)
+                proc.start()
+                container = (proc, parent)
+                self._all.append(container)
+                self.started[function] += 1
+                cold = True
+            else:
+                cold = False
+        proc, conn = container
+        if cold:
+            conn.recv()  # "ready": imports terminados
+        conn.send(event)
+        response = conn.recv()
+        with self._lock:
+            self._idle[function].append(container)
+        return {"response": response, "cold": cold, "pid": proc.pid, "ms": (time.perf_counter() - t0) * 1000}
+
+    def close(self):
+        for proc, conn in self._all:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            proc.join(timeout=2)
+        self._listener.close()
+
+
+def _submission(i: int) -> dict:
+    body = {"name": f"Bench {i}", "email": f"bench{i}@example.com", "phone": "5555555555", "projectType": "web",
+            "message": f"Mensaje {i} {time.time_ns()}", "_hp": "", "recaptchaToken": f"prewarm-{i}-{time.time_ns()}",
+            "locale": "es"}
+    return {"requestContext": {"http": {"method": "POST", "sourceIp": f"203.0.113.{i + 1}"}},
+            "headers": {"content-type": "application/json"}, "body": json.dumps(body), "isBase64Encoded": False}
+
+
+def _burst(fleet: Fleet, n: int) -> dict:
+    before = dict(fleet.started)
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        results = list(pool.map(lambda i: fleet.invoke(CONTACT_FN, _submission(i)), range(n)))
+    latencies = [r["ms"] for r in results]
+    return {
+        "requests": n,
+        "status_codes": sorted(str(r["response"].get("statusCode")) for r in results),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "max_ms": round(max(latencies), 1),
+        "cold_requests": sum(1 for r in results if r["cold"]),
+        "containers_started": {k: fleet.started[k] - before[k] for k in before},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=4, help="envíos concurrentes (y concurrency del warm-up)")
+    parser.add_argument("--recaptcha", default="latency=80,jitter=10")
+    parser.add_argument("--ses", default="latency=40,jitter=10")
+    parser.add_argument("--smtp-connect", default="latency=300,jitter=50")
+    parser.add_argument("--smtp-send", default="latency=120,jitter=30")
+    parser.add_argument("--hold-ms", type=float, default=300, help="hold_ms de los hijos del fan-out")
+    parser.add_argument("--logs", help="directorio para la salida de cada contenedor (EMF + trazas)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    import standins
+    behaviors = {
+        "ses": standins.Behavior.parse(args.ses),
+        "smtp_connect": standins.Behavior.parse(args.smtp_connect),
+        "smtp_send": standins.Behavior.parse(args.smtp_send),
+    }
+    report = {}
+    with standins.SiteverifyServer(standins.Behavior.parse(args.recaptcha)) as sv:
+        env = {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "RECAPTCHA_SECRET": "bench-secret",
+            "RECAPTCHA_VERIFY_URL": sv.url,
+            "EMAIL_DISPATCHER_FUNCTION_NAME": DISPATCHER_FN,
+            "DISPATCH_TRANSPORT": "invoke",
+            "ZOHO_SMTP_HOST": "smtp.bench.local",
+            "ZOHO_SMTP_PORT": "465",
+            "ZOHO_SMTP_USER": "bench@orbit.com.mx",
+            "ZOHO_SMTP_PASS": "bench-pass",
+            "FROM_EMAIL": "no-reply@orbit.com.mx",
+            "VENDOR_EMAIL": "vendor@orbit.com.mx",
+            "RATE_LIMIT_IP_PER_MINUTE": "0",
+            "RATE_LIMIT_GLOBAL_PER_SECOND": "0",
+        }
+        cfg = {"env": env, "behaviors": {k: v.to_dict() for k, v in behaviors.items()}}
+        if args.logs:
+            os.makedirs(args.logs, exist_ok=True)
+            cfg["logs"] = os.path.abspath(args.logs)
+
+        for scenario in ("cold", "prewarm"):
+            fleet = Fleet(cfg)
+            try:
+                entry = {}
+                if scenario == "prewarm":
+                    ping = fleet.invoke(CONTACT_FN, {"warmup": {"concurrency": args.burst, "hold_ms": args.hold_ms}})
+                    warm = ping["response"]
+                    entry["warmup"] = {"ms": round(ping["ms"], 1), "ok": warm.get("ok"),
+                                       "primed": {k: v.get("ok") for k, v in warm.get("primed", {}).items()},
+                                       "fanout": warm.get("fanout"), "containers_started": dict(fleet.started)}
+                entry["burst"] = _burst(fleet, args.burst)
+                report[scenario] = entry
+            finally:
+                fleet.close()
+
+    print(json.dumps(report, indent=2))
+    if report["prewarm"]["burst"]["containers_started"][CONTACT_FN]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
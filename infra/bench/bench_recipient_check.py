@@ -0,0 +1,118 @@
+"""
+Validación de destinatarios (orbit_shared.recipient_check) con el resolver stub y latencia de DNS.
+
+Tráfico simulado: la mayoría de las direcciones en proveedores conocidos (gmail, outlook, ...),
+una parte en dominios corporativos que se repiten y una fracción con el dominio mal escrito.
+Compara:
+  - sin validación: cada dirección mal escrita es un envío (sesión SMTP / SES) y un rebote
+  - MX sin caché: cada envío fuera de los conocidos paga una consulta de DNS
+  - MX con caché positiva + negativa (el default por contenedor)
+  - resolver caído: todo pasa sin verificar (fail-open) y la falla se cachea un rato
+Exit 1 si con caché pasa alguna dirección con dominio malo o se rechaza alguna buena.
+
+Uso:
+  python infra/bench/bench_recipient_check.py [--checks 3000] [--dns-latency-ms 25] [--typo-rate 0.05]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+LAYER_PYTHON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "terraform", "modules",
+                                            "lambda-shared-layer", "layer", "python"))
+sys.path.insert(0, LAYER_PYTHON)
+
+from orbit_shared import recipient_check  # noqa: E402
+
+KNOWN = ["gmail.com", "outlook.com", "hotmail.com", "yahoo.com", "icloud.com"]
+CORPORATE = [f"empresa{i}.com.mx" for i in range(60)]
+TYPOS = ["gmial.com", "gmail.con", "hotmial.com", "outlok.com", "yaho.com", "gmail.co"] + \
+        [f"empresa{i}.com.mz" for i in range(10)]
+NO_MAIL = ["parked-domain.mx", "nullmx.example"]
+
+
+def build_traffic(n: int, typo_rate: float, rng: random.Random) -> list[tuple[str, bool]]:
+    """(dirección, es_buena). Corporativos con Zipf: unos pocos concentran el tráfico."""
+    weights = [1 / (i + 1) for i in range(len(CORPORATE))]
+    traffic = []
+    for i in range(n):
+        r = rng.random()
+        if r < typo_rate:
+            traffic.append((f"user{i}@{rng.choice(TYPOS + NO_MAIL)}", False))
+        elif r < 0.6:
+            traffic.append((f"user{i}@{rng.choice(KNOWN)}", True))
+        else:
+            traffic.append((f"user{i}@{rng.choices(CORPORATE, weights)[0]}", True))
+    return traffic
+
+
+def run(traffic, checker) -> dict:
+    latencies, passed_bad, rejected_good = [], 0, 0
+    t0 = time.perf_counter()
+    for address, good in traffic:
+        c0 = time.perf_counter()
+        result = checker.check(address)
+        latencies.append((time.perf_counter() - c0) * 1000)
+        if result.get("ok") and not good:
+            passed_bad += 1
+        if result.get("error") and good:
+            rejected_good += 1
+    latencies.sort()
+    return {
+        "total_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "check_p50_ms": round(statistics.median(latencies), 4),
+        "check_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3),
+        "dns_queries": checker.resolver.queries if checker.resolver else 0,
+        "sends_to_bad_domains": passed_bad,
+        "good_rejected": rejected_good,
+        "stats": checker.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=3000)
+    parser.add_argument("--dns-latency-ms", type=float, default=25)
+    parser.add_argument("--typo-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    traffic = build_traffic(args.checks, args.typo_rate, rng)
+    records = {d: [f"mx.{d}"] for d in CORPORATE}
+    records.update({"parked-domain.mx": [], "nullmx.example": "null_mx"})
+    latency = args.dns_latency_ms / 1000
+
+    def stub(**kw):
+        return recipient_check.StubResolver(records, latency_s=latency, **kw)
+
+    scenarios = {
+        "syntax_only": recipient_check.RecipientChecker(None),
+        "mx_no_cache": recipient_check.RecipientChecker(stub(), ttl_seconds=0, min_ttl_seconds=0,
+                                                        negative_ttl_seconds=0),
+        "mx_cached": recipient_check.RecipientChecker(stub()),
+        "resolver_down": recipient_check.RecipientChecker(stub(missing="error")),
+    }
+    # Resolver caído: ningún dominio de la tabla responde
+    scenarios["resolver_down"].resolver.records = {}
+
+    report = {"checks": args.checks, "bad_addresses": sum(1 for _, good in traffic if not good),
+              "dns_latency_ms": args.dns_latency_ms}
+    for name, checker in scenarios.items():
+        # Los "MX lookup error" del resolver caído no ensucian el reporte
+        with contextlib.redirect_stdout(io.StringIO()):
+            report[name] = run(traffic, checker)
+
+    print(json.dumps(report, indent=2))
+    cached = report["mx_cached"]
+    if cached["sends_to_bad_domains"] or cached["good_rejected"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
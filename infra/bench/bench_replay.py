@@ -0,0 +1,277 @@
+"""
+Replay de tráfico capturado (orbit_shared.capture) contra dos versiones de los handlers.
+
+Lee las capturas (archivos/directorios .jsonl.gz o s3://bucket/prefijo), y para cada versión
+levanta contenedores simulados nuevos (los mismos de bench_handlers: un proceso por
+contenedor, stand-ins de Google siteverify, Lambda invoke, SES y Zoho SMTP) y reenvía los
+eventos respetando sus horas de llegada: --speed 1 es el ritmo original, 10 diez veces más
+rápido, 0 uno tras otro sin esperar.
+
+Versiones: --baseline y --candidate son refs de git (se extrae infra/terraform/modules con
+git archive) o "." para el árbol de trabajo. Reporta por servicio y tipo de evento:
+  - latencia p50/p95/p99 de cada versión y el delta
+  - diferencias de resultado evento por evento (status + código de error, "ok"/"error:..."
+    para invocaciones directas), con los primeros ejemplos
+  - retraso de la cola del replay (si los contenedores no dan abasto al ritmo pedido)
+Las invocaciones contact-form -> dispatcher ya capturadas se omiten si hay eventos de
+contact-form (en el replay el stand-in de Lambda las vuelve a generar); --include-internal
+las reenvía igual. Exit 1 con --fail-on-diff si algún resultado cambia.
+
+Capturar y reproducir en local:
+  TRAFFIC_CAPTURE=local TRAFFIC_CAPTURE_DIR=/tmp/cap python infra/bench/bench_handlers.py --requests 200
+  python infra/bench/bench_replay.py /tmp/cap --baseline HEAD~1 --candidate . [--speed 5] \\
+      [--containers 4] [--output replay.json] [--fail-on-diff]
+"""
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import bench_handlers  # noqa: E402
+
+MODULES_PATH = "infra/terraform/modules"
+
+
+# -----------------------------
+# Capturas -> eventos
+# -----------------------------
+def _kind(envelope: dict) -> str:
+    """Tipo de evento para agrupar: http:<método>, invoke, batch o schedule."""
+    event = envelope["event"]
+    if envelope.get("source") == "http":
+        ctx = event.get("requestContext") or {}
+        method = (ctx.get("http") or {}).get("method") or event.get("httpMethod") or "?"
+        return f"http:{method.upper()}"
+    if isinstance(event, dict) and isinstance(event.get("messages"), list):
+        return "batch"
+    return envelope.get("source") or "invoke"
+
+
+def _synth_body(event: dict, size: int) -> dict:
+    """Body regenerado para los que la captura no guardó por tamaño (mismo largo)."""
+    text = json.dumps({"message": "x" * max(0, size - 15)})
+    if event.get("isBase64Encoded"):
+        text = base64.b64encode(text.encode("utf-8")).decode("ascii")
+    return {**event, "body": text}
+
+
+def load_events(sources: list[str], include_internal: bool) -> tuple[list[tuple], dict]:
+    """[(offset_s, service, kind, event)] ordenados por llegada, y conteo de omitidos."""
+    sys.path.append(os.path.join(bench_handlers.MODULES, "lambda-shared-layer", "layer", "python"))
+    from orbit_shared import capture
+
+    envelopes = capture.read(sources)
+    has_contact = any(e["service"] == "contact-form" for e in envelopes)
+    skipped = Counter()
+    events = []
+    t0 = envelopes[0]["ts"] if envelopes else 0.0
+    for env in envelopes:
+        if env["service"] not in ("contact-form", "email-dispatcher"):
+            skipped["unknown_service"] += 1
+            continue
+        if (env["service"] == "email-dispatcher" and env.get("source") == "invoke" and has_contact
+                and not include_internal):
+            skipped["internal_invoke"] += 1
+            continue
+        event = env["event"]
+        if env.get("body_synth"):
+            event = _synth_body(event, env["body_synth"])
+        events.append((env["ts"] - t0, env["service"], _kind(env), event))
+    return events, dict(skipped)
+
+
+# -----------------------------
+# Versiones
+# -----------------------------
+def _repo_root() -> str:
+    return subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BENCH_DIR, capture_output=True,
+                          text=True, check=True).stdout.strip()
+
+
+def materialize(ref: str, workdir: str) -> tuple[str, str]:
+    """(directorio de módulos, commit) de la versión; "." es el árbol de trabajo sin copiar."""
+    if ref == ".":
+        return bench_handlers.MODULES, f"{bench_handlers._git_commit()}+worktree"
+    root = _repo_root()
+    commit = subprocess.run(["git", "rev-parse", "--short", ref], cwd=root, capture_output=True, text=True,
+                            check=True).stdout.strip()
+    target = os.path.join(workdir, commit)
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, MODULES_PATH], cwd=root,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target, filter="data")
+    return os.path.join(target, *MODULES_PATH.split("/")), commit
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+def _replay_one(item: tuple) -> dict:
+    due, target, kind, event = item
+    lag_ms = max(0.0, (time.time() - due) * 1000)
+    result = bench_handlers._run_one((target, kind, event))
+    result["lag_ms"] = lag_ms
+    result.pop("stages", None)
+    return result
+
+
+def replay(events: list[tuple], cfg: dict, containers: int, speed: float) -> tuple[list[dict], float]:
+    """Eventos con el ritmo de la captura (dividido por speed) en contenedores nuevos."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(containers, initializer=bench_handlers._init_container, initargs=(cfg,)) as pool:
+        # Esperar a que los contenedores carguen los handlers: el import no cuenta como cola
+        pool.map(time.sleep, [0.05] * containers, chunksize=1)
+        start = time.time() + 0.05
+        pending = []
+        for offset, target, kind, event in events:
+            due = start + (offset / speed if speed > 0 else 0.0)
+            if speed > 0:
+                delay = due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            pending.append(pool.apply_async(_replay_one, ((due, target, kind, event),)))
+        results = [p.get() for p in pending]
+        wall = time.time() - start
+    return results, wall
+
+
+# -----------------------------
+# Reporte
+# -----------------------------
+def compare(events: list[tuple], baseline: list[dict], candidate: list[dict], max_examples: int) -> dict:
+    groups = defaultdict(lambda: {"baseline": [], "candidate": [], "paired_delta": [], "lag": [],
+                                  "diffs": Counter()})
+    examples = []
+    for i, ((offset, target, kind, _), b, c) in enumerate(zip(events, baseline, candidate)):
+        g = groups[(target, kind)]
+        g["baseline"].append(b["latency_ms"])
+        g["candidate"].append(c["latency_ms"])
+        g["paired_delta"].append(c["latency_ms"] - b["latency_ms"])
+        g["lag"].extend((b["lag_ms"], c["lag_ms"]))
+        if b["outcome"] != c["outcome"]:
+            g["diffs"][f"{b['outcome']} -> {c['outcome']}"] += 1
+            if len(examples) < max_examples:
+                examples.append({"index": i, "offset_s": round(offset, 3), "service": target, "kind": kind,
+                                 "baseline": b["outcome"], "candidate": c["outcome"]})
+
+    out = {}
+    for (target, kind), g in sorted(groups.items()):
+        base, cand = bench_handlers._dist(g["baseline"]), bench_handlers._dist(g["candidate"])
+        out.setdefault(target, {})[kind] = {
+            "count": base["count"],
+            "latency": {"baseline": base, "candidate": cand,
+                        "delta_ms": {k: round(cand[k] - base[k], 3) for k in ("p50_ms", "p95_ms", "p99_ms")},
+                        "paired_delta_p50_ms": round(bench_handlers._pct(g["paired_delta"], 50), 3)},
+            "outcome_diffs": sum(g["diffs"].values()),
+            "outcome_changes": dict(g["diffs"]),
+            "queue_lag_p95_ms": round(bench_handlers._pct(g["lag"], 95), 3),
+        }
+    return {"by_service": out, "outcome_diffs": sum(v["outcome_diffs"] for s in out.values() for v in s.values()),
+            "examples": examples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="archivos/directorios de captura o s3://bucket/prefijo")
+    parser.add_argument("--baseline", default="HEAD", help="ref de git o '.' (árbol de trabajo)")
+    parser.add_argument("--candidate", default=".", help="ref de git o '.' (árbol de trabajo)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = ritmo original, 0 = sin esperas")
+    parser.add_argument("--containers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=0, help="solo los primeros N eventos")
+    parser.add_argument("--include-internal", action="store_true",
+                        help="reenviar también las invocaciones contact-form -> dispatcher capturadas")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="dejar el rate limiting de los handlers (las IPs capturadas son seudónimos estables)")
+    parser.add_argument("--recaptcha", default="latency=80,jitter=20", help="latency=ms,jitter=ms,fail=rate")
+    parser.add_argument("--invoke", default="latency=25,jitter=5")
+    parser.add_argument("--ses", default="latency=40,jitter=10")
+    parser.add_argument("--smtp-connect", default="latency=300,jitter=50")
+    parser.add_argument("--smtp-send", default="latency=120,jitter=30")
+    parser.add_argument("--transport", choices=["invoke", "event", "inprocess"], default="invoke")
+    parser.add_argument("--lambda-timeout-ms", type=int, default=10000)
+    parser.add_argument("--examples", type=int, default=20, help="diferencias de resultado a listar")
+    parser.add_argument("--show-logs", action="store_true")
+    parser.add_argument("--output", help="archivo JSON de salida (default: stdout)")
+    parser.add_argument("--fail-on-diff", action="store_true", help="exit 1 si algún resultado cambia")
+    args = parser.parse_args()
+
+    import standins
+
+    events, skipped = load_events(args.captures, args.include_internal)
+    if args.limit:
+        events = events[:args.limit]
+    if not events:
+        sys.exit("sin eventos en la captura")
+
+    behaviors = {
+        "recaptcha": standins.Behavior.parse(args.recaptcha),
+        "invoke": standins.Behavior.parse(args.invoke),
+        "ses": standins.Behavior.parse(args.ses),
+        "smtp_connect": standins.Behavior.parse(args.smtp_connect),
+        "smtp_send": standins.Behavior.parse(args.smtp_send),
+    }
+    runs = {}
+    with tempfile.TemporaryDirectory(prefix="orbit-replay-") as workdir, \
+            standins.SiteverifyServer(behaviors["recaptcha"]) as sv:
+        env = {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "RECAPTCHA_SECRET": "bench-secret",
+            "RECAPTCHA_VERIFY_URL": sv.url,
+            "EMAIL_DISPATCHER_FUNCTION_NAME": "bench-email-dispatcher",
+            "ZOHO_SMTP_HOST": "smtp.bench.local",
+            "ZOHO_SMTP_PORT": "465",
+            "ZOHO_SMTP_USER": "bench@orbit.com.mx",
+            "ZOHO_SMTP_PASS": "bench-pass",
+            "FROM_EMAIL": "no-reply@orbit.com.mx",
+            "VENDOR_EMAIL": "vendor@orbit.com.mx",
+            "DISPATCH_TRANSPORT": args.transport,
+            "SES_FROM_EMAIL": "no-reply@orbit.com.mx",
+            # El replay no vuelve a capturar, y los MX de la captura son seudónimos (example.com)
+            "TRAFFIC_CAPTURE": "off",
+            "RECIPIENT_MX_RESOLVER": "off",
+        }
+        if not args.rate_limits:
+            env.update({"RATE_LIMIT_IP_PER_MINUTE": "0", "RATE_LIMIT_GLOBAL_PER_SECOND": "0"})
+        for name, ref in (("baseline", args.baseline), ("candidate", args.candidate)):
+            modules, commit = materialize(ref, workdir)
+            cfg = {"env": env, "behaviors": {k: v.to_dict() for k, v in behaviors.items()},
+                   "show_logs": args.show_logs, "lambda_timeout_ms": args.lambda_timeout_ms, "modules": modules}
+            results, wall = replay(events, cfg, args.containers, args.speed)
+            runs[name] = {"ref": ref, "commit": commit, "wall_seconds": round(wall, 3), "results": results}
+
+    report = {
+        "meta": {
+            "captures": args.captures,
+            "events": len(events),
+            "skipped": skipped,
+            "capture_span_seconds": round(events[-1][0], 3),
+            "speed": args.speed,
+            "containers": args.containers,
+            "behaviors": {k: v.to_dict() for k, v in behaviors.items()},
+            **{name: {k: v for k, v in run.items() if k != "results"} for name, run in runs.items()},
+        },
+        **compare(events, runs["baseline"]["results"], runs["candidate"]["results"], args.examples),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.fail_on_diff and report["outcome_diffs"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
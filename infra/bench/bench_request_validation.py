@@ -0,0 +1,97 @@
+"""
+Micro-benchmark del parseo + validación del body (orbit_shared.request_schema).
+
+Compara, por tipo de payload, el camino anterior (base64 + json.loads de cualquier
+tamaño, sin esquema) contra decode_body (límite antes de decodificar) + CONTACT_FORM.
+Reporta µs por request y el pico de memoria asignada (tracemalloc) por request.
+
+Payloads: válido, campos inválidos, JSON roto, y basura de 256 KB / 4 MB (plano y base64).
+
+Uso:
+  python infra/bench/bench_request_validation.py [--iterations 2000]
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+LAYER_PYTHON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "terraform", "modules",
+                                            "lambda-shared-layer", "layer", "python"))
+sys.path.insert(0, LAYER_PYTHON)
+
+from orbit_shared import request_schema  # noqa: E402
+
+VALID = {"name": "Ana Pérez", "email": "ana@example.com", "phone": "+52 55 1234 5678", "projectType": "web",
+         "message": "Hola, quiero cotizar un proyecto. " * 6, "_hp": "", "recaptchaToken": "t" * 480,
+         "locale": "es-MX"}
+
+
+def _event(body: str, b64: bool = False) -> dict:
+    if b64:
+        body = base64.b64encode(body.encode("utf-8")).decode("ascii")
+    return {"requestContext": {"http": {"method": "POST"}}, "body": body, "isBase64Encoded": b64}
+
+
+def payloads() -> dict[str, dict]:
+    junk = json.dumps({**VALID, "message": "x" * 256 * 1024})
+    return {
+        "valid": _event(json.dumps(VALID)),
+        "invalid_fields": _event(json.dumps({**VALID, "email": "nope", "phone": 5551234567, "name": ""})),
+        "malformed": _event(json.dumps(VALID)[:200]),
+        "junk_256k": _event(junk),
+        "junk_256k_b64": _event(junk, b64=True),
+        "junk_4m_b64": _event(json.dumps({"a": ["x" * 64] * 60000}), b64=True),
+    }
+
+
+def baseline(event):
+    """Camino anterior: decodifica y parsea todo, luego lee campos con .get."""
+    raw = event["body"]
+    if event.get("isBase64Encoded"):
+        raw = base64.b64decode(raw).decode("utf-8", errors="replace")
+    try:
+        body = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    return {k: body.get(k, "") for k in VALID}
+
+
+def schema(event):
+    data, code = request_schema.decode_body(event)
+    if code:
+        return code
+    return request_schema.CONTACT_FORM.validate(data)
+
+
+def _peak_kb(fn, event) -> float:
+    tracemalloc.start()
+    fn(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    report = {"max_body_bytes": request_schema.MAX_BODY_BYTES, "payloads": {}}
+    for name, event in payloads().items():
+        n = args.iterations if not name.startswith("junk") else max(1, args.iterations // 100)
+        report["payloads"][name] = {
+            "body_bytes": len(event["body"]),
+            "result": str(schema(event))[:80],
+            "baseline_us": round(timeit.timeit(lambda: baseline(event), number=n) / n * 1e6, 2),
+            "schema_us": round(timeit.timeit(lambda: schema(event), number=n) / n * 1e6, 2),
+            "baseline_peak_kb": _peak_kb(baseline, event),
+            "schema_peak_kb": _peak_kb(schema, event),
+        }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Store de secretos (orbit_shared.secrets) con el backend file.
+
+Mide:
+  - µs por get() en caché contra una lectura al backend por request (el costo que se evita)
+  - rotación: se reescribe el archivo y se cuenta cuánto tarda el contenedor en ver el
+    valor nuevo, por TTL (refresco en segundo plano) y por invalidate() (credencial rechazada)
+  - que get() no bloquea mientras el refresco está en curso (loader lento)
+
+Uso:
+  python infra/bench/bench_secrets.py [--ttl 0.5] [--loader-latency-ms 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+LAYER_PYTHON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "terraform", "modules",
+                                            "lambda-shared-layer", "layer", "python"))
+sys.path.insert(0, LAYER_PYTHON)
+
+from orbit_shared import secrets  # noqa: E402
+
+NAMES = ("RECAPTCHA_SECRET", "ZOHO_SMTP_PASS")
+
+
+def _write(path: str, version: int):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({name: f"{name.lower()}-v{version}" for name in NAMES}, f)
+
+
+def _slow_file_loader(latency_s: float):
+    def load(source, names):
+        time.sleep(latency_s)
+        return secrets._load_file(source, names)
+    return load
+
+
+def _wait_for(store, expected: str, timeout: float) -> float | None:
+    """ms hasta que get() devuelve `expected` (None si no llega en `timeout`)."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if store.get("RECAPTCHA_SECRET") == expected:
+            return round((time.perf_counter() - t0) * 1000, 1)
+        time.sleep(0.005)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttl", type=float, default=0.5, help="TTL del store (s)")
+    parser.add_argument("--loader-latency-ms", type=float, default=200, help="latencia simulada del backend")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "secrets.json")
+        _write(path, 1)
+
+        # get() en caché vs leer el backend en cada request
+        store = secrets.SecretStore(NAMES, backend="file", source=path, ttl_seconds=3600)
+        store.load()
+        n = args.iterations
+        report["per_request_us"] = {
+            "cached_get": round(timeit.timeit(lambda: store.get("RECAPTCHA_SECRET"), number=n) / n * 1e6, 3),
+            "backend_read": round(timeit.timeit(lambda: secrets._load_file(path, NAMES), number=n // 10)
+                                  / (n // 10) * 1e6, 3),
+        }
+
+        # Rotación por TTL, con un backend lento: get() no debe esperar al refresco
+        latency = args.loader_latency_ms / 1000
+        store = secrets.SecretStore(NAMES, backend="file", source=path, ttl_seconds=args.ttl,
+                                    loader=_slow_file_loader(latency))
+        store.load()
+        _write(path, 2)
+        worst_get_ms = 0.0
+        t0 = time.perf_counter()
+        seen = None
+        while time.perf_counter() - t0 < args.ttl * 2 + latency + 1:
+            g0 = time.perf_counter()
+            value = store.get("RECAPTCHA_SECRET")
+            worst_get_ms = max(worst_get_ms, (time.perf_counter() - g0) * 1000)
+            if value == "recaptcha_secret-v2":
+                seen = round((time.perf_counter() - t0) * 1000, 1)
+                break
+            time.sleep(0.005)
+        report["ttl_rotation"] = {"ttl_s": args.ttl, "visible_after_ms": seen,
+                                  "worst_get_ms": round(worst_get_ms, 3), "stats": store.stats()}
+
+        # Rotación por invalidate(): el handler vio la credencial rechazada
+        store = secrets.SecretStore(NAMES, backend="file", source=path, ttl_seconds=3600,
+                                    loader=_slow_file_loader(latency))
+        store.load()
+        _write(path, 3)
+        # invalidate() respeta SECRETS_MIN_REFRESH_SECONDS desde la última carga
+        store.invalidate()
+        timeout = secrets.SECRETS_MIN_REFRESH_SECONDS + latency + 2
+        report["invalidate_rotation"] = {"min_refresh_s": secrets.SECRETS_MIN_REFRESH_SECONDS,
+                                         "visible_after_ms": _wait_for(store, "recaptcha_secret-v3", timeout),
+                                         "stats": store.stats()}
+
+    print(json.dumps(report, indent=2))
+    if report["ttl_rotation"]["visible_after_ms"] is None or report["invalidate_rotation"]["visible_after_ms"] is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
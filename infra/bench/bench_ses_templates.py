@@ -0,0 +1,66 @@
+"""
+Micro-benchmark del render local de plantillas SES (orbit_shared.ses_templates).
+
+  naive:    leer la plantilla y sustituir los placeholders con re.sub en cada envío.
+  compiled: plantillas compiladas una vez por contenedor (render por concatenación).
+
+También mide la validación previa (prepare_templated_email) y el armado completo del
+contenido Simple que usa SES_CONTENT_MODE=simple. No llama a SES.
+
+Uso:
+  python infra/bench/bench_ses_templates.py [--iterations 5000]
+"""
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import timeit
+
+LAYER_PYTHON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "terraform", "modules",
+                                            "lambda-shared-layer", "layer", "python"))
+sys.path.insert(0, LAYER_PYTHON)
+
+from orbit_shared import ses_sender, ses_templates  # noqa: E402
+
+MESSAGE = {"template": "VendorNotifyTemplate", "name": "Ana <Pérez>", "email": "ana@example.com",
+           "phone": "5555555555", "projectType": "web", "message": "Hola & gracias\n" * 20}
+FROM_EMAIL = "no-reply@orbit.com.mx"
+
+
+def _naive_render(base: str, values: dict) -> dict:
+    out = {}
+    for ext in ("subject", "html", "txt"):
+        with open(os.path.join(ses_templates.template_dir(), f"{base}.{ext}"), encoding="utf-8") as f:
+            source = f.read()
+        escape = html.escape if ext == "html" else str
+        out[ext] = re.sub(r"{{\s*(\w+)\s*}}", lambda m: escape(str(values.get(m.group(1), ""))), source)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    os.environ.setdefault("VENDOR_EMAIL", "vendor@orbit.com.mx")
+
+    n = args.iterations
+    values = {k: v for k, v in MESSAGE.items() if k != "template"}
+    compiled = ses_templates.get()["VendorNotifyTemplate"]  # compilación del contenedor (fuera de la medición)
+    timings = {
+        "naive_render_us": timeit.timeit(lambda: _naive_render("vendor_notify", values), number=n) / n,
+        "compiled_render_us": timeit.timeit(lambda: compiled.render(values), number=n) / n,
+        "validate_us": timeit.timeit(lambda: ses_sender.prepare_templated_email(MESSAGE, FROM_EMAIL), number=n) / n,
+        "simple_content_us": timeit.timeit(
+            lambda: ses_sender._simple_content(ses_sender.render_email(MESSAGE, FROM_EMAIL)[0]), number=n) / n,
+        "load_and_compile_ms": timeit.timeit(ses_templates.load, number=20) / 20 * 1000,
+    }
+    report = {k: round(v * 1e6, 2) if k.endswith("_us") else round(v, 3) for k, v in timings.items()}
+    report["speedup"] = round(timings["naive_render_us"] / timings["compiled_render_us"], 1)
+    report["iterations"] = n
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
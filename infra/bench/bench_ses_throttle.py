@@ -0,0 +1,101 @@
+"""
+Envíos SES cerca de la cuota: ráfaga de envíos individuales (varios hilos) y un lote
+SendBulkEmail contra un stand-in de SES que aplica MaxSendRate (TooManyRequestsException /
+ACCOUNT_THROTTLED), pasando por email-dispatcher (invocación directa).
+
+Compara el sender con bucket de cuota + reintentos con jitter contra la línea base
+(--baseline: sin bucket ni reintentos). Reporta enviados, rechazos de SES, correos
+perdidos (resultado con error), tiempo y ritmo logrado frente a la cuota.
+Exit 1 si el sender (sin --baseline) pierde correos.
+
+Uso:
+  python infra/bench/bench_ses_throttle.py [--rate 10] [--burst 40] [--threads 8] [--batch 120] [--baseline]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+DISPATCHER_SRC = os.path.join(MODULES, "email-dispatcher-lambda", "src")
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+
+
+def _message(i: int) -> dict:
+    return {"template": "ContactAckTemplate", "email": f"bench{i}@example.com"}
+
+
+def run(dispatcher, standins, ses, name: str, calls) -> dict:
+    """Corre calls() (lista de resultados por mensaje) y resume lo que pasó en SES."""
+    before = dict(ses.counters)
+    log = io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        results = calls()
+    elapsed = time.perf_counter() - t0
+    sent = ses.counters["sent"] - before["sent"]
+    dropped = [r for r in results if not r.get("ok")]
+    return {
+        "scenario": name,
+        "messages": len(results),
+        "sent": sent,
+        "ses_throttles": ses.counters["throttled"] - before["throttled"],
+        "dropped": len(dropped),
+        "dropped_errors": sorted({r.get("error", "") for r in dropped}),
+        "elapsed_s": round(elapsed, 3),
+        "achieved_rate": round(sent / elapsed, 2) if elapsed else None,
+        "quota_rate": ses.max_send_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10, help="MaxSendRate del stand-in (envíos/s)")
+    parser.add_argument("--burst", type=int, default=40, help="envíos individuales en la ráfaga")
+    parser.add_argument("--threads", type=int, default=8, help="hilos concurrentes de la ráfaga")
+    parser.add_argument("--batch", type=int, default=120, help="mensajes del lote SendBulkEmail")
+    parser.add_argument("--baseline", action="store_true", help="sin bucket de cuota ni reintentos")
+    args = parser.parse_args()
+
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "FROM_EMAIL": "no-reply@orbit.com.mx",
+                       "VENDOR_EMAIL": "vendor@orbit.com.mx", "CIRCUIT_BREAKER_ENABLED": "false"})
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, DISPATCHER_SRC)
+    sys.path.append(LAYER_PYTHON)
+    import standins
+    import index as dispatcher
+    from orbit_shared import ses_sender
+
+    ses = standins.FakeSesClient(standins.Behavior(latency_ms=15, jitter_ms=5, seed=1),
+                                 max_send_rate=args.rate, enforce_rate=True)
+    dispatcher.ses = ses
+    if args.baseline:
+        ses_sender.SES_MAX_ATTEMPTS = 1
+        ses_sender._rate_limiter = ses_sender.SendRateLimiter(share=1e6)
+
+    def invoke(event):
+        return dispatcher.lambda_handler(event, standins.FakeContext(timeout_ms=60000))
+
+    def burst():
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            return list(pool.map(lambda i: invoke(_message(i)), range(args.burst)))
+
+    def batch():
+        # Dejar que la cuota se recupere de la ráfaga antes del lote
+        time.sleep(1.0)
+        return invoke({"messages": [_message(i) for i in range(args.batch)]})["results"]
+
+    scenarios = [run(dispatcher, standins, ses, "burst", burst), run(dispatcher, standins, ses, "batch", batch)]
+    report = {"baseline": args.baseline, "rate_limiter": ses_sender._rate_limiter.stats(), "scenarios": scenarios}
+    print(json.dumps(report, indent=2))
+    if not args.baseline and any(s["dropped"] for s in scenarios):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
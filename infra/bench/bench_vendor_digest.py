@@ -0,0 +1,150 @@
+"""
+Pico de envíos contra email-dispatcher con la cuota de SES aplicada: cada envío manda
+la notificación al vendor (VendorNotifyTemplate) y el ack al cliente (ContactAckTemplate).
+
+Compara sin agrupación (un correo al vendor por envío) contra vendor_digest (por encima
+del umbral las notificaciones entran a resúmenes de hasta --max-items; el resto sale
+con el flush programado al cerrar la ventana, simulado al final). Reporta correos al
+vendor, envíos que se quedaron sin notificar, acks perdidos o lentos y rechazos de SES.
+Exit 1 si con agrupación se pierde alguna notificación (todas deben salir, solas o
+dentro de un resumen).
+
+Uso:
+  python infra/bench/bench_vendor_digest.py [--submissions 120] [--threads 8] [--rate 8] [--threshold 10]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+DISPATCHER_SRC = os.path.join(MODULES, "email-dispatcher-lambda", "src")
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+VENDOR = "vendor@orbit.com.mx"
+
+
+def _vendor(i: int) -> dict:
+    return {"template": "VendorNotifyTemplate", "name": f"Bench {i}", "email": f"bench{i}@example.com",
+            "phone": "5555555555", "projectType": "web", "message": f"Mensaje {i}\nSegunda línea"}
+
+
+def _ack(i: int) -> dict:
+    return {"template": "ContactAckTemplate", "email": f"bench{i}@example.com"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=120)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=8, help="MaxSendRate del stand-in (envíos/s)")
+    parser.add_argument("--threshold", type=float, default=10, help="notificaciones/min para agrupar")
+    parser.add_argument("--max-items", type=int, default=20, help="entradas por resumen")
+    args = parser.parse_args()
+
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "FROM_EMAIL": "no-reply@orbit.com.mx",
+                       "VENDOR_EMAIL": VENDOR, "CIRCUIT_BREAKER_ENABLED": "false", "TRACE_LOG": "false"})
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, DISPATCHER_SRC)
+    sys.path.append(LAYER_PYTHON)
+    import standins
+    import index as dispatcher
+    import vendor_digest
+    from orbit_shared import ses_sender
+
+    class CountingSes(standins.FakeSesClient):
+        """Stand-in de SES que cuenta los correos aceptados por destinatario y plantilla."""
+
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw)
+            self.by_template = {}
+            self._count_lock = threading.Lock()
+
+        def send_email(self, **kwargs):
+            resp = super().send_email(**kwargs)
+            name = kwargs["Content"].get("Template", {}).get("TemplateName", "simple")
+            with self._count_lock:
+                self.by_template[name] = self.by_template.get(name, 0) + 1
+            return resp
+
+    def invoke(event):
+        return dispatcher.lambda_handler(event, standins.FakeContext(timeout_ms=60000))
+
+    def submission(i):
+        """Notificación al vendor y ack al cliente de un envío, como contact-form."""
+        vendor = invoke(_vendor(i))
+        t0 = time.perf_counter()
+        ack = invoke(_ack(i))
+        return vendor, ack, (time.perf_counter() - t0) * 1000
+
+    report = {}
+    for scenario in ("immediate", "digest"):
+        ses = CountingSes(standins.Behavior(latency_ms=15, jitter_ms=5, seed=1),
+                          max_send_rate=args.rate, enforce_rate=True)
+        dispatcher.ses = ses
+        ses_sender._rate_limiter = ses_sender.SendRateLimiter()
+        clock = {"offset": 0.0}
+        vendor_digest.VENDOR_DIGEST_ENABLED = scenario == "digest"
+        dispatcher._vendor_digest = vendor_digest.VendorDigest(
+            vendor_digest.MemoryDigestStore(),
+            lambda data: ses_sender.send_templated_email(data, dispatcher._get_ses, dispatcher.FROM_EMAIL),
+            threshold_per_minute=args.threshold, max_items=args.max_items,
+            clock=lambda: time.time() + clock["offset"])
+
+        log = io.StringIO()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(log), ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(submission, range(args.submissions)))
+        elapsed = time.perf_counter() - t0
+
+        # Cierre de la ventana: el flush programado manda lo que quedó en chunks abiertos
+        flush = None
+        if scenario == "digest":
+            clock["offset"] = vendor_digest.VENDOR_DIGEST_WINDOW_SECONDS + 1
+            with contextlib.redirect_stdout(log):
+                flush = invoke({"vendor_digest": "flush"})
+
+        vendor_results = [v for v, _, _ in results]
+        coalesced = sum(1 for v in vendor_results if v.get("coalesced"))
+        digested = coalesced if scenario == "digest" else 0
+        vendor_lost = sum(1 for v in vendor_results if not v.get("ok"))
+        if scenario == "digest":
+            # Las agrupadas solo cuentan como entregadas si su resumen salió
+            stats = dispatcher._vendor_digest.stats()
+            pending = [k for k, item in dispatcher._vendor_digest.store._items.items()
+                       if k.startswith("chunk#") and item.get("state") != "sent"]
+            vendor_lost += sum(len(dispatcher._vendor_digest.store._items[k]["entries"]) for k in pending)
+        ack_ms = [ms for _, _, ms in results]
+        report[scenario] = {
+            "submissions": args.submissions,
+            "vendor_emails": ses.by_template.get("VendorNotifyTemplate", 0)
+            + ses.by_template.get("VendorDigestTemplate", 0),
+            "vendor_single_emails": ses.by_template.get("VendorNotifyTemplate", 0),
+            "vendor_digests": ses.by_template.get("VendorDigestTemplate", 0),
+            "coalesced_notifications": digested,
+            "vendor_notifications_lost": vendor_lost,
+            "acks_sent": ses.by_template.get("ContactAckTemplate", 0),
+            "acks_failed": sum(1 for _, a, _ in results if not a.get("ok")),
+            "ack_p50_ms": round(statistics.median(ack_ms), 1),
+            "ack_p95_ms": round(statistics.quantiles(ack_ms, n=20)[-1], 1),
+            "acks_per_s": round(args.submissions / elapsed, 2),
+            "ses_throttles": ses.counters["throttled"],
+            "elapsed_s": round(elapsed, 2),
+        }
+        if flush is not None:
+            report[scenario]["window_flush"] = {k: flush.get(k) for k in ("ok", "flushed", "entries")}
+            report[scenario]["digest_stats"] = stats
+
+    print(json.dumps(report, indent=2))
+    if report["digest"]["vendor_notifications_lost"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Tabla de rutas del vendor (email-dispatcher vendor_routing) con unos cientos de reglas.
+
+Mide:
+  - carga + compilación de la tabla (una vez por contenedor)
+  - µs por mensaje de RoutingTable.match() (índice por campo/valor) contra interpretar el JSON
+    de la tabla regla por regla en cada mensaje (sin compilar); ambos deben elegir las mismas rutas
+  - entrega de una ruta con varios destinatarios contra un SES con latencia: uno tras otro vs
+    en paralelo (deliver() con el executor del dispatcher)
+Exit 1 si el índice y el intérprete no coinciden en algún mensaje.
+
+Uso:
+  python infra/bench/bench_vendor_routing.py [--rules 300] [--messages 2000] [--recipients 4]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.abspath(os.path.join(BENCH_DIR, "..", "terraform", "modules"))
+DISPATCHER_SRC = os.path.join(MODULES, "email-dispatcher-lambda", "src")
+LAYER_PYTHON = os.path.join(MODULES, "lambda-shared-layer", "layer", "python")
+
+PROJECT_TYPES = [f"tipo-{i}" for i in range(150)] + ["web", "app móvil", "ecommerce", "landing", "otro"]
+
+
+def build_table(n: int, rng: random.Random) -> dict:
+    """n reglas: la mayoría por projectType (igualdad), el resto prefix/contains/regex."""
+    routes = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.8:
+            when = {"projectType": rng.sample(PROJECT_TYPES, rng.randint(1, 3))}
+            if rng.random() < 0.2:
+                when["locale"] = {"prefix": rng.choice(["es", "en"])}
+        elif kind < 0.9:
+            when = {"projectType": {"prefix": f"tipo-{rng.randint(0, 14)}"}}
+        elif kind < 0.95:
+            when = {"message": {"contains": f"palabra{rng.randint(0, 50)}"}}
+        else:
+            when = {"email": {"regex": rf"@cliente{rng.randint(0, 20)}\.com$"}}
+        route = {"name": f"r{i}", "when": when, "to": [f"ventas{i % 40}@orbit.com.mx"]}
+        if rng.random() < 0.15:
+            route["continue"] = True
+        routes.append(route)
+    return {"routes": routes, "default": {"to": ["vendor@orbit.com.mx"]}}
+
+
+def build_messages(n: int, rng: random.Random) -> list[dict]:
+    return [{"template": "VendorNotifyTemplate", "name": f"Bench {i}", "phone": "5555555555",
+             "email": f"c{i}@cliente{rng.randint(0, 40)}.com",
+             "projectType": rng.choice(PROJECT_TYPES + ["sin ruta"]),
+             "locale": rng.choice(["es-MX", "en-US", ""]),
+             "message": f"Hola, mensaje con palabra{rng.randint(0, 200)}"} for i in range(n)]
+
+
+def interpret(table: dict, data: dict) -> list[str]:
+    """Sin compilar: recorre el JSON de la tabla y evalúa cada condición en cada mensaje."""
+    def norm(v):
+        return str(v).strip().lower() if v is not None else ""
+
+    def holds(value, cond) -> bool:
+        if not isinstance(cond, dict):
+            cond = {"in": cond if isinstance(cond, list) else [cond]}
+        op, arg = next(iter(cond.items()))
+        if op == "in":
+            return value in [norm(a) for a in arg]
+        if op == "exists":
+            return bool(value) == bool(arg)
+        if op == "prefix":
+            return value.startswith(norm(arg))
+        if op == "contains":
+            return norm(arg) in value
+        return re.search(arg, value, re.IGNORECASE) is not None
+
+    matched = []
+    for route in table["routes"]:
+        if all(holds(norm(data.get(f)), c) for f, c in (route.get("when") or {}).items()):
+            matched.append(route["name"])
+            if not route.get("continue"):
+                return matched
+    return matched + ["default"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=4, help="destinatarios de la ruta en la entrega")
+    parser.add_argument("--ses-latency-ms", type=float, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update({"AWS_DEFAULT_REGION": "us-east-1", "FROM_EMAIL": "no-reply@orbit.com.mx",
+                       "VENDOR_EMAIL": "vendor@orbit.com.mx", "CIRCUIT_BREAKER_ENABLED": "false",
+                       "TRACE_LOG": "false", "VENDOR_ROUTES_MAX_RECIPIENTS": str(max(10, args.recipients))})
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, DISPATCHER_SRC)
+    sys.path.append(LAYER_PYTHON)
+    import standins
+    import vendor_routing
+    from orbit_shared import ses_sender
+
+    rng = random.Random(args.seed)
+    table = build_table(args.rules, rng)
+    messages = build_messages(args.messages, rng)
+    raw = json.dumps(table)
+
+    t0 = time.perf_counter()
+    compiled = vendor_routing.RoutingTable.compile(json.loads(raw), ses_sender.TEMPLATES)
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    indexed = [[r.name for r in compiled.match(m)] for m in messages]
+    indexed_us = (time.perf_counter() - t0) / len(messages) * 1e6
+
+    t0 = time.perf_counter()
+    interpreted = [interpret(table, m) for m in messages]
+    interpreted_us = (time.perf_counter() - t0) / len(messages) * 1e6
+
+    mismatches = sum(1 for a, b in zip(indexed, interpreted) if a != b)
+    fanout = [len(r) for r in indexed]
+
+    # Entrega de una ruta con varios destinatarios: en serie vs en paralelo
+    route_table = vendor_routing.RoutingTable.compile(
+        {"routes": [{"name": "equipo", "when": {"projectType": "web"},
+                     "to": [f"ventas{i}@orbit.com.mx" for i in range(args.recipients)]}]},
+        ses_sender.TEMPLATES)
+    ses = standins.FakeSesClient(standins.Behavior(latency_ms=args.ses_latency_ms, jitter_ms=0, seed=1),
+                                 max_send_rate=1000)
+    ses_sender._rate_limiter = ses_sender.SendRateLimiter()
+
+    def send(message, to):
+        return ses_sender.send_templated_email(message, lambda: ses, "no-reply@orbit.com.mx", to)
+
+    data = {**messages[0], "projectType": "web"}
+    routes = route_table.match(data)
+    send(data, "warm@orbit.com.mx")  # cuota de GetAccount fuera de la medición
+    delivery = {}
+    with ThreadPoolExecutor(max_workers=vendor_routing.VENDOR_ROUTES_MAX_PARALLEL) as pool:
+        for mode, executor in (("serial", None), ("parallel", pool)):
+            t0 = time.perf_counter()
+            result = vendor_routing.deliver(routes, data, send, executor)
+            delivery[mode] = {"ms": round((time.perf_counter() - t0) * 1000, 1), "sent": result["sent"],
+                              "ok": bool(result.get("ok"))}
+
+    report = {
+        "rules": args.rules,
+        "messages": args.messages,
+        "compile_ms": round(compile_ms, 2),
+        "table": compiled.stats(),
+        "match_us": {"indexed": round(indexed_us, 2), "interpreted": round(interpreted_us, 2),
+                     "speedup": round(interpreted_us / indexed_us, 1) if indexed_us else None},
+        "routes_per_message": {"max": max(fanout), "mean": round(sum(fanout) / len(fanout), 2),
+                               "default_only": sum(1 for r in indexed if r == ["default"])},
+        "mismatches": mismatches,
+        "delivery": {"recipients": args.recipients, "ses_latency_ms": args.ses_latency_ms, **delivery},
+    }
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Stand-ins locales de las dependencias externas de las Lambdas, con latencia y tasa
+de fallas configurables. Los usan los benchmarks de infra/bench/.
+
+  - SiteverifyServer: servidor HTTP(S) keep-alive que imita google.com/recaptcha/api/siteverify
+  - FakeLambdaClient: cliente boto3 "lambda" que invoca en proceso al dispatcher
+  - FakeSesClient:    cliente boto3 "sesv2" (send_email / send_bulk_email / get_account), con cuota opcional
+  - FakeSMTP:         factory compatible con smtplib.SMTP_SSL para smtp_session
+  - FakeContext:      contexto de Lambda con deadline
+"""
+import io
+import json
+import random
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Behavior:
+    """Latencia (ms, media ± jitter) y tasa de fallas de un stand-in."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0,
+                 seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str | None) -> "Behavior":
+        """'latency=80,jitter=20,fail=0.01' -> Behavior."""
+        kwargs = {}
+        names = {"latency": "latency_ms", "jitter": "jitter_ms", "fail": "failure_rate"}
+        for item in (spec or "").split(","):
+            if item.strip():
+                key, value = item.split("=", 1)
+                kwargs[names[key.strip()]] = float(value)
+        return cls(**kwargs)
+
+    def apply(self) -> bool:
+        """Duerme la latencia simulada. Devuelve True si esta llamada debe fallar."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            fail = self._rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay / 1000)
+        return fail
+
+    def to_dict(self) -> dict:
+        return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "failure_rate": self.failure_rate}
+
+
+def _client_error(operation: str, code: str, message: str, status: int = 400):
+    from botocore.exceptions import ClientError
+    return ClientError({"Error": {"Code": code, "Message": message},
+                        "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+
+# -----------------------------
+# Google siteverify
+# -----------------------------
+class SiteverifyServer:
+    """
+    Servidor local de siteverify (HTTP/1.1 keep-alive). Responde success=True con el
+    action/hostname/score esperados; las fallas devuelven HTTP 503.
+    Con certfile/keyfile sirve HTTPS.
+    """
+
+    def __init__(self, behavior: Behavior, action: str = "contact_form_submit",
+                 hostname: str = "www.orbit.com.mx", score: float = 0.9,
+                 certfile: str | None = None, keyfile: str | None = None):
+        outer = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers y body salen en writes separados: sin esto Nagle + delayed ACK suman ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if behavior.apply():
+                    body, status = b'{"error": "unavailable"}', 503
+                else:
+                    body, status = json.dumps({
+                        "success": True,
+                        "score": outer.score,
+                        "action": outer.action,
+                        "hostname": outer.hostname,
+                        "challenge_ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    }).encode("utf-8"), 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.action, self.hostname, self.score = action, hostname, score
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self.scheme = "http"
+        if certfile:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(certfile, keyfile)
+            self._server.socket = ctx.wrap_socket(self._server.socket, server_side=True)
+            self.scheme = "https"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"{self.scheme}://localhost:{self._server.server_port}/recaptcha/api/siteverify"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# -----------------------------
+# AWS Lambda invoke
+# -----------------------------
+class FakeLambdaClient:
+    """invoke() en proceso: simula el hop y llama al handler del dispatcher."""
+
+    def __init__(self, behavior: Behavior, target_handler):
+        self.behavior = behavior
+        self.target_handler = target_handler
+
+    def invoke(self, FunctionName, InvocationType="RequestResponse", Payload=b"{}", **kwargs):
+        if self.behavior.apply():
+            raise _client_error("Invoke", "ServiceException", "stand-in failure")
+        result = self.target_handler(json.loads(Payload), FakeContext(FunctionName))
+        if InvocationType == "Event":
+            return {"StatusCode": 202}
+        return {"StatusCode": 200, "Payload": io.BytesIO(json.dumps(result).encode("utf-8"))}
+
+
+# -----------------------------
+# SES v2
+# -----------------------------
+class FakeSesClient:
+    """
+    Las fallas de `behavior` simulan SES caído (503 ServiceUnavailable). Con
+    enforce_rate=True se aplica la cuota del lado de SES: más de max_send_rate envíos
+    por segundo -> TooManyRequestsException (o ACCOUNT_THROTTLED por entrada en bulk).
+    """
+
+    def __init__(self, behavior: Behavior, max_send_rate: float = 14.0, enforce_rate: bool = False):
+        self.behavior = behavior
+        self.max_send_rate = max_send_rate
+        self.enforce_rate = enforce_rate
+        self._tokens = max_send_rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.counters = {"sent": 0, "throttled": 0}
+
+    def _take(self, n: int) -> int:
+        """Cuántos de n envíos caben ahora en la cuota."""
+        with self._lock:
+            if not self.enforce_rate:
+                granted = n
+            else:
+                now = time.monotonic()
+                self._tokens = min(self.max_send_rate, self._tokens + (now - self._updated) * self.max_send_rate)
+                self._updated = now
+                granted = min(n, int(self._tokens))
+                self._tokens -= granted
+            self.counters["sent"] += granted
+            self.counters["throttled"] += n - granted
+            return granted
+
+    def send_email(self, **kwargs):
+        if self.behavior.apply():
+            raise _client_error("SendEmail", "ServiceUnavailable", "stand-in failure", 503)
+        if not self._take(1):
+            raise _client_error("SendEmail", "TooManyRequestsException", "Maximum sending rate exceeded.", 429)
+        return {"MessageId": uuid.uuid4().hex}
+
+    def send_bulk_email(self, BulkEmailEntries, **kwargs):
+        if self.behavior.apply():
+            raise _client_error("SendBulkEmail", "ServiceUnavailable", "stand-in failure", 503)
+        granted = self._take(len(BulkEmailEntries))
+        return {"BulkEmailEntryResults": [
+            {"Status": "SUCCESS", "MessageId": uuid.uuid4().hex} if i < granted
+            else {"Status": "ACCOUNT_THROTTLED", "Error": "Maximum sending rate exceeded."}
+            for i in range(len(BulkEmailEntries))
+        ]}
+
+    def get_account(self, **kwargs):
+        return {"SendQuota": {"Max24HourSend": 50000.0, "MaxSendRate": self.max_send_rate,
+                              "SentLast24Hours": float(self.counters["sent"])}}
+
+
+# -----------------------------
+# Zoho SMTP
+# -----------------------------
+class FakeSMTP:
+    """
+    Reemplazo de smtplib.SMTP_SSL. La latencia de `connect` se aplica al abrir
+    (TLS + login) y la de `send` en cada envío.
+    """
+
+    connect_behavior = Behavior()
+    send_behavior = Behavior()
+
+    def __init__(self, host, port, timeout=None):
+        if self.connect_behavior.apply():
+            raise smtplib.SMTPConnectError(421, b"stand-in failure")
+
+    def login(self, user, password):
+        return (235, b"ok")
+
+    def noop(self):
+        return (250, b"ok")
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if self.send_behavior.apply():
+            raise smtplib.SMTPDataError(451, b"stand-in failure")
+        return {}
+
+    def send_message(self, msg, *args, **kwargs):
+        return self.sendmail(None, None, msg)
+
+    def quit(self):
+        return (221, b"bye")
+
+    close = quit
+
+
+# -----------------------------
+# Contexto de Lambda
+# -----------------------------
+class FakeContext:
+    def __init__(self, function_name: str = "local", timeout_ms: int = 10000):
+        self.function_name = function_name
+        self.invoked_function_arn = (function_name if function_name.startswith("arn:")
+                                     else f"arn:aws:lambda:us-east-1:000000000000:function:{function_name}")
+        self.aws_request_id = uuid.uuid4().hex
+        self.memory_limit_in_mb = 256
+        self._deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
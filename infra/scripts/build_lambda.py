@@ -0,0 +1,55 @@
+"""
+Prepara el directorio que se empaqueta en lambda.zip.
+
+Copia src/ (sin __pycache__ locales) a un directorio de build y, con --precompile,
+genera el bytecode con invalidación "unchecked-hash": el runtime usa los .pyc sin
+comparar timestamps y, como /var/task es de solo lectura, evita recompilar el código
+en cada cold start.
+
+El bytecode solo sirve si se genera con la misma versión de Python que el runtime
+de la Lambda (python3.12 por defecto); el script falla si no coinciden.
+
+Uso:
+  python3.12 infra/scripts/build_lambda.py SRC_DIR BUILD_DIR [--precompile] [--runtime python3.12]
+"""
+import argparse
+import compileall
+import py_compile
+import shutil
+import sys
+
+
+def build(src: str, out: str, precompile: bool, runtime: str) -> None:
+    shutil.rmtree(out, ignore_errors=True)
+    shutil.copytree(src, out, ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+
+    if not precompile:
+        return
+
+    expected = runtime.removeprefix("python")
+    current = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if current != expected:
+        sys.exit(f"build_lambda: el runtime es {runtime} pero este intérprete es {current}; "
+                 f"ejecuta el script con python{expected}")
+
+    ok = compileall.compile_dir(
+        out,
+        quiet=1,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    if not ok:
+        sys.exit("build_lambda: error al compilar el bytecode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("src")
+    parser.add_argument("out")
+    parser.add_argument("--precompile", action="store_true", help="incluir .pyc (unchecked-hash)")
+    parser.add_argument("--runtime", default="python3.12", help="runtime de la Lambda")
+    args = parser.parse_args()
+    build(args.src, args.out, args.precompile, args.runtime)
+
+
+if __name__ == "__main__":
+    main()
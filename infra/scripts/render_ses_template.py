@@ -0,0 +1,63 @@
+"""
+Previsualiza una plantilla SES (modules/ses/templates) renderizada localmente, con la
+misma validación y los mismos campos que usa orbit_shared.ses_sender antes de enviar.
+
+Sin datos (--data) se usan valores de ejemplo para cada campo de la plantilla.
+Con --out escribe <plantilla>.html y <plantilla>.txt para abrirlos en el navegador.
+
+Uso:
+  python infra/scripts/render_ses_template.py VendorNotifyTemplate [--data '{"name": "Ana", ...}'] [--out /tmp/preview]
+  python infra/scripts/render_ses_template.py --list
+"""
+import argparse
+import json
+import os
+import sys
+
+LAYER_PYTHON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "terraform", "modules",
+                                            "lambda-shared-layer", "layer", "python"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("template", nargs="?", help="nombre de la plantilla en SES (p.ej. VendorNotifyTemplate)")
+    parser.add_argument("--data", help="JSON con los campos del mensaje")
+    parser.add_argument("--from-email", default="no-reply@orbit.com.mx")
+    parser.add_argument("--out", help="directorio donde escribir el HTML y el texto")
+    parser.add_argument("--list", action="store_true", help="listar plantillas y sus campos requeridos")
+    args = parser.parse_args()
+
+    sys.path.insert(0, LAYER_PYTHON)
+    from orbit_shared import ses_sender
+
+    if args.list or not args.template:
+        for name in ses_sender.TEMPLATES:
+            required, _ = ses_sender.template_fields(name)
+            print(f"{name}: {', '.join(required) or '-'}")
+        return
+
+    os.environ.setdefault("VENDOR_EMAIL", "vendor@orbit.com.mx")
+    if args.data:
+        data = json.loads(args.data)
+    else:
+        required, _ = ses_sender.template_fields(args.template) if args.template in ses_sender.TEMPLATES else ([], [])
+        data = {f: "cliente@example.com" if f == "email" else f"<{f}>" for f in required}
+    data["template"] = args.template
+
+    rendered, error = ses_sender.render_email(data, args.from_email)
+    if error:
+        print(json.dumps(error, ensure_ascii=False))
+        sys.exit(1)
+
+    print(f"To: {rendered['to_email']}\nSubject: {rendered['subject']}\n\n{rendered['text']}")
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for ext in ("html", "text"):
+            path = os.path.join(args.out, f"{args.template}.{'txt' if ext == 'text' else ext}")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(rendered[ext])
+            print("written:", path)
+
+
+if __name__ == "__main__":
+    main()
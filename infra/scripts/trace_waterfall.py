@@ -0,0 +1,219 @@
+"""
+Cascada de una request a partir de las líneas {"orbit_trace": ...} de los logs de
+contact-form, el worker y email-dispatcher (orbit_shared.tracing).
+
+Junta los spans de todos los servicios por trace_id, los cuelga de su padre (el span
+raíz del dispatcher cuelga del dispatcher_invoke de contact-form) y dibuja la cascada
+con el desglose de cada salto entre servicios: cuánto pasó antes de que el handler
+remoto empezara (red + cold start, con el span "init" si el contenedor era nuevo),
+cuánto tardó el handler remoto y cuánto la vuelta.
+
+Entradas:
+  - archivos o stdin con líneas de log (se aceptan prefijos, p.ej. la salida de
+    `aws logs tail --since 1h`), o
+  - --log-group (uno o varios) para leer de CloudWatch Logs con boto3
+
+Uso:
+  python infra/scripts/trace_waterfall.py contact.log dispatcher.log [--trace-id 1-...]
+  aws logs tail /aws/lambda/orbit-prod-contact-form-fn --since 1h | python infra/scripts/trace_waterfall.py -
+  python infra/scripts/trace_waterfall.py --log-group /aws/lambda/orbit-prod-contact-form-fn \\
+      --log-group /aws/lambda/orbit-prod-email-dispatcher --since 30 [--slowest 3] [--list] [--json]
+"""
+import argparse
+import json
+import sys
+import time
+
+MARKER = '{"orbit_trace"'
+
+
+def parse_line(line: str) -> dict | None:
+    """Documento orbit_trace de una línea de log (None si la línea no es de trazas)."""
+    i = line.find(MARKER)
+    if i < 0:
+        return None
+    try:
+        doc = json.loads(line[i:].strip())["orbit_trace"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return doc if isinstance(doc, dict) and doc.get("trace_id") and doc.get("spans") else None
+
+
+def read_files(paths) -> list[dict]:
+    docs = []
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8", errors="replace")
+        try:
+            docs += [d for d in map(parse_line, f) if d]
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return docs
+
+
+def read_log_groups(groups, since_minutes: float, trace_id: str | None, max_events: int) -> list[dict]:
+    import boto3
+    logs = boto3.client("logs")
+    pattern = f'"{trace_id}"' if trace_id else '"orbit_trace"'
+    start = int((time.time() - since_minutes * 60) * 1000)
+    docs = []
+    for group in groups:
+        kwargs = {"logGroupName": group, "startTime": start, "filterPattern": pattern}
+        seen = 0
+        while seen < max_events:
+            resp = logs.filter_log_events(**kwargs)
+            for event in resp.get("events", []):
+                doc = parse_line(event.get("message", ""))
+                if doc:
+                    docs.append(doc)
+                seen += 1
+            if not resp.get("nextToken"):
+                break
+            kwargs["nextToken"] = resp["nextToken"]
+    return docs
+
+
+def merge(docs) -> dict[str, list[dict]]:
+    """trace_id -> spans de todos los servicios (cada span con su "service")."""
+    traces: dict[str, list[dict]] = {}
+    for doc in docs:
+        spans = traces.setdefault(doc["trace_id"], [])
+        known = {s["id"] for s in spans}
+        for span in doc["spans"]:
+            if span.get("id") not in known:
+                spans.append({**span, "service": doc.get("service", "?")})
+    return traces
+
+
+def build_tree(spans: list[dict]):
+    """(raíces, hijos por id). Una raíz es un span cuyo padre no está en los logs."""
+    ids = {s["id"] for s in spans}
+    children: dict[str, list[dict]] = {}
+    roots = []
+    for s in spans:
+        if s.get("parent_id") in ids:
+            children.setdefault(s["parent_id"], []).append(s)
+        else:
+            roots.append(s)
+    for group in children.values():
+        group.sort(key=lambda s: s["start"])
+    roots.sort(key=lambda s: s["start"])
+    return roots, children
+
+
+def total_ms(spans: list[dict]) -> float:
+    return (max(s["end"] for s in spans) - min(s["start"] for s in spans)) * 1000
+
+
+def hops(spans: list[dict]) -> list[dict]:
+    """Saltos entre servicios: span padre en un servicio, raíz del otro servicio como hijo."""
+    by_id = {s["id"]: s for s in spans}
+    _, children = build_tree(spans)
+    result = []
+    for s in spans:
+        parent = by_id.get(s.get("parent_id"))
+        if parent is None or parent["service"] == s["service"]:
+            continue
+        init = next((c for c in children.get(s["id"], []) if c["name"] == "init"), None)
+        before = (s["start"] - parent["start"]) * 1000
+        after = (parent["end"] - s["end"]) * 1000
+        result.append({
+            "from": f'{parent["service"]}.{parent["name"]}',
+            "to": s["service"],
+            "caller_ms": round(parent["ms"], 1),
+            "before_handler_ms": round(before, 1),
+            "cold_start": bool((s.get("attrs") or {}).get("cold_start")),
+            "init_ms": round(init["ms"], 1) if init else None,
+            "handler_ms": round(s["ms"], 1),
+            # Negativo: el llamador no esperó (invocación Event / cola) o relojes desfasados
+            "after_handler_ms": round(after, 1),
+            "async": after < 0,
+        })
+    return result
+
+
+def render(trace_id: str, spans: list[dict], width: int = 48) -> str:
+    roots, children = build_tree(spans)
+    t0 = min(s["start"] for s in spans)
+    total = max(total_ms(spans), 0.001)
+    services = []
+    for s in sorted(spans, key=lambda s: s["start"]):
+        if s["service"] not in services:
+            services.append(s["service"])
+    lines = [f"trace {trace_id}  total {total:.1f} ms  ({' -> '.join(services)})",
+             f"{'offset':>9} {'ms':>9}  span"]
+
+    def walk(s: dict, depth: int, parent_service: str | None):
+        offset = (s["start"] - t0) * 1000
+        a = int(offset / total * width)
+        b = max(a + 1, int((offset + s["ms"]) / total * width))
+        bar = " " * a + "█" * (b - a)
+        label = s["name"]
+        attrs = s.get("attrs") or {}
+        if s["service"] != parent_service:
+            label = f'[{s["service"]}]' + (" cold" if attrs.get("cold_start") else "")
+            if attrs.get("outcome"):
+                label += f' {attrs["outcome"]}'
+        if s.get("error"):
+            label += f' !{s["error"]}'
+        lines.append(f"{offset:9.1f} {s['ms']:9.1f}  {'  ' * depth}{label:<{max(1, 36 - 2 * depth)}} |{bar:<{width}}|")
+        for c in children.get(s["id"], []):
+            walk(c, depth + 1, s["service"])
+
+    for r in roots:
+        walk(r, 0, None)
+
+    for h in hops(spans):
+        note = f"init {h['init_ms']} ms" if h["init_ms"] is not None else ("cold" if h["cold_start"] else "warm")
+        if h["async"]:
+            tail = "asíncrono (el llamador no esperó)"
+        else:
+            tail = f"vuelta {h['after_handler_ms']} ms"
+        lines.append(f"  {h['from']} ({h['caller_ms']} ms) -> {h['to']}: antes del handler "
+                     f"{h['before_handler_ms']} ms ({note}), handler {h['handler_ms']} ms, {tail}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="archivos de log ('-' = stdin)")
+    parser.add_argument("--log-group", action="append", default=[], help="log group de CloudWatch (repetible)")
+    parser.add_argument("--since", type=float, default=60, help="minutos hacia atrás en CloudWatch")
+    parser.add_argument("--max-events", type=int, default=5000, help="eventos máximos por log group")
+    parser.add_argument("--trace-id", help="solo esta traza")
+    parser.add_argument("--slowest", type=int, default=1, help="sin --trace-id: las N trazas más lentas")
+    parser.add_argument("--list", action="store_true", help="listar trazas (id, servicios, total)")
+    parser.add_argument("--json", action="store_true", help="spans y saltos en JSON")
+    parser.add_argument("--width", type=int, default=48, help="ancho de las barras")
+    args = parser.parse_args()
+
+    if not args.files and not args.log_group:
+        parser.error("pasa archivos de log, '-' o --log-group")
+    docs = read_files(args.files)
+    if args.log_group:
+        docs += read_log_groups(args.log_group, args.since, args.trace_id, args.max_events)
+    traces = merge(docs)
+    if args.trace_id:
+        traces = {k: v for k, v in traces.items() if k == args.trace_id}
+    if not traces:
+        print("no orbit_trace lines found", file=sys.stderr)
+        sys.exit(1)
+
+    ranked = sorted(traces.items(), key=lambda kv: total_ms(kv[1]), reverse=True)
+    if args.list:
+        for trace_id, spans in ranked:
+            services = sorted({s["service"] for s in spans})
+            print(f"{trace_id}  {total_ms(spans):9.1f} ms  {','.join(services)}")
+        return
+
+    selected = ranked if args.trace_id else ranked[:max(1, args.slowest)]
+    if args.json:
+        print(json.dumps([{"trace_id": t, "total_ms": round(total_ms(s), 3), "hops": hops(s),
+                           "spans": sorted(s, key=lambda x: x["start"])} for t, s in selected],
+                         indent=2, ensure_ascii=False))
+        return
+    print("\n\n".join(render(t, s, args.width) for t, s in selected))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,13 @@ module "email_dispatcher_iam" {
   tags             = var.tags
 }
 
+module "lambda_shared_layer" {
+  source = "./modules/lambda-shared-layer"
+
+  project = var.project
+  env     = var.env
+}
+
 module "email_dispatcher_lambda" {
   source = "./modules/email-dispatcher-lambda"
 
@@ -20,12 +27,32 @@ module "email_dispatcher_lambda" {
   memory_mb       = 256
   timeout_seconds = 10
 
+  # Trazas: orbit_trace en logs siempre; "Active" además exporta a X-Ray
+  tracing_mode = "PassThrough"
+
+  # Destinatario del ack: sintaxis + MX cacheado antes de enviar (off | doh | dns).
+  # "doh" es opt-in: manda el dominio de cada destinatario a un tercero (RECIPIENT_DOH_URL, cloudflare-dns.com)
+  recipient_mx_resolver = "off"
+
   # Env vars
   ses_region     = var.aws_region
   from_email     = var.from_email
   vendor_email   = var.vendor_email
   allowed_origin = var.allowed_origin
 
+  # Picos: notificaciones al vendor agrupadas en resúmenes (VendorDigestTemplate)
+  vendor_digest_enabled              = false
+  vendor_digest_threshold_per_minute = 10
+
+  # Rutas por projectType ({routes = [{name, when, to}], default}); null = todo a vendor_email
+  vendor_routes = null
+
+  # Captura de tráfico sin PII para bench_replay (off | local | s3); s3 crea el bucket
+  traffic_capture      = "off"
+  traffic_capture_salt = var.traffic_capture_salt
+
+  layers = [module.lambda_shared_layer.layer_arn]
+
   tags = var.tags
 }
 
@@ -63,14 +90,42 @@ module "contact_form_lambda" {
   smtp_pass = var.zoho_smtp_pass
   zoho_from_email = var.zoho_from_email
 
+  # Notificación al vendor: invoke | event | inprocess
+  dispatch_transport = "invoke"
+  ses_from_email     = var.from_email
+  vendor_email       = var.vendor_email
+  ses_region         = var.aws_region
+
   # Config función
   function_name   = "" # opcional
   memory_mb       = 256
   timeout_seconds = 10
 
+  # Trazas: orbit_trace en logs siempre; "Active" además exporta a X-Ray
+  tracing_mode = "PassThrough"
+
+  # Destinatario del ack: sintaxis + MX cacheado antes de enviar (off | doh | dns).
+  # "doh" es opt-in: manda el dominio de cada destinatario a un tercero (RECIPIENT_DOH_URL, cloudflare-dns.com)
+  recipient_mx_resolver = "off"
+
+  # Captura de tráfico: mismo modo y bucket que el dispatcher
+  traffic_capture        = "off"
+  traffic_capture_bucket = module.email_dispatcher_lambda.traffic_capture_bucket
+  traffic_capture_salt   = var.traffic_capture_salt
+
+  # Prewarm: ping de EventBridge que abre conexiones y calienta N contenedores (y el dispatcher)
+  prewarm_schedule    = "" # p.ej. "rate(5 minutes)"
+  prewarm_concurrency = 1
+
+  # Secretos: "env" (default), o "secretsmanager"/"ssm" para rotar sin redeploy
+  secrets_backend     = "env"
+  secrets_ttl_seconds = 300
+
   # Env vars
   recaptcha_secret_key = var.recaptcha_secret_key
 
+  layers = [module.lambda_shared_layer.layer_arn]
+
   tags = var.tags
 }
 
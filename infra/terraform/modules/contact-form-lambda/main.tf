@@ -1,14 +1,114 @@
 locals {
   lambda_name = var.function_name != "" ? var.function_name : "${var.project}-${var.env}-contact-form-fn"
+
+  # Secretos fuera del entorno: secreto/ruta propia o la que crea este módulo
+  create_secret     = var.secrets_backend == "secretsmanager" && var.secrets_id == ""
+  create_parameters = var.secrets_backend == "ssm" && var.secrets_id == ""
+  ssm_secrets_path  = "/${var.project}/${var.env}/contact-form"
+  secrets_id = (var.secrets_id != "" ? var.secrets_id :
+    local.create_secret ? try(aws_secretsmanager_secret.this[0].arn, "") :
+  local.create_parameters ? local.ssm_secrets_path : "")
+  secret_values = {
+    RECAPTCHA_SECRET = var.recaptcha_secret_key
+    ZOHO_SMTP_PASS   = var.smtp_pass
+  }
+
+  # Variables de entorno compartidas por la función principal y el worker async
+  lambda_env = {
+    # Con secrets_backend = env los secretos siguen en el entorno; si no, los lee orbit_shared.secrets
+    RECAPTCHA_SECRET = var.secrets_backend == "env" ? var.recaptcha_secret_key : ""
+    SECRETS_BACKEND = var.secrets_backend
+    SECRETS_ID = local.secrets_id
+    SECRETS_TTL_SECONDS = tostring(var.secrets_ttl_seconds)
+    EMAIL_DISPATCHER_FUNCTION_NAME = var.email_dispatcher_function_name
+    DISPATCH_TRANSPORT = var.dispatch_transport
+    SES_FROM_EMAIL = var.ses_from_email
+    SES_REGION = var.ses_region
+    SES_CONTENT_MODE = var.ses_content_mode
+    MAX_BODY_BYTES = tostring(var.max_body_bytes)
+    TRACE_XRAY = tostring(var.tracing_mode == "Active")
+    RECIPIENT_MX_RESOLVER = var.recipient_mx_resolver
+    TRAFFIC_CAPTURE = var.traffic_capture
+    TRAFFIC_CAPTURE_SAMPLE = tostring(var.traffic_capture_sample)
+    TRAFFIC_CAPTURE_BUCKET = var.traffic_capture_bucket
+    TRAFFIC_CAPTURE_SALT = var.traffic_capture_salt
+    VENDOR_EMAIL = var.vendor_email
+    RECAPTCHA_EXPECTED_ACTION = var.recaptcha_expected_action
+    RECAPTCHA_EXPECTED_HOSTNAME = var.recaptcha_expected_hostname
+    RECAPTCHA_MIN_SCORE = var.recaptcha_min_score
+    ZOHO_SMTP_PASS = var.secrets_backend == "env" ? var.smtp_pass : ""
+    ZOHO_FROM_EMAIL = var.zoho_from_email
+    ASYNC_ACCEPT = tostring(var.async_accept)
+    EMAIL_QUEUE_BACKEND = "sqs"
+    EMAIL_QUEUE_URL = try(aws_sqs_queue.email_jobs[0].url, "")
+    RECAPTCHA_REPLAY_TABLE = try(aws_dynamodb_table.recaptcha_replay[0].name, "")
+    RATE_LIMIT_IP_PER_MINUTE = tostring(var.rate_limit_ip_per_minute)
+    RATE_LIMIT_IP_BURST = tostring(var.rate_limit_ip_burst)
+    RATE_LIMIT_GLOBAL_PER_SECOND = tostring(var.rate_limit_global_per_second)
+    RATE_LIMIT_GLOBAL_BURST = tostring(var.rate_limit_global_burst)
+    RATE_LIMIT_TABLE = try(aws_dynamodb_table.rate_limit[0].name, "")
+    IDEMPOTENCY_WINDOW_SECONDS = tostring(var.idempotency_window_seconds)
+    IDEMPOTENCY_LEASE_SECONDS = tostring(var.timeout_seconds + 5)
+    IDEMPOTENCY_TABLE = try(aws_dynamodb_table.idempotency[0].name, "")
+  }
+}
+
+########################################
+# Secretos (secrets_backend = secretsmanager | ssm)
+########################################
+# Valor inicial desde las variables; las rotaciones se hacen fuera de Terraform
+# (ignore_changes) y el contenedor las toma al refrescar la caché, sin redeploy
+resource "aws_secretsmanager_secret" "this" {
+  count       = local.create_secret ? 1 : 0
+  name        = "${local.lambda_name}-secrets"
+  description = "RECAPTCHA_SECRET y ZOHO_SMTP_PASS de ${local.lambda_name}"
+  tags        = var.tags
+}
+
+resource "aws_secretsmanager_secret_version" "this" {
+  count         = local.create_secret ? 1 : 0
+  secret_id     = aws_secretsmanager_secret.this[0].id
+  secret_string = jsonencode(local.secret_values)
+
+  lifecycle {
+    ignore_changes = [secret_string]
+  }
+}
+
+resource "aws_ssm_parameter" "secrets" {
+  for_each = local.create_parameters ? local.secret_values : {}
+  name     = "${local.ssm_secrets_path}/${each.key}"
+  type     = "SecureString"
+  value    = each.value
+  tags     = var.tags
+
+  lifecycle {
+    ignore_changes = [value]
+  }
 }
 
 ########################################
 # Empaquetado del código (zip)
 ########################################
+# Con precompile_bytecode, el zip sale de build/ (src + .pyc generados con el runtime)
+resource "terraform_data" "build" {
+  count = var.precompile_bytecode ? 1 : 0
+
+  triggers_replace = [
+    sha1(join("", [for f in sort(fileset("${path.module}/src", "**/*.{py,html,txt,json}")) : filesha1("${path.module}/src/${f}")]))
+  ]
+
+  provisioner "local-exec" {
+    command = "${var.build_python} ${path.module}/../../../scripts/build_lambda.py ${path.module}/src ${path.module}/build --precompile --runtime ${var.runtime}"
+  }
+}
+
 data "archive_file" "lambda_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/src"
+  source_dir  = var.precompile_bytecode ? "${path.module}/build" : "${path.module}/src"
   output_path = "${path.module}/lambda.zip"
+
+  depends_on = [terraform_data.build]
 }
 
 ########################################
@@ -31,7 +131,7 @@ resource "aws_lambda_function" "this" {
   architectures = var.architectures
 
   filename         = data.archive_file.lambda_zip.output_path
-  source_code_hash = filebase64sha256(data.archive_file.lambda_zip.output_path)
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
 
   memory_size = var.memory_mb
   timeout     = var.timeout_seconds
@@ -42,15 +142,11 @@ resource "aws_lambda_function" "this" {
   publish = true
 
   environment {
-    variables = {
-      RECAPTCHA_SECRET = var.recaptcha_secret_key
-      EMAIL_DISPATCHER_FUNCTION_NAME = var.email_dispatcher_function_name
-      RECAPTCHA_EXPECTED_ACTION = var.recaptcha_expected_action
-      RECAPTCHA_EXPECTED_HOSTNAME = var.recaptcha_expected_hostname
-      RECAPTCHA_MIN_SCORE = var.recaptcha_min_score
-      ZOHO_SMTP_PASS = var.smtp_pass
-      ZOHO_FROM_EMAIL = var.zoho_from_email
-    }
+    variables = local.lambda_env
+  }
+
+  tracing_config {
+    mode = var.tracing_mode
   }
 
   tags = merge(
@@ -78,9 +174,182 @@ resource "aws_lambda_function_event_invoke_config" "this" {
 }
 
 # Límite de concurrencia si se solicita (solo aplica si no es -1)
+# Alternativa sin costo fijo: el ping de prewarm de abajo (prewarm_schedule)
 resource "aws_lambda_provisioned_concurrency_config" "placeholder" {
   count                          = 0 # Dejar 0; provisioned concurrency requiere alias+version. Se deja como ejemplo.
   function_name                  = aws_lambda_function.this.function_name
   qualifier                      = aws_lambda_function.this.version
   provisioned_concurrent_executions = 1
 }
+
+########################################
+# Prewarm (opcional): ping programado de EventBridge
+########################################
+# El handler reconoce {"warmup": ...} y solo abre conexiones (siteverify, Zoho SMTP,
+# cliente lambda/SES y un contenedor del dispatcher); con concurrency > 1 se invoca a
+# sí mismo en paralelo para calentar N contenedores (ver orbit_shared.prewarm)
+resource "aws_cloudwatch_event_rule" "prewarm" {
+  count               = var.prewarm_schedule != "" ? 1 : 0
+  name                = "${local.lambda_name}-prewarm"
+  description         = "Warm-up de ${local.lambda_name}"
+  schedule_expression = var.prewarm_schedule
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "prewarm" {
+  count = var.prewarm_schedule != "" ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.prewarm[0].name
+  arn   = aws_lambda_function.this.arn
+  input = jsonencode({ warmup = { concurrency = var.prewarm_concurrency } })
+}
+
+resource "aws_lambda_permission" "prewarm" {
+  count         = var.prewarm_schedule != "" ? 1 : 0
+  statement_id  = "AllowEventBridgePrewarm"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.this.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.prewarm[0].arn
+}
+
+########################################
+# Modo async-accept (opcional): cola SQS + worker
+########################################
+resource "aws_sqs_queue" "email_jobs_dlq" {
+  count                     = var.async_accept ? 1 : 0
+  name                      = "${local.lambda_name}-email-jobs-dlq"
+  message_retention_seconds = 1209600
+  tags                      = var.tags
+}
+
+resource "aws_sqs_queue" "email_jobs" {
+  count = var.async_accept ? 1 : 0
+  name  = "${local.lambda_name}-email-jobs"
+
+  # Debe ser >= al timeout del worker para que SQS no reentregue un trabajo en curso
+  visibility_timeout_seconds = var.timeout_seconds * 6
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.email_jobs_dlq[0].arn
+    maxReceiveCount     = var.async_max_receives
+  })
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_log_group" "worker" {
+  count             = var.async_accept ? 1 : 0
+  name              = "/aws/lambda/${local.lambda_name}-worker"
+  retention_in_days = 30
+  tags              = var.tags
+}
+
+resource "aws_lambda_function" "worker" {
+  count         = var.async_accept ? 1 : 0
+  function_name = "${local.lambda_name}-worker"
+  role          = var.role_arn
+  handler       = "worker.handler"
+  runtime       = var.runtime
+  architectures = var.architectures
+
+  filename         = data.archive_file.lambda_zip.output_path
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+
+  memory_size = var.memory_mb
+  timeout     = var.timeout_seconds
+  layers      = var.layers
+
+  environment {
+    variables = local.lambda_env
+  }
+
+  tracing_config {
+    mode = var.tracing_mode
+  }
+
+  tags = merge(
+    {
+      Project     = var.project
+      Environment = var.env
+      ManagedBy   = "terraform"
+      Purpose     = "contact-form-worker"
+    },
+    var.tags
+  )
+}
+
+resource "aws_lambda_event_source_mapping" "worker" {
+  count            = var.async_accept ? 1 : 0
+  event_source_arn = aws_sqs_queue.email_jobs[0].arn
+  function_name    = aws_lambda_function.worker[0].arn
+  batch_size       = var.async_batch_size
+
+  # Solo se reentregan los trabajos fallidos del lote
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+########################################
+# Anti-replay de tokens reCAPTCHA compartido entre contenedores (opcional)
+########################################
+resource "aws_dynamodb_table" "recaptcha_replay" {
+  count        = var.recaptcha_replay_table_enabled ? 1 : 0
+  name         = "${local.lambda_name}-recaptcha-replay"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+########################################
+# Etapas completadas por envío (idempotencia entre contenedores y reintentos)
+########################################
+resource "aws_dynamodb_table" "idempotency" {
+  count        = var.idempotency_table_enabled ? 1 : 0
+  name         = "${local.lambda_name}-idempotency"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+########################################
+# Buckets de rate limiting compartidos entre contenedores (opcional)
+########################################
+resource "aws_dynamodb_table" "rate_limit" {
+  count        = var.rate_limit_table_enabled ? 1 : 0
+  name         = "${local.lambda_name}-rate-limit"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
@@ -27,3 +27,8 @@ output "version" {
   description = "Versión publicada de la función"
   value       = aws_lambda_function.this.version
 }
+
+output "email_queue_url" {
+  description = "URL de la cola SQS del modo async-accept (vacío si está deshabilitado)"
+  value       = try(aws_sqs_queue.email_jobs[0].url, "")
+}
@@ -0,0 +1,126 @@
+"""
+Renderer del correo de agradecimiento al cliente (ack vía Zoho SMTP).
+
+Las plantillas de templates/ack/<locale>.html|.txt se cargan y compilan una sola vez
+por contenedor. El cuerpo MIME (multipart/alternative ya codificado) se guarda en
+caché por locale; por request solo se agregan los headers dinámicos (From/To/Subject).
+"""
+import datetime
+import os
+import re
+import threading
+from email.header import Header
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formataddr
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "ack")
+
+DEFAULT_LOCALE = "es"
+ACK_SUBJECTS = {
+    "es": "¡Gracias por contactarnos!",
+    "en": "Thanks for contacting us!",
+}
+
+_PLACEHOLDER = re.compile(r"{{\s*(\w+)\s*}}")
+
+
+class CompiledTemplate:
+    """Plantilla con placeholders {{campo}} partida en trozos estáticos + nombres de campo."""
+
+    def __init__(self, source: str):
+        parts = _PLACEHOLDER.split(source)
+        self._static = parts[0::2]
+        self._names = parts[1::2]
+        self.fields = frozenset(self._names)
+
+    def render(self, values: dict) -> str:
+        out = [self._static[0]]
+        for name, static in zip(self._names, self._static[1:]):
+            out.append(str(values.get(name, "")))
+            out.append(static)
+        return "".join(out)
+
+
+def normalize_locale(value: str | None) -> str:
+    """'en-US', 'en_us', 'EN' -> 'en'. Locales sin plantilla caen a DEFAULT_LOCALE."""
+    if not value or not isinstance(value, str):
+        return DEFAULT_LOCALE
+    base = value.strip().replace("_", "-").split("-", 1)[0].lower()
+    return base if base in ACK_SUBJECTS else DEFAULT_LOCALE
+
+
+def locale_from_accept_language(header: str | None) -> str | None:
+    """Primer idioma soportado de un header Accept-Language (sin ordenar por q)."""
+    if not header:
+        return None
+    for item in header.split(","):
+        base = item.split(";", 1)[0].strip().split("-", 1)[0].lower()
+        if base in ACK_SUBJECTS:
+            return base
+    return None
+
+
+def _check_header_value(value: str, field: str) -> str:
+    # Evita inyección de headers y direcciones que requieren SMTPUTF8
+    if not value or "\r" in value or "\n" in value or not value.isascii():
+        raise ValueError(f"invalid {field}: {value!r}")
+    return value
+
+
+class AckRenderer:
+    def __init__(self, template_dir: str = TEMPLATE_DIR):
+        self._templates: dict[str, tuple[CompiledTemplate, CompiledTemplate]] = {}
+        for locale in ACK_SUBJECTS:
+            with open(os.path.join(template_dir, f"{locale}.html"), encoding="utf-8") as f:
+                html = CompiledTemplate(f.read())
+            with open(os.path.join(template_dir, f"{locale}.txt"), encoding="utf-8") as f:
+                text = CompiledTemplate(f.read())
+            self._templates[locale] = (html, text)
+        # Subject ya codificado (RFC 2047) por locale
+        self._subjects = {k: Header(v, "utf-8").encode() for k, v in ACK_SUBJECTS.items()}
+        self._bodies: dict[tuple[str, int], bytes] = {}
+        self._from_headers: dict[tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _body(self, locale: str) -> bytes:
+        """Parte MIME multipart/alternative codificada, cacheada por (locale, año)."""
+        year = datetime.date.today().year
+        key = (locale, year)
+        body = self._bodies.get(key)
+        if body is None:
+            html_tpl, text_tpl = self._templates[locale]
+            values = {"year": year}
+            msg = EmailMessage(policy=SMTP)
+            msg.set_content(text_tpl.render(values))
+            msg.add_alternative(html_tpl.render(values), subtype="html")
+            body = msg.as_bytes()
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def warm(self) -> list[str]:
+        """Arma el cuerpo MIME de cada locale (prewarm). Devuelve los locales listos."""
+        for locale in self._templates:
+            self._body(locale)
+        return list(self._templates)
+
+    def _from_header(self, from_name: str, from_email: str) -> str:
+        key = (from_name, from_email)
+        value = self._from_headers.get(key)
+        if value is None:
+            value = formataddr((from_name, _check_header_value(from_email, "from_email")))
+            with self._lock:
+                self._from_headers[key] = value
+        return value
+
+    def render(self, locale: str | None, from_name: str, from_email: str, to_email: str) -> bytes:
+        """Mensaje completo listo para SMTP sendmail(). Lanza ValueError si el destinatario es inválido."""
+        locale = normalize_locale(locale)
+        to_email = _check_header_value(to_email.strip(), "to_email")
+        headers = (
+            f"Subject: {self._subjects[locale]}\r\n"
+            f"From: {self._from_header(from_name, from_email)}\r\n"
+            f"To: {to_email}\r\n"
+        ).encode("ascii")
+        return headers + self._body(locale)
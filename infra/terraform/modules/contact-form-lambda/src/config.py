@@ -0,0 +1,56 @@
+"""
+Configuración tipada de contact-form, leída del entorno una vez por contenedor.
+
+Antes el handler y el envío SMTP hacían os.getenv / int() / float() en cada request;
+ahora index.py usa `settings` (construido al importar). Un valor inválido (p.ej.
+ZOHO_SMTP_PORT=abc) falla en el init del contenedor, no a mitad de una request.
+
+Los secretos (RECAPTCHA_SECRET, ZOHO_SMTP_PASS) no se guardan aquí: salen de
+orbit_shared.secrets (env, Secrets Manager, SSM o archivo) con caché y refresco en
+segundo plano, así una rotación aplica sin redeploy.
+"""
+import os
+
+# Claves que se piden al store de secretos (mismos nombres en env, JSON del secreto o SSM)
+SECRET_NAMES = ("RECAPTCHA_SECRET", "ZOHO_SMTP_PASS")
+
+
+class RecaptchaSettings:
+    __slots__ = ("verify_url", "expected_action", "expected_hostname", "min_score")
+
+    def __init__(self, env):
+        self.verify_url = env.get("RECAPTCHA_VERIFY_URL", "https://www.google.com/recaptcha/api/siteverify")
+        self.expected_action = env.get("RECAPTCHA_EXPECTED_ACTION", "contact_form_submit")
+        self.expected_hostname = env.get("RECAPTCHA_EXPECTED_HOSTNAME", "www.orbit.com.mx")
+        self.min_score = float(env.get("RECAPTCHA_MIN_SCORE", "0.5"))  # valor recomendado 0.5
+
+
+class SmtpSettings:
+    """Zoho SMTP para el ack al cliente (la contraseña va en el store de secretos)."""
+
+    __slots__ = ("host", "port", "user", "from_email", "from_name")
+
+    def __init__(self, env):
+        self.host = env.get("ZOHO_SMTP_HOST", "smtp.zoho.com")
+        self.port = int(env.get("ZOHO_SMTP_PORT", "465"))
+        self.user = env.get("ZOHO_SMTP_USER", "admin@orbit.com.mx")
+        self.from_email = env.get("ZOHO_FROM_EMAIL", self.user)
+        self.from_name = env.get("ZOHO_FROM_NAME", "Orbit Studio")
+
+
+class Settings:
+    __slots__ = ("recaptcha", "smtp")
+
+    def __init__(self, env=None):
+        env = os.environ if env is None else env
+        self.recaptcha = RecaptchaSettings(env)
+        self.smtp = SmtpSettings(env)
+
+    def to_dict(self) -> dict:
+        """Vista sin secretos (logs / prewarm)."""
+        return {group: {k: getattr(getattr(self, group), k) for k in getattr(self, group).__slots__}
+                for group in self.__slots__}
+
+
+# Config del contenedor
+settings = Settings()
@@ -0,0 +1,235 @@
+"""
+Cola de trabajos de email para el modo "async-accept".
+
+El handler encola el trabajo y responde 202; worker.py lo drena y hace los envíos.
+Backends:
+  - "sqs":    Amazon SQS (producción). La redelivery la hace SQS (visibility timeout + DLQ).
+  - "memory": en memoria del proceso (pruebas locales).
+  - "file":   un archivo JSON por trabajo en un directorio (pruebas locales entre procesos).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+EMAIL_QUEUE_BACKEND = os.getenv("EMAIL_QUEUE_BACKEND", "sqs")
+EMAIL_QUEUE_URL = os.getenv("EMAIL_QUEUE_URL", "")
+EMAIL_QUEUE_PATH = os.getenv("EMAIL_QUEUE_PATH", "/tmp/email-queue")
+# Intentos máximos antes de mandar el trabajo a dead-letter (backends locales)
+EMAIL_QUEUE_MAX_RECEIVES = int(os.getenv("EMAIL_QUEUE_MAX_RECEIVES", "3"))
+
+
+def new_job(payload: dict) -> dict:
+    """Envuelve el payload en un trabajo con id y marca de tiempo."""
+    return {"id": uuid.uuid4().hex, "created_at": time.time(), "attempts": 0, "payload": payload}
+
+
+class EmailQueue:
+    """
+    Interfaz de la cola.
+    receive() devuelve una lista de (receipt, job); cada trabajo recibido debe
+    terminar en ack() (procesado) o release() (reintentar más tarde). release(job=...)
+    reemplaza el trabajo por su versión actualizada (p.ej. con las etapas ya enviadas);
+    release(count_attempt=False) lo devuelve sin contar un intento (trabajo que no se llegó a ejecutar).
+    """
+
+    def enqueue(self, job: dict) -> str:
+        raise NotImplementedError
+
+    def receive(self, max_jobs: int = 10) -> list[tuple[str, dict]]:
+        raise NotImplementedError
+
+    def ack(self, receipt: str) -> None:
+        raise NotImplementedError
+
+    def release(self, receipt: str, delay_seconds: int = 0, job: dict | None = None,
+                count_attempt: bool = True) -> None:
+        raise NotImplementedError
+
+
+# -----------------------------
+# SQS
+# -----------------------------
+class SqsEmailQueue(EmailQueue):
+    def __init__(self, queue_url: str, client=None):
+        if not queue_url:
+            raise ValueError("EMAIL_QUEUE_URL not configured")
+        self.queue_url = queue_url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("sqs")
+        return self._client
+
+    def enqueue(self, job: dict) -> str:
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(job))
+        return job["id"]
+
+    def receive(self, max_jobs: int = 10) -> list[tuple[str, dict]]:
+        resp = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_jobs, 10),
+            WaitTimeSeconds=1,
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+        out = []
+        for m in resp.get("Messages", []):
+            job = json.loads(m["Body"])
+            # Un trabajo reescrito por release(job=...) trae en el body los intentos del mensaje anterior
+            job["attempts"] = job.get("attempts", 0) + int(m.get("Attributes", {}).get("ApproximateReceiveCount", "1")) - 1
+            out.append((m["ReceiptHandle"], job))
+        return out
+
+    def ack(self, receipt: str) -> None:
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+    def release(self, receipt: str, delay_seconds: int = 0, job: dict | None = None,
+                count_attempt: bool = True) -> None:
+        if job is not None:
+            # SQS no edita mensajes: se encola la versión nueva y se borra la vieja. El mensaje
+            # nuevo empieza en ApproximateReceiveCount 1, así que los intentos van en el body
+            attempts = job.get("attempts", 0) + (1 if count_attempt else 0)
+            self.client.send_message(QueueUrl=self.queue_url, DelaySeconds=delay_seconds,
+                                     MessageBody=json.dumps({**job, "attempts": attempts}))
+            self.ack(receipt)
+            return
+        # Visibilidad en 0 => SQS lo vuelve a entregar; la DLQ la define la redrive policy
+        self.client.change_message_visibility(
+            QueueUrl=self.queue_url, ReceiptHandle=receipt, VisibilityTimeout=delay_seconds
+        )
+
+
+# -----------------------------
+# Memoria (pruebas locales)
+# -----------------------------
+class MemoryEmailQueue(EmailQueue):
+    def __init__(self, max_receives: int = EMAIL_QUEUE_MAX_RECEIVES):
+        self.max_receives = max_receives
+        self._pending: deque = deque()
+        self._inflight: dict[str, dict] = {}
+        self.dead_letters: list[dict] = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, job: dict) -> str:
+        with self._lock:
+            self._pending.append(job)
+        return job["id"]
+
+    def receive(self, max_jobs: int = 10) -> list[tuple[str, dict]]:
+        out = []
+        with self._lock:
+            while self._pending and len(out) < max_jobs:
+                job = self._pending.popleft()
+                receipt = uuid.uuid4().hex
+                self._inflight[receipt] = job
+                out.append((receipt, job))
+        return out
+
+    def ack(self, receipt: str) -> None:
+        with self._lock:
+            self._inflight.pop(receipt, None)
+
+    def release(self, receipt: str, delay_seconds: int = 0, job: dict | None = None,
+                count_attempt: bool = True) -> None:
+        with self._lock:
+            inflight = self._inflight.pop(receipt, None)
+            if inflight is None:
+                return
+            job = job if job is not None else inflight
+            if count_attempt:
+                job["attempts"] = job.get("attempts", 0) + 1
+            if count_attempt and job["attempts"] >= self.max_receives:
+                self.dead_letters.append(job)
+            else:
+                self._pending.append(job)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+# -----------------------------
+# Archivos (pruebas locales entre procesos)
+# -----------------------------
+class FileEmailQueue(EmailQueue):
+    """Un JSON por trabajo en pending/, inflight/ y dead/. Los renames hacen el claim atómico."""
+
+    def __init__(self, path: str = EMAIL_QUEUE_PATH, max_receives: int = EMAIL_QUEUE_MAX_RECEIVES):
+        self.path = path
+        self.max_receives = max_receives
+        for d in ("pending", "inflight", "dead"):
+            os.makedirs(os.path.join(path, d), exist_ok=True)
+
+    def _p(self, state: str, name: str) -> str:
+        return os.path.join(self.path, state, name)
+
+    def enqueue(self, job: dict) -> str:
+        name = f"{time.time_ns()}-{job['id']}.json"
+        tmp = self._p("pending", f".{name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.rename(tmp, self._p("pending", name))
+        return job["id"]
+
+    def receive(self, max_jobs: int = 10) -> list[tuple[str, dict]]:
+        out = []
+        for name in sorted(os.listdir(os.path.join(self.path, "pending"))):
+            if len(out) >= max_jobs:
+                break
+            if name.startswith("."):
+                continue
+            try:
+                os.rename(self._p("pending", name), self._p("inflight", name))
+            except FileNotFoundError:
+                continue  # otro worker lo tomó primero
+            with open(self._p("inflight", name), encoding="utf-8") as f:
+                out.append((name, json.load(f)))
+        return out
+
+    def ack(self, receipt: str) -> None:
+        try:
+            os.remove(self._p("inflight", receipt))
+        except FileNotFoundError:
+            pass
+
+    def release(self, receipt: str, delay_seconds: int = 0, job: dict | None = None,
+                count_attempt: bool = True) -> None:
+        src = self._p("inflight", receipt)
+        try:
+            with open(src, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        job = job if job is not None else stored
+        if count_attempt:
+            job["attempts"] = job.get("attempts", 0) + 1
+        with open(src, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        state = "dead" if count_attempt and job["attempts"] >= self.max_receives else "pending"
+        os.rename(src, self._p(state, receipt))
+
+
+_queue: EmailQueue | None = None
+
+
+def get_queue() -> EmailQueue:
+    """Cola del contenedor según EMAIL_QUEUE_BACKEND (se crea una sola vez)."""
+    global _queue
+    if _queue is None:
+        if EMAIL_QUEUE_BACKEND == "memory":
+            _queue = MemoryEmailQueue()
+        elif EMAIL_QUEUE_BACKEND == "file":
+            _queue = FileEmailQueue()
+        else:
+            _queue = SqsEmailQueue(EMAIL_QUEUE_URL)
+    return _queue
+
+
+def set_queue(queue: EmailQueue | None) -> None:
+    """Permite inyectar un backend (pruebas locales / benchmarks)."""
+    global _queue
+    _queue = queue
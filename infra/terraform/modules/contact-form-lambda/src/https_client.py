@@ -0,0 +1,137 @@
+"""
+Cliente HTTPS keep-alive para llamadas repetidas al mismo host (reCAPTCHA siteverify).
+
+La conexión (DNS + TCP + TLS) se abre una vez por contenedor y se reutiliza entre
+invocaciones warm. Si el servidor la cerró mientras la Lambda estaba congelada,
+se detecta en el primer request y se reconecta de forma transparente.
+
+Acepta también URLs http:// para stand-ins locales (benchmarks), sin TLS.
+"""
+import http.client
+import ssl
+import threading
+import time
+import urllib.parse
+
+
+def _is_stale_error(e: Exception) -> bool:
+    """Errores que indican una conexión reutilizada ya muerta (seguro reintentar una vez)."""
+    if isinstance(e, TimeoutError):
+        return False
+    return isinstance(e, (http.client.HTTPException, OSError))
+
+
+class KeepAliveHttpsClient:
+    """Conexión HTTPS persistente a un solo origen, con métricas de connect vs reuse."""
+
+    def __init__(self, url: str, timeout: float = 5, ssl_context: ssl.SSLContext | None = None):
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.secure = parts.scheme != "http"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self._ssl_context = ssl_context or (ssl.create_default_context() if self.secure else None)
+        self._conn: http.client.HTTPConnection | None = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "connects": 0,
+            "reuses": 0,
+            "reconnects": 0,
+            "connect_ms_total": 0.0,
+            "reuse_ms_total": 0.0,
+            "last_connect_ms": None,
+            "last_request_ms": None,
+        }
+
+    def _open(self, timeout: float) -> float:
+        if self.secure:
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        t0 = time.perf_counter()
+        conn.connect()
+        elapsed = (time.perf_counter() - t0) * 1000
+        self._conn = conn
+        self._stats["last_connect_ms"] = round(elapsed, 3)
+        self._stats["connect_ms_total"] += elapsed
+        return elapsed
+
+    def warm(self, timeout: float | None = None) -> str:
+        """Abre la conexión sin mandar request (prewarm). Devuelve 'connected' o 'reused'."""
+        with self._lock:
+            if self._conn is not None and self._conn.sock is not None:
+                return "reused"
+            self._open(self.timeout if timeout is None else timeout)
+            self._stats["connects"] += 1
+            return "connected"
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _request(self, body: bytes, headers: dict, timeout: float) -> tuple[int, bytes]:
+        conn = self._conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        conn.request("POST", self.path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        if resp.will_close:
+            conn.close()
+            self._conn = None
+        return resp.status, data
+
+    def post_form(self, body: bytes, timeout: float | None = None) -> tuple[int, bytes]:
+        """POST application/x-www-form-urlencoded. Devuelve (status, body)."""
+        timeout = self.timeout if timeout is None else timeout
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Connection": "keep-alive",
+        }
+        with self._lock:
+            reused = self._conn is not None and self._conn.sock is not None
+            if not reused:
+                self._open(timeout)
+                self._stats["connects"] += 1
+
+            t0 = time.perf_counter()
+            try:
+                try:
+                    status, data = self._request(body, headers, timeout)
+                except Exception as e:
+                    if not (reused and _is_stale_error(e)):
+                        raise
+                    # Conexión vieja cerrada por el servidor: reconectar y reintentar una vez
+                    if self._conn is not None:
+                        self._conn.close()
+                    self._open(timeout)
+                    self._stats["reconnects"] += 1
+                    reused = False
+                    t0 = time.perf_counter()
+                    status, data = self._request(body, headers, timeout)
+            except Exception:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                raise
+
+            elapsed = (time.perf_counter() - t0) * 1000
+            self._stats["last_request_ms"] = round(elapsed, 3)
+            if reused:
+                self._stats["reuses"] += 1
+                self._stats["reuse_ms_total"] += elapsed
+            return status, data
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        s["connect_ms_total"] = round(s["connect_ms_total"], 3)
+        s["reuse_ms_total"] = round(s["reuse_ms_total"], 3)
+        opened = s["connects"] + s["reconnects"]
+        s["avg_connect_ms"] = round(s["connect_ms_total"] / opened, 3) if opened else None
+        s["avg_reuse_ms"] = round(s["reuse_ms_total"] / s["reuses"], 3) if s["reuses"] else None
+        return s
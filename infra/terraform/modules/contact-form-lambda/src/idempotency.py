@@ -0,0 +1,218 @@
+"""
+Idempotencia de envíos: los reintentos (Lambda o navegador) retoman solo las etapas pendientes.
+
+Cada envío tiene una clave: un hash del contenido (name/email/message/phone/projectType),
+combinado con la que manda el cliente (Idempotency-Key / idempotencyKey) si viene. Por
+clave se guarda qué etapas ya terminaron ("recaptcha", "vendor_send", "customer_send") con su resultado; una etapa
+cuenta como hecha solo dentro de la ventana (window_seconds).
+
+peek() lee las etapas sin escribir nada (el handler la usa antes de reCAPTCHA, así el
+tráfico sin verificar no crea registros); claim() toma un lease corto sobre la clave para
+que dos intentos simultáneos del mismo envío no corran a la vez, y devuelve las etapas ya
+completadas.
+
+Backends: DynamoDB (TTL en 'expires_at') o en memoria (por contenedor / pruebas; LRU con
+TTL y tope de entradas).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+STAGE_PREFIX = "stage_"
+
+
+def idempotency_key(client_key: str | None, name: str, email: str, message: str,
+                    phone: str = "", project_type: str = "") -> str:
+    """
+    Clave del envío: hash del contenido normalizado, junto con la clave del cliente si viene.
+    La clave del cliente sola no basta: un reintento con la misma clave y otro contenido
+    retomaría el registro anterior (sin reCAPTCHA, o devolviendo los resultados viejos).
+    """
+    fields = [str(name or "").strip(), str(email or "").strip().lower(), str(message or "").strip()]
+    if phone or project_type:
+        fields += [str(phone or "").strip(), str(project_type or "").strip()]
+    if client_key:
+        content = json.dumps([str(client_key).strip(), *fields], ensure_ascii=False)
+        return "client:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+    content = json.dumps(fields, ensure_ascii=False)
+    return "content:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _fresh_stages(stages: dict, window_seconds: float, now: float) -> dict:
+    """Filtra las etapas completadas dentro de la ventana -> {stage: result}."""
+    return {name: s["result"] for name, s in stages.items() if s.get("at", 0) > now - window_seconds}
+
+
+class MemoryIdempotencyStore:
+    """Backend en memoria (stand-in local de DynamoDB): LRU con TTL y como mucho max_entries claves."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _touch(self, key: str, now: float) -> dict:
+        item = self._items.get(key)
+        if item is None or item["expires_at"] <= now:
+            item = self._items[key] = {"stages": {}, "lease_until": 0.0, "expires_at": 0.0}
+        self._items.move_to_end(key)
+        return item
+
+    def _purge(self, now: float) -> None:
+        # Las claves se ordenan por último uso y todas usan la misma ventana: las vencidas van al frente
+        while self._items:
+            key, item = next(iter(self._items.items()))
+            if item["expires_at"] > now and len(self._items) <= self.max_entries:
+                break
+            del self._items[key]
+            if item["expires_at"] > now:
+                self.evictions += 1
+
+    def peek(self, key: str) -> dict:
+        """Etapas de la clave ({stage: {"result", "at"}}) sin tomar el lease ni crear el registro."""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item["expires_at"] <= now:
+                return {}
+            return dict(item["stages"])
+
+    def claim(self, key: str, lease_seconds: float, ttl_seconds: float) -> dict | None:
+        """Toma el lease. Devuelve {stage: {"result", "at"}} o None si otro intento lo tiene."""
+        now = time.time()
+        with self._lock:
+            item = self._touch(key, now)
+            if item["lease_until"] > now:
+                return None
+            item["lease_until"] = now + lease_seconds
+            item["expires_at"] = now + ttl_seconds
+            self._purge(now)
+            return dict(item["stages"])
+
+    def complete_stage(self, key: str, stage: str, result: dict, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            item = self._touch(key, now)
+            item["stages"][stage] = {"result": result, "at": now}
+            item["expires_at"] = now + ttl_seconds
+            self._purge(now)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                item["lease_until"] = 0.0
+
+
+class DynamoIdempotencyStore:
+    """
+    Backend en DynamoDB. Tabla con PK 'pk' (S) y TTL en 'expires_at' (N); cada etapa
+    es un atributo 'stage_<nombre>' con {"result", "at"} en JSON.
+    """
+
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def peek(self, key: str) -> dict:
+        item = self.client.get_item(TableName=self.table_name, Key={"pk": {"S": key}},
+                                    ConsistentRead=True).get("Item") or {}
+        if float(item.get("expires_at", {}).get("N", "0")) <= time.time():
+            return {}
+        return {k[len(STAGE_PREFIX):]: json.loads(v["S"]) for k, v in item.items() if k.startswith(STAGE_PREFIX)}
+
+    def claim(self, key: str, lease_seconds: float, ttl_seconds: float) -> dict | None:
+        from botocore.exceptions import ClientError
+        now = time.time()
+        try:
+            resp = self.client.update_item(
+                TableName=self.table_name,
+                Key={"pk": {"S": key}},
+                UpdateExpression="SET lease_until = :lease, expires_at = :exp",
+                ConditionExpression="attribute_not_exists(lease_until) OR lease_until < :now",
+                ExpressionAttributeValues={
+                    ":lease": {"N": repr(now + lease_seconds)},
+                    ":exp": {"N": str(int(now + ttl_seconds))},
+                    ":now": {"N": repr(now)},
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        item = resp.get("Attributes", {})
+        return {k[len(STAGE_PREFIX):]: json.loads(v["S"]) for k, v in item.items() if k.startswith(STAGE_PREFIX)}
+
+    def complete_stage(self, key: str, stage: str, result: dict, ttl_seconds: float) -> None:
+        now = time.time()
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": key}},
+            UpdateExpression="SET #stage = :stage, expires_at = :exp",
+            ExpressionAttributeNames={"#stage": STAGE_PREFIX + stage},
+            ExpressionAttributeValues={
+                ":stage": {"S": json.dumps({"result": result, "at": now})},
+                ":exp": {"N": str(int(now + ttl_seconds))},
+            },
+        )
+
+    def release(self, key: str) -> None:
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": key}},
+            UpdateExpression="REMOVE lease_until",
+        )
+
+
+class IdempotencyGuard:
+    """
+    Fachada sobre el backend: claim() -> etapas completadas (dict) o None si hay
+    otro intento en curso. Si el backend falla, se sigue sin idempotencia (fail-open).
+    """
+
+    def __init__(self, store, window_seconds: float = 900, lease_seconds: float = 30):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.lease_seconds = lease_seconds
+
+    def peek(self, key: str) -> dict:
+        """Etapas completadas dentro de la ventana, sin escribir ({} si el backend falla)."""
+        try:
+            stages = self.store.peek(key)
+        except Exception as e:
+            print("Idempotency store error:", repr(e))
+            return {}
+        return _fresh_stages(stages, self.window_seconds, time.time())
+
+    def claim(self, key: str) -> dict | None:
+        try:
+            stages = self.store.claim(key, self.lease_seconds, self.window_seconds)
+        except Exception as e:
+            print("Idempotency store error:", repr(e))
+            return {}
+        if stages is None:
+            return None
+        return _fresh_stages(stages, self.window_seconds, time.time())
+
+    def complete(self, key: str, stage: str, result: dict) -> None:
+        try:
+            self.store.complete_stage(key, stage, result, self.window_seconds)
+        except Exception as e:
+            print("Idempotency store error:", repr(e))
+
+    def release(self, key: str) -> None:
+        try:
+            self.store.release(key)
+        except Exception as e:
+            print("Idempotency store error:", repr(e))
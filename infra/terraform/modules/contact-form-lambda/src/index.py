@@ -1,50 +1,143 @@
 import json
+import math
 import os
+import time
 import urllib.parse
-import urllib.request
 import socket
-import boto3
-from botocore.exceptions import ClientError
-import smtplib
-from email.message import EmailMessage
 
-# Opcional: reducir tiempos de espera en sockets (evita Lambdas colgadas)
+# Solo módulos ligeros a nivel de import: boto3, smtplib, email, ssl y el pool de hilos
+# se cargan bajo demanda para que honeypot/preflight no paguen su costo en el cold start
+import config
+import idempotency
+import rate_limiter
+import token_cache
+from orbit_shared import capture, circuit_breaker, deadline, emf, prewarm, recipient_check, request_schema, secrets, tracing
+
+# Red de seguridad para sockets sin timeout propio; las llamadas salientes usan el
+# presupuesto de la request (orbit_shared.deadline)
 socket.setdefaulttimeout(5)
 
-RECAPTCHA_VERIFY_URL = "https://www.google.com/recaptcha/api/siteverify"
-RECAPTCHA_SECRET = os.getenv("RECAPTCHA_SECRET", "")
 # Nombre o ARN de la Lambda que envía emails (debe existir) -> para el vendor
 EMAIL_DISPATCHER_FUNCTION_NAME = os.getenv("EMAIL_DISPATCHER_FUNCTION_NAME", "")
 
-# Cliente Lambda para invocar la función de envío de emails (vendor)
-lambda_client = boto3.client("lambda")
-
-
-def _response(status: int, body: dict):
-    """HTTP API v2 response helper."""
+# Transporte de la notificación al vendor:
+#   "invoke"    -> Lambda email-dispatcher síncrona (RequestResponse)
+#   "event"     -> Lambda email-dispatcher asíncrona (Event, no espera el envío)
+#   "inprocess" -> SES directo desde esta Lambda con orbit_shared.ses_sender (sin salto Lambda)
+DISPATCH_TRANSPORT = os.getenv("DISPATCH_TRANSPORT", "invoke").strip().lower()
+# Config SES del modo inprocess (VENDOR_EMAIL lo lee ses_sender al resolver el destinatario)
+SES_REGION = os.getenv("SES_REGION", "us-east-1")
+SES_FROM_EMAIL = os.getenv("SES_FROM_EMAIL", "")
+
+# Modo async-accept: responder 202 tras validar y delegar los envíos a worker.py
+ASYNC_ACCEPT = os.getenv("ASYNC_ACCEPT", "false").lower() in ("1", "true", "yes")
+
+# Namespace de las métricas EMF (CloudWatch)
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "Orbit/ContactForm")
+
+# Circuit breakers: una llamada más lenta que esto (ms) cuenta como lenta para abrir el circuito
+RECAPTCHA_SLOW_CALL_MS = float(os.getenv("RECAPTCHA_SLOW_CALL_MS", "2000"))
+DISPATCHER_SLOW_CALL_MS = float(os.getenv("DISPATCHER_SLOW_CALL_MS", "3000"))
+SMTP_SLOW_CALL_MS = float(os.getenv("SMTP_SLOW_CALL_MS", "5000"))
+
+# Timeouts máximos por llamada (s); cada llamada usa el menor entre esto y lo que queda
+# del presupuesto de la request (context.get_remaining_time_in_millis() - DEADLINE_RESERVE_MS)
+RECAPTCHA_TIMEOUT_SECONDS = float(os.getenv("RECAPTCHA_TIMEOUT_SECONDS", "5"))
+DISPATCHER_TIMEOUT_SECONDS = float(os.getenv("DISPATCHER_TIMEOUT_SECONDS", "8"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+
+# Plazo único (segundos) para el envío en paralelo vendor + ack al cliente. Los timeouts de
+# SMTP y del invoke se acotan a este plazo: un envío no sigue corriendo después de la espera
+FANOUT_DEADLINE_SECONDS = float(os.getenv("FANOUT_DEADLINE_SECONDS", "8"))
+DISPATCHER_CONNECT_TIMEOUT_SECONDS = 2
+
+# Config tipada (reCAPTCHA, Zoho SMTP) leída una vez por contenedor
+settings = config.settings
+
+# Secretos (RECAPTCHA_SECRET, ZOHO_SMTP_PASS): primera carga en el init, luego caché con
+# refresco en segundo plano (SECRETS_BACKEND / SECRETS_ID / SECRETS_TTL_SECONDS)
+_secrets = secrets.create_store(config.SECRET_NAMES)
+
+# Cliente Lambda para invocar la función de envío de emails (vendor); se crea al primer uso
+lambda_client = None
+
+# Cliente sesv2 del modo inprocess; se crea al primer uso
+ses_client = None
+
+# Plantillas del ack al cliente, compiladas una vez por contenedor (al primer uso)
+_ack_renderer = None
+
+# Pool reutilizado entre invocaciones warm para el fan-out de envíos (al primer uso)
+_fanout_executor = None
+
+
+def _get_lambda_client():
+    global lambda_client
+    if lambda_client is None:
+        import boto3
+        from botocore.config import Config
+        # Sin reintentos de boto: un read timeout reintentado duplicaría el email al vendor.
+        # El read timeout del cliente es fijo: connect + read caben en el plazo del fan-out
+        read_timeout = max(0.5, min(DISPATCHER_TIMEOUT_SECONDS,
+                                    FANOUT_DEADLINE_SECONDS - DISPATCHER_CONNECT_TIMEOUT_SECONDS))
+        config = Config(connect_timeout=DISPATCHER_CONNECT_TIMEOUT_SECONDS, read_timeout=read_timeout,
+                        retries={"max_attempts": 1, "mode": "standard"})
+        lambda_client = boto3.client("lambda", config=config)
+    return lambda_client
+
+
+def _get_ses_client():
+    global ses_client
+    if ses_client is None:
+        from orbit_shared import ses_sender
+        ses_client = ses_sender.new_client(SES_REGION)
+    return ses_client
+
+
+def _get_ack_renderer():
+    global _ack_renderer
+    if _ack_renderer is None:
+        import ack_renderer
+        _ack_renderer = ack_renderer.AckRenderer()
+    return _ack_renderer
+
+
+def _get_fanout_executor():
+    global _fanout_executor
+    if _fanout_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _fanout_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fanout")
+    return _fanout_executor
+
+
+def _response(status: int, body: dict, headers: dict | None = None):
+    """HTTP API v2 response helper. Registra el resultado en las métricas de la request."""
+    if status >= 500:
+        emf.current().set_outcome("error", body.get("stage") or body.get("error"))
+    elif status >= 400:
+        emf.current().set_outcome("rejected", body.get("error"))
+    else:
+        emf.current().set_outcome("accepted" if status == 202 else "ok")
     return {
         "statusCode": status,
         "headers": {
-            "Content-Type": "application/json; charset=utf-8"
+            "Content-Type": "application/json; charset=utf-8",
+            **(headers or {})
         },
         "body": json.dumps(body, ensure_ascii=False)
     }
 
 
-def _parse_event_body(event):
-    """Extrae el JSON del body (HTTP API v2). Maneja base64 si aplica."""
-    if "body" not in event or event["body"] in (None, ""):
-        return None
+def _elapsed_ms(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000
 
-    body_raw = event["body"]
-    if event.get("isBase64Encoded"):
-        import base64
-        body_raw = base64.b64decode(body_raw).decode("utf-8", errors="replace")
 
-    try:
-        return json.loads(body_raw)
-    except json.JSONDecodeError:
-        return None
+def _parse_event_body(event):
+    """
+    Extrae el JSON del body (HTTP API v2), con base64 si aplica, con límite de tamaño
+    antes de decodificar. Devuelve (body, None) o (None, code): missing / too_large / invalid_json.
+    """
+    return request_schema.decode_body(event)
 
 
 def _get_remote_ip(event) -> str | None:
@@ -56,32 +149,117 @@ def _get_remote_ip(event) -> str | None:
     )
 
 
+# Anti-replay de tokens: ventana de challenge_ts (120 s) y tabla DynamoDB opcional
+RECAPTCHA_REPLAY_TTL_SECONDS = float(os.getenv("RECAPTCHA_REPLAY_TTL_SECONDS", "120"))
+RECAPTCHA_REPLAY_MAX_ENTRIES = int(os.getenv("RECAPTCHA_REPLAY_MAX_ENTRIES", "10000"))
+RECAPTCHA_REPLAY_TABLE = os.getenv("RECAPTCHA_REPLAY_TABLE", "")
+
+_token_replay_cache = token_cache.TokenReplayCache(
+    ttl_seconds=RECAPTCHA_REPLAY_TTL_SECONDS,
+    max_entries=RECAPTCHA_REPLAY_MAX_ENTRIES,
+    shared=token_cache.DynamoTokenStore(RECAPTCHA_REPLAY_TABLE) if RECAPTCHA_REPLAY_TABLE else None,
+)
+
+# Rate limiting (token bucket) por IP y global, antes de cualquier llamada externa.
+# Un rate en 0 desactiva ese ámbito; RATE_LIMIT_TABLE comparte los buckets entre contenedores.
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "6"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "3"))
+RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "2"))
+RATE_LIMIT_GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "20"))
+RATE_LIMIT_TABLE = os.getenv("RATE_LIMIT_TABLE", "")
+
+_rate_limiter = rate_limiter.RateLimiter(
+    ip_rate_per_min=RATE_LIMIT_IP_PER_MINUTE,
+    ip_burst=RATE_LIMIT_IP_BURST,
+    global_rate_per_sec=RATE_LIMIT_GLOBAL_PER_SECOND,
+    global_burst=RATE_LIMIT_GLOBAL_BURST,
+    shared=rate_limiter.DynamoBucketStore(RATE_LIMIT_TABLE) if RATE_LIMIT_TABLE else None,
+)
+
+# Idempotencia: ventana en la que un reintento retoma solo las etapas pendientes y
+# lease contra intentos simultáneos del mismo envío. Sin IDEMPOTENCY_TABLE, el registro es por contenedor.
+IDEMPOTENCY_WINDOW_SECONDS = float(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "900"))
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "30"))
+IDEMPOTENCY_TABLE = os.getenv("IDEMPOTENCY_TABLE", "")
+# Tope de claves del registro en memoria (sin IDEMPOTENCY_TABLE); las más viejas se descartan
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+_idempotency = idempotency.IdempotencyGuard(
+    idempotency.DynamoIdempotencyStore(IDEMPOTENCY_TABLE) if IDEMPOTENCY_TABLE
+    else idempotency.MemoryIdempotencyStore(max_entries=IDEMPOTENCY_MAX_ENTRIES),
+    window_seconds=IDEMPOTENCY_WINDOW_SECONDS,
+    lease_seconds=IDEMPOTENCY_LEASE_SECONDS,
+)
+
+# Conexión keep-alive a siteverify, reutilizada entre invocaciones warm
+_recaptcha_client = None
+
+
+def _get_recaptcha_client():
+    global _recaptcha_client
+    if _recaptcha_client is None:
+        import https_client
+        _recaptcha_client = https_client.KeepAliveHttpsClient(settings.recaptcha.verify_url,
+                                                              timeout=RECAPTCHA_TIMEOUT_SECONDS)
+    return _recaptcha_client
+
+
 def verify_recaptcha(token: str, remoteip: str | None = None) -> tuple[bool, dict]:
     """Valida el token de reCAPTCHA con Google."""
-    if not RECAPTCHA_SECRET:
-        return False, {"error": "RECAPTCHA_SECRET not configured in environment"}
+    recaptcha_secret = _secrets.get("RECAPTCHA_SECRET")
+    if not recaptcha_secret:
+        return False, {"error": f"RECAPTCHA_SECRET not configured ({_secrets.backend})"}
+
+    # Sin presupuesto no se marca el token como usado (DeadlineExceeded sube al handler)
+    timeout = deadline.current().timeout("recaptcha_verify", RECAPTCHA_TIMEOUT_SECONDS, minimum=0.2)
+
+    # Token repetido (doble click / reintento): Google lo rechazaría como duplicado
+    if _token_replay_cache.seen(token):
+        emf.current().increment("recaptcha_replay_hits")
+        return False, {"success": False, "error-codes": ["timeout-or-duplicate"], "cached": True}
 
     data = {
-        "secret": RECAPTCHA_SECRET,
+        "secret": recaptcha_secret,
         "response": token
     }
     if remoteip:
         data["remoteip"] = remoteip
 
     encoded = urllib.parse.urlencode(data).encode("utf-8")
-    req = urllib.request.Request(
-        RECAPTCHA_VERIFY_URL,
-        data=encoded,
-        headers={"Content-Type": "application/x-www-form-urlencoded"}
-    )
 
+    # Google degradado: fallar rápido en vez de esperar el timeout (el token sigue sin usar)
+    breaker = circuit_breaker.get("recaptcha", slow_call_ms=RECAPTCHA_SLOW_CALL_MS)
+    if not breaker.allow():
+        _token_replay_cache.forget(token)
+        return False, {"error": "circuit_open", "dependency": "recaptcha",
+                       "retry_after_seconds": breaker.retry_after()}
+
+    t0 = time.perf_counter()
+    try:
+        client = _get_recaptcha_client()
+        status, raw = client.post_form(encoded, timeout=timeout)
+    except Exception as e:
+        # Google no emitió veredicto: el token sigue siendo válido para un reintento
+        breaker.record(False, _elapsed_ms(t0))
+        _token_replay_cache.forget(token)
+        return False, {"error": f"recaptcha_verification_failed: {e.__class__.__name__}: {e}"}
+    breaker.record(status < 500, _elapsed_ms(t0))
+
+    emf.current().put_property("recaptcha_http", client.stats())
+    emf.current().put_property("recaptcha_replay_cache", _token_replay_cache.stats())
+    if status != 200:
+        _token_replay_cache.forget(token)
+        return False, {"error": f"recaptcha_verification_failed: HTTP {status}"}
     try:
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-            ok = bool(payload.get("success", False))
-            return ok, payload
+        payload = json.loads(raw.decode("utf-8"))
     except Exception as e:
+        _token_replay_cache.forget(token)
         return False, {"error": f"recaptcha_verification_failed: {e.__class__.__name__}: {e}"}
+    if "invalid-input-secret" in (payload.get("error-codes") or []):
+        # Secreto rechazado por Google (rotado): releer el store en segundo plano
+        _secrets.invalidate()
+    ok = bool(payload.get("success", False))
+    return ok, payload
 
 
 def _invoke_email_dispatcher(payload: dict, invocation_type: str = "RequestResponse", timeout_seconds: int = 10) -> dict:
@@ -92,12 +270,28 @@ def _invoke_email_dispatcher(payload: dict, invocation_type: str = "RequestRespo
     if not EMAIL_DISPATCHER_FUNCTION_NAME:
         return {"error": "EMAIL_DISPATCHER_FUNCTION_NAME not configured"}
 
+    from botocore.exceptions import ClientError
+
+    # El read timeout del cliente es fijo: se exige al menos un margen razonable; el
+    # fan-out deja de esperar al agotarse el presupuesto
+    deadline.current().check("dispatcher_invoke", minimum=0.5)
+
+    breaker = circuit_breaker.get("email_dispatcher", slow_call_ms=DISPATCHER_SLOW_CALL_MS)
+    if not breaker.allow():
+        return {"error": "dispatcher_circuit_open", "retry_after_seconds": breaker.retry_after()}
+
+    resp = None
+    t0 = time.perf_counter()
     try:
-        resp = lambda_client.invoke(
-            FunctionName=EMAIL_DISPATCHER_FUNCTION_NAME,
-            InvocationType=invocation_type,
-            Payload=json.dumps(payload).encode("utf-8")
-        )
+        with emf.stage("dispatcher_invoke"):
+            # El contexto va dentro de la etapa: el span raíz del dispatcher cuelga de dispatcher_invoke
+            resp = _get_lambda_client().invoke(
+                FunctionName=EMAIL_DISPATCHER_FUNCTION_NAME,
+                InvocationType=invocation_type,
+                Payload=json.dumps(tracing.inject(payload)).encode("utf-8")
+            )
+        # FunctionError = excepción no manejada dentro del dispatcher
+        breaker.record(not resp.get("FunctionError"), _elapsed_ms(t0))
 
         # Si es invocación asíncrona, AWS devuelve 202 y payload vacío
         if invocation_type == "Event":
@@ -114,6 +308,9 @@ def _invoke_email_dispatcher(payload: dict, invocation_type: str = "RequestRespo
         except Exception:
             parsed = {"raw": raw}
 
+        if resp.get("FunctionError"):
+            return {"error": "dispatcher_function_error", "detail": parsed}
+
         # Si la función que llamaste devuelve un cuerpo HTTP (por ejemplo _api_response),
         # puede venir como string con keys statusCode/body -> intentamos extraer body si existe
         if isinstance(parsed, dict) and "statusCode" in parsed and "body" in parsed:
@@ -126,24 +323,49 @@ def _invoke_email_dispatcher(payload: dict, invocation_type: str = "RequestRespo
         return parsed
 
     except ClientError as e:
+        if resp is None:
+            breaker.record(False, _elapsed_ms(t0))
         return {"error": "lambda_invoke_client_error", "detail": str(e)}
     except Exception as e:
+        if resp is None:
+            breaker.record(False, _elapsed_ms(t0))
         return {"error": "lambda_invoke_error", "detail": f"{e.__class__.__name__}: {e}"}
 
-def _send_customer_ack_via_zoho(to_email: str, name: str, project_type: str, message: str) -> dict:
+def _dispatch_vendor_email(payload: dict) -> dict:
+    """
+    Envía la notificación al vendor por DISPATCH_TRANSPORT. Devuelve el mismo contrato
+    que la invocación directa del dispatcher: {"ok": True, ...} o {"error": ...}.
     """
-    Envía un correo de agradecimiento al cliente usando Zoho SMTP con plantilla HTML.
+    if DISPATCH_TRANSPORT == "inprocess":
+        from orbit_shared import ses_sender
+        try:
+            with emf.stage("dispatcher_inprocess"):
+                return ses_sender.send_templated_email(payload, _get_ses_client, SES_FROM_EMAIL)
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            return {"error": "ses_inprocess_error", "detail": f"{e.__class__.__name__}: {e}"}
+    if DISPATCH_TRANSPORT == "event":
+        return _invoke_email_dispatcher(payload, "Event")
+    return _invoke_email_dispatcher(payload, "RequestResponse")
+
+
+def _send_customer_ack_via_zoho(to_email: str, name: str, project_type: str, message: str,
+                                locale: str | None = None) -> dict:
+    """
+    Envía un correo de agradecimiento al cliente usando Zoho SMTP con plantilla HTML
+    en el idioma de la solicitud (es/en).
     """
     if not to_email:
         return {"ok": False, "error": "missing_recipient_email"}
+    # Trabajos de la cola encolados antes del check del handler (en caché: sin consulta)
+    recipient = recipient_check.check(to_email)
+    if recipient.get("error"):
+        return {"ok": False, "error": "invalid_recipient_email", "detail": recipient["reason"]}
 
-    host = os.getenv("ZOHO_SMTP_HOST", "smtp.zoho.com")
-    port = int(os.getenv("ZOHO_SMTP_PORT", "465"))
-    user = os.getenv("ZOHO_SMTP_USER", "admin@orbit.com.mx")
-    password = os.getenv("ZOHO_SMTP_PASS", "")
-
-    from_email = os.getenv("ZOHO_FROM_EMAIL", user)
-    from_name = os.getenv("ZOHO_FROM_NAME", "Orbit Studio")
+    smtp = settings.smtp
+    host, port, user, from_email, from_name = smtp.host, smtp.port, smtp.user, smtp.from_email, smtp.from_name
+    password = _secrets.get("ZOHO_SMTP_PASS")
 
     if not user or not password or not from_email:
         return {
@@ -156,204 +378,52 @@ def _send_customer_ack_via_zoho(to_email: str, name: str, project_type: str, mes
             }
         }
 
-    # 🔥 Plantilla HTML (tu código tal cual)
-    html = f"""
-<!doctype html>
-<html>
-  <head>
-    <meta charset="UTF-8" />
-    <title>Orbit — Gracias por contactarnos</title>
-
-    <!-- Dejamos que el cliente aplique light/dark -->
-    <meta name="color-scheme" content="light dark">
-    <meta name="supported-color-schemes" content="light dark">
-
-  </head>
-  <body style="
-    margin:0;
-    padding:0;
-    background-color:#f2f4fa;
-    font-family:Inter, system-ui, -apple-system, 'Segoe UI', Roboto, Arial, sans-serif;
-  ">
-    <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color:#f2f4fa; padding:24px 0;">
-      <tr>
-        <td align="center">
-          <!-- Card principal -->
-          <table width="100%" cellpadding="0" cellspacing="0" border="0" style="
-            max-width:540px;
-            background-color:#ffffff;
-            border-radius:14px;
-            overflow:hidden;
-            box-shadow:0 18px 45px rgba(0,0,0,0.08);
-          ">
-
-            <tr>
-              <td>
-                <!-- Barra superior con gradiente (clara) -->
-                <div style="
-                  width:100%;
-                  height:4px;
-                  background:linear-gradient(135deg,#8a5fd3 0%, #6c7df0 100%);
-                "></div>
-              </td>
-            </tr>
-
-            <tr>
-              <td style="padding:28px 32px 24px 32px; text-align:center;">            
-                <!-- Logo Orbit -->
-                <img 
-                  src="https://www.orbit.com.mx/img/logos/orbit-color.png"
-                  alt="Orbit" 
-                  width="120"
-                  style="display:block; margin:0 auto 16px auto;"
-                />
-
-                <!-- Título -->
-                <h2 style="
-                  margin:0 0 12px 0;
-                  color:#1f2937;
-                  font-size:22px;
-                  font-weight:700;
-                  letter-spacing:-0.03em;
-                ">
-                  ¡Gracias por contactarnos!
-                </h2>
-
-                <!-- Texto principal -->
-                <p style="
-                  margin:0 0 8px 0;
-                  color:#4b5563;
-                  font-size:14px;
-                  line-height:1.6;
-                ">
-                  Hemos recibido tu mensaje correctamente. Nuestro equipo lo revisará
-                  y te responderá a la brevedad.
-                </p>
-
-                <p style="
-                  margin:0 0 16px 0;
-                  color:#4b5563;
-                  font-size:14px;
-                  line-height:1.6;
-                ">
-                  Si necesitas algo adicional, por favor escríbenos a 
-                  <b style="color:#1f2937;">contacto@orbit.com.mx</b>.
-                </p>
-
-                <!-- Botón / CTA -->
-                <a
-                  href="https://www.orbit.com.mx"
-                  style="
-                    display:inline-block;
-                    margin-top:4px;
-                    padding:10px 22px;
-                    border-radius:999px;
-                    background:linear-gradient(135deg,#7d3fb9 0%, #5d5fe9 100%);
-                    color:#ffffff;
-                    font-size:14px;
-                    font-weight:600;
-                    text-decoration:none;
-                  "
-                >
-                  Visitar orbit.com.mx
-                </a>
-
-                <!-- Firma -->
-                <p style="
-                  margin:20px 0 0 0;
-                  color:#6b7280;
-                  font-size:13px;
-                  line-height:1.6;
-                ">
-                  Atentamente,<br/>
-                  <strong style="color:#1f2937;">Equipo Orbit</strong>
-                </p>
-              </td>
-            </tr>
-
-            <!-- Separador -->
-            <tr>
-              <td style="padding:0 32px;">
-                <hr style="
-                  border:none;
-                  border-top:1px solid rgba(0,0,0,0.08);
-                  margin:12px 0 0 0;
-                " />
-              </td>
-            </tr>
-
-            <!-- Footer -->
-            <tr>
-              <td style="padding:10px 32px 18px 32px; text-align:center;">
-                <small style="
-                  color:#9ca3af;
-                  font-size:11px;
-                  line-height:1.4;
-                ">
-                  © 2025 Orbit. Todos los derechos reservados.
-                </small>
-              </td>
-            </tr>
-
-          </table>
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>
-    """
+    # Mensaje pre-renderizado: plantillas compiladas y cuerpo MIME cacheado por locale
+    try:
+        raw = _get_ack_renderer().render(locale, from_name, from_email, to_email)
+    except ValueError as e:
+        return {"ok": False, "error": "invalid_recipient_email", "detail": str(e)}
 
-    # Configurar email
-    from email.message import EmailMessage
-    msg = EmailMessage()
-    msg["Subject"] = "¡Gracias por contactarnos!"
-    msg["From"] = f"{from_name} <{from_email}>"
-    msg["To"] = to_email
+    # El timeout aplica a cada operación del socket (connect, login, NOOP, DATA)
+    timeout = deadline.current().timeout("smtp_send", SMTP_TIMEOUT_SECONDS, minimum=0.5)
 
-    # Ponemos HTML como cuerpo principal
-    msg.set_content("Tu cliente no soporta HTML.")  # fallback
-    msg.add_alternative(html, subtype="html")
+    # Zoho degradado: fallar rápido en vez de esperar el timeout SMTP
+    breaker = circuit_breaker.get("zoho_smtp", slow_call_ms=SMTP_SLOW_CALL_MS)
+    if not breaker.allow():
+        return {"ok": False, "error": "zoho_smtp_circuit_open", "retry_after_seconds": breaker.retry_after()}
 
+    t0 = time.perf_counter()
     try:
-        import smtplib
-        with smtplib.SMTP_SSL(host, port, timeout=10) as server:
-            server.login(user, password)
-            server.send_message(msg)
+        # Sesión SMTP persistente: se reutiliza entre invocaciones warm
+        import smtp_session
+        session = smtp_session.get_session(host, port, user, password, timeout=timeout)
+        mode = session.sendmail(from_email, [to_email], raw)
+        breaker.record(True, _elapsed_ms(t0))
+        emf.current().put_property("smtp_session", {"mode": mode, **session.stats()})
 
-        return {"ok": True, "transport": "zoho_smtp", "host": host, "port": port}
+        return {"ok": True, "transport": "zoho_smtp", "host": host, "port": port, "session": mode}
 
     except Exception as e:
+        # Un destinatario rechazado es problema del mensaje, no de Zoho
+        import smtplib
+        breaker.record(isinstance(e, smtplib.SMTPRecipientsRefused), _elapsed_ms(t0))
+        if isinstance(e, smtplib.SMTPAuthenticationError):
+            # Contraseña rotada: la próxima sesión se arma con el valor nuevo del store
+            _secrets.invalidate()
         return {
             "ok": False,
             "error": "zoho_smtp_send_failed",
             "detail": f"{e.__class__.__name__}: {e}"
         }
 
-def handler(event, context):
-    # 1) Parseo del body
-    body = _parse_event_body(event)
-    if body is None:
-        return _response(400, {"ok": False, "error": "Invalid or empty JSON body"})
-
-    # 2) Honeypot: _hp debe venir vacío
-    hp = body.get("_hp", "")
-    if hp != "":
-        return _response(400, {"ok": False, "error": "honeypot_triggered"})
-
-    # 3) Token de reCAPTCHA
-    token = body.get("recaptchaToken")
-    if not token or not isinstance(token, str):
-        return _response(400, {"ok": False, "error": "missing recaptchaToken"})
-
-    remote_ip = _get_remote_ip(event)
-    valid, details = verify_recaptcha(token, remoteip=remote_ip)
-    if not valid:
-        return _response(400, {"ok": False, "error": "invalid_recaptcha", "details": details})
-
-    # ---- Validación avanzada reCAPTCHA v3 ----
-    expected_action = os.getenv("RECAPTCHA_EXPECTED_ACTION", "contact_form_submit")
-    expected_host = os.getenv("RECAPTCHA_EXPECTED_HOSTNAME", "www.orbit.com.mx")
-    min_score = float(os.getenv("RECAPTCHA_MIN_SCORE", "0.5"))  # valor recomendado 0.5
+def _validate_recaptcha_details(details: dict):
+    """
+    Validación avanzada reCAPTCHA v3 (acción, score, hostname, antigüedad del token).
+    Devuelve la respuesta 400 si algo no cuadra, o None si todo está bien.
+    """
+    expected_action = settings.recaptcha.expected_action
+    expected_host = settings.recaptcha.expected_hostname
+    min_score = settings.recaptcha.min_score
 
     # 1️⃣ Acción
     action = details.get("action")
@@ -405,12 +475,284 @@ def handler(event, context):
             "details": {"exception": f"{e.__class__.__name__}: {e}"}
         })
 
+    return None
+
+
+def _fan_out_sends(vendor_payload: dict, email: str, name: str, project_type: str, message: str,
+                   locale: str | None = None,
+                   deadline_seconds: float = FANOUT_DEADLINE_SECONDS,
+                   completed: dict | None = None) -> tuple[dict, dict]:
+    """
+    Envía en paralelo la notificación al vendor (dispatcher) y el ack al cliente (Zoho),
+    con un solo plazo para ambos (acotado por el presupuesto de la request).
+    Devuelve (vendor_result, customer_result). Las etapas en `completed` ({"vendor_send": result, ...}) no se reenvían: se devuelve su resultado.
+    Una etapa que no terminó en el plazo y sigue en la cola del executor se cancela y vuelve como
+    deadline_exceeded con "not_started" (reintentable: no se registra). Si ya había empezado vuelve
+    con "maybe_sent": el dispatcher o Zoho pueden haberlo entregado, así que no debe reenviarse a ciegas.
+    """
+    from concurrent.futures import wait
+
+    completed = completed or {}
+    executor = _get_fanout_executor()
+    # Los timeouts que piden los envíos (SMTP, invoke) salen de este plazo, no del de la request
+    fanout_deadline = deadline.current().sub(deadline_seconds)
+    wait_seconds = fanout_deadline.remaining()
+    # run_in_context: los hilos heredan las métricas de la request
+    vendor_future = customer_future = None
+    if "vendor_send" not in completed:
+        vendor_future = executor.submit(emf.run_in_context(deadline.run_within, fanout_deadline,
+                                                           _dispatch_vendor_email, vendor_payload))
+    if "customer_send" not in completed:
+        customer_future = executor.submit(emf.run_in_context(deadline.run_within, fanout_deadline,
+                                                             _send_customer_ack_via_zoho, email, name,
+                                                             project_type, message, locale))
+
+    wait([f for f in (vendor_future, customer_future) if f is not None], timeout=wait_seconds)
+
+    def _result(future, stage: str) -> dict:
+        if future is None:
+            emf.current().increment("idempotent_skipped_stages")
+            return completed[stage]
+        if not future.done() and future.cancel():
+            # Seguía en la cola del executor: el envío nunca empezó, el reintento lo manda
+            emf.current().increment("fanout_cancelled_sends")
+            return {"ok": False, "error": "deadline_exceeded", "stage": stage, "remaining_ms": 0,
+                    "not_started": True, "retryable": True}
+        if not future.done():
+            emf.current().increment("fanout_unconfirmed_sends")
+            if wait_seconds < deadline_seconds:
+                return {"ok": False, "error": "deadline_exceeded", "stage": stage, "remaining_ms": 0,
+                        "maybe_sent": True}
+            return {"ok": False, "error": f"{stage}_timeout", "stage": stage, "deadline_seconds": deadline_seconds,
+                    "maybe_sent": True}
+        try:
+            return future.result()
+        except deadline.DeadlineExceeded as e:
+            return {"ok": False, **e.to_result()}
+        except Exception as e:
+            return {"ok": False, "error": f"{stage}_error", "detail": f"{e.__class__.__name__}: {e}"}
+
+    return _result(vendor_future, "vendor_send"), _result(customer_future, "customer_send")
+
+
+def _with_vendor_delivered(vendor_payload: dict, completed: dict) -> dict:
+    """El payload del vendor con "_delivered" (destinatarios que ya recibieron) si hubo entrega parcial."""
+    delivered = (completed.get("vendor_delivered") or {}).get("delivered")
+    if "vendor_send" in completed or not delivered:
+        return vendor_payload
+    return {**vendor_payload, "_delivered": delivered}
+
+
+def _vendor_delivered_stage(vendor_result: dict, completed: dict) -> dict | None:
+    """
+    Etapa "vendor_delivered" a registrar tras una entrega parcial del dispatcher
+    ({"delivered": [...]}), o None si no hay destinatarios nuevos que recordar.
+    """
+    delivered = vendor_result.get("delivered")
+    if not vendor_result.get("error") or vendor_result.get("maybe_sent") or not delivered:
+        return None
+    if set(delivered) <= set((completed.get("vendor_delivered") or {}).get("delivered") or ()):
+        return None
+    return {"delivered": delivered}
+
+
+def _run_sends(idem_key: str, completed: dict, vendor_payload: dict, email: str, name: str,
+               project_type: str, message: str, locale: str | None = None) -> tuple[dict, dict]:
+    """
+    Fan-out de las etapas pendientes del envío; registra en el store las que terminan bien y
+    también las "maybe_sent" (sin confirmar): un reintento no las vuelve a mandar.
+    Si el dispatcher entregó solo a parte de los destinatarios de las rutas, los que ya
+    recibieron quedan en "vendor_delivered" y el reintento se los pasa en "_delivered".
+    """
+    vendor_payload = _with_vendor_delivered(vendor_payload, completed)
+    vendor_result, customer_result = _fan_out_sends(vendor_payload, email, name, project_type, message,
+                                                    locale, completed=completed)
+    if "vendor_send" not in completed and (not vendor_result.get("error") or vendor_result.get("maybe_sent")):
+        _idempotency.complete(idem_key, "vendor_send", vendor_result)
+    vendor_delivered = _vendor_delivered_stage(vendor_result, completed)
+    if vendor_delivered is not None:
+        _idempotency.complete(idem_key, "vendor_delivered", vendor_delivered)
+    if "customer_send" not in completed and (customer_result.get("ok") or customer_result.get("maybe_sent")):
+        _idempotency.complete(idem_key, "customer_send", customer_result)
+    return vendor_result, customer_result
+
+
+def _deadline_response(stage: str, **extra):
+    """503 cuando el presupuesto de la request se agotó antes (o durante) `stage`."""
+    resp = _response(503, {"ok": False, "error": "deadline_exceeded", "stage": stage, **extra},
+                     headers={"Retry-After": "1"})
+    emf.current().set_outcome("error", "deadline_exceeded")
+    emf.current().put_property("deadline_stage", stage)
+    return resp
+
+
+def _warm_secrets() -> dict:
+    """Carga síncrona si el init no pudo o si toca refrescar: el ping la saca del camino de la request."""
+    if _secrets.needs_refresh():
+        _secrets.load()
+    return _secrets.stats()
+
+
+def _warm_smtp() -> dict:
+    smtp = settings.smtp
+    password = _secrets.get("ZOHO_SMTP_PASS")
+    if not smtp.user or not password:
+        return {"skipped": "zoho_smtp_not_configured"}
+    import smtp_session
+    timeout = deadline.current().timeout("prewarm_smtp", SMTP_TIMEOUT_SECONDS, minimum=0.5)
+    session = smtp_session.get_session(smtp.host, smtp.port, smtp.user, password, timeout=timeout)
+    return {"session": session.warm()}
+
+
+def _warm_dispatch() -> dict:
+    """Transporte del vendor: cliente SES (inprocess) o invocación de warm-up al dispatcher."""
+    if DISPATCH_TRANSPORT == "inprocess":
+        from orbit_shared import ses_sender
+        return {"transport": "inprocess", **ses_sender.warm(_get_ses_client)}
+    if not EMAIL_DISPATCHER_FUNCTION_NAME:
+        return {"skipped": "EMAIL_DISPATCHER_FUNCTION_NAME not configured"}
+    # Abre la conexión del cliente lambda y calienta un contenedor del dispatcher
+    report = prewarm.invoke_warmup(_get_lambda_client, EMAIL_DISPATCHER_FUNCTION_NAME, prewarm.PREWARM_HOLD_MS)
+    return {"transport": DISPATCH_TRANSPORT, "ok": bool(report.get("ok")),
+            "dispatcher_container": report.get("container_id"), "dispatcher_cold_start": report.get("cold_start"),
+            **({"error": report["error"]} if report.get("error") else {})}
+
+
+# Conexiones y recursos que abre un evento de warm-up (ver orbit_shared.prewarm)
+PREWARM_PRIMERS = {
+    "secrets": _warm_secrets,
+    "recaptcha": lambda: {"connection": _get_recaptcha_client().warm(
+        deadline.current().timeout("prewarm_recaptcha", RECAPTCHA_TIMEOUT_SECONDS, minimum=0.2))},
+    "smtp": _warm_smtp,
+    "dispatch": _warm_dispatch,
+    "ack_renderer": lambda: {"locales": _get_ack_renderer().warm()},
+}
+
+
+def handler(event, context):
+    metrics = emf.start(METRICS_NAMESPACE, "contact-form")
+    deadline.start(context)
+    trace = None
+    try:
+        # Ping de warm-up (EventBridge): abre conexiones, sin lógica de negocio
+        if prewarm.is_warmup(event):
+            return prewarm.run(event, context, PREWARM_PRIMERS, get_lambda_client=_get_lambda_client)
+        # Captura opcional del evento (sin PII) para reproducir el tráfico con bench_replay
+        capture.record("contact-form", event)
+        # Traza de la request: trace_id + span raíz; se propaga al dispatcher y a la cola
+        trace = tracing.start("contact-form", cold_start=metrics.cold_start,
+                              request_id=getattr(context, "aws_request_id", None))
+        metrics.put_property("trace_id", trace.trace_id)
+        return _handle(event, context)
+    except deadline.DeadlineExceeded as e:
+        return _deadline_response(e.stage)
+    except Exception:
+        metrics.set_outcome("error", "unhandled_exception")
+        raise
+    finally:
+        if trace is not None:
+            trace.flush(outcome=metrics.outcome, error_code=metrics.error_code)
+        metrics.flush()
+
+
+def _handle(event, context):
+    # 1) Parseo del body (con límite de tamaño)
+    with emf.stage("body_parse"):
+        body, parse_error = _parse_event_body(event)
+    if parse_error == "too_large":
+        return _response(413, {"ok": False, "error": "body_too_large",
+                               "details": {"max_bytes": request_schema.MAX_BODY_BYTES}})
+    if body is None:
+        return _response(400, {"ok": False, "error": "Invalid or empty JSON body"})
+
+    # 1.1) Rate limiting por IP y global: 429 barato antes de Google y de los envíos
+    remote_ip = _get_remote_ip(event)
+    with emf.stage("rate_limit"):
+        allowed, scope, retry_after = _rate_limiter.check(remote_ip)
+    if not allowed:
+        emf.current().put_property("rate_limiter", _rate_limiter.stats())
+        return _response(429, {
+            "ok": False,
+            "error": "rate_limited",
+            "details": {"scope": scope, "retry_after_seconds": retry_after}
+        }, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+    # 2) Esquema: tipos, longitudes y formato por campo (incluye recaptchaToken requerido)
+    with emf.stage("validate"):
+        fields, errors = request_schema.CONTACT_FORM.validate(body)
+    if errors:
+        return _response(400, {"ok": False, "error": "invalid_request", "details": {"fields": errors}})
+
+    # 2.1) Honeypot: _hp debe venir vacío
+    if fields["_hp"] != "":
+        return _response(400, {"ok": False, "error": "honeypot_triggered"})
+    token = fields["recaptchaToken"]
+
+    # 3) Idempotencia: un reintento del mismo envío retoma solo las etapas pendientes
+    idem_key = idempotency.idempotency_key(
+        fields["idempotencyKey"] or (event.get("headers") or {}).get("idempotency-key"),
+        fields["name"], fields["email"], fields["message"], fields["phone"], fields["projectType"],
+    )
+    # 3.1) reCAPTCHA antes de tomar la clave: el tráfico sin verificar no escribe en el registro.
+    # Un intento anterior que ya verificó este envío se lee sin escribir (el token no se puede volver a verificar)
+    verified = "recaptcha" in _idempotency.peek(idem_key)
+    if verified:
+        emf.current().increment("idempotent_resumes")
+    else:
+        rejection = _verify_submission_recaptcha(token, remote_ip)
+        if rejection is not None:
+            return rejection
+    completed = _idempotency.claim(idem_key)
+    if completed is None:
+        return _response(409, {"ok": False, "error": "submission_in_progress"})
+    try:
+        if not verified:
+            _idempotency.complete(idem_key, "recaptcha", {"ok": True})
+        return _process_submission(event, fields, idem_key, completed)
+    finally:
+        _idempotency.release(idem_key)
+
+
+def _verify_submission_recaptcha(token: str, remote_ip: str | None):
+    """Verifica el token y las reglas de v3. Devuelve la respuesta de rechazo o None si pasa."""
+    with emf.stage("recaptcha_verify"):
+        valid, details = verify_recaptcha(token, remoteip=remote_ip)
+    if not valid:
+        if details.get("error") == "circuit_open":
+            # Google no está respondiendo: 503 para que el cliente reintente más tarde
+            return _response(503, {"ok": False, "error": "dependency_unavailable", "details": details},
+                             headers={"Retry-After": str(max(1, math.ceil(details["retry_after_seconds"])))})
+        return _response(400, {"ok": False, "error": "invalid_recaptcha", "details": details})
+
+    # ---- Validación avanzada reCAPTCHA v3 ----
+    with emf.stage("recaptcha_checks"):
+        return _validate_recaptcha_details(details)
+
+
+def _process_submission(event, fields: dict, idem_key: str, completed: dict):
+    """
+    Envíos del formulario ya verificado, saltando las etapas que un intento anterior ya completó.
+    fields: body ya validado con request_schema.CONTACT_FORM.
+    """
+    # 3.2) Destinatario del ack: sintaxis + MX del dominio (caché por contenedor) antes de cualquier
+    # envío; un dominio mal escrito se corrige en el formulario en vez de rebotar
+    with emf.stage("recipient_check"):
+        recipient = recipient_check.check(fields["email"])
+    if recipient.get("error"):
+        return _response(400, {"ok": False, "error": "invalid_request",
+                               "details": {"fields": {"email": recipient["reason"]}}})
+
     # 4) Preparar payloads para email-dispatcher
-    name = body.get("name", "")
-    email = body.get("email", "")
-    phone = body.get("phone", "")
-    project_type = body.get("projectType", "")
-    message = body.get("message", "")
+    name = fields["name"]
+    email = fields["email"].strip()
+    phone = fields["phone"]
+    project_type = fields["projectType"]
+    message = fields["message"]
+    # Idioma del ack: el que manda el frontend (i18n) o, si no, Accept-Language
+    import ack_renderer
+    locale = fields["locale"] or ack_renderer.locale_from_accept_language(
+        (event.get("headers") or {}).get("accept-language")
+    )
 
     # Payload para vendor (usa template VendorNotifyTemplate; dispatcher usará VENDOR_EMAIL desde env)
     vendor_payload = {
@@ -422,17 +764,47 @@ def handler(event, context):
         "message": message
     }
 
-    # 5) Invocar dispatcher - primero al vendedor (sync, vía Lambda existente)
-    vendor_result = _invoke_email_dispatcher(vendor_payload, invocation_type="RequestResponse")
+    # Modo async-accept: encolar y responder 202; el worker hace los envíos pendientes
+    if ASYNC_ACCEPT and not {"vendor_send", "customer_send"} <= completed.keys():
+        # El worker continúa la traza de esta request (tracing.extract en process_job)
+        job_payload = tracing.inject({
+            "idempotency_key": idem_key,
+            "vendor_payload": vendor_payload,
+            "customer": {"email": email, "name": name, "projectType": project_type, "message": message,
+                         "locale": locale},
+        })
+        import email_queue
+        try:
+            job_id = email_queue.get_queue().enqueue(email_queue.new_job(job_payload))
+            return _response(202, {"ok": True, "message": "accepted", "job_id": job_id})
+        except Exception as e:
+            # Si la cola no está disponible, seguimos con el envío síncrono
+            print("Email queue enqueue failed, falling back to sync send:", repr(e))
+
+    # 5) y 6) Notificación al vendor (dispatcher) y ack al cliente (Zoho SMTP) en paralelo
+    vendor_result, customer_result = _run_sends(idem_key, completed, vendor_payload, email, name,
+                                                project_type, message, locale)
+
+    # Envíos sin confirmar (el plazo venció con el envío en curso): no se piden reintentos que
+    # duplicarían el correo; quedan registrados y la respuesta lo dice
+    unconfirmed = [r["stage"] for r in (vendor_result, customer_result) if r.get("maybe_sent")]
+
+    # Presupuesto agotado en algún envío: 503 con la etapa (las que sí terminaron quedan registradas)
+    for result in (vendor_result, customer_result):
+        if result.get("error") == "deadline_exceeded" and not result.get("maybe_sent"):
+            return _deadline_response(result.get("stage"), vendor_result=vendor_result,
+                                      customer_result=customer_result)
 
     # Si el dispatcher devolvió un error grave, lo retornamos
-    if vendor_result.get("error"):
-        return _response(500, {"ok": False, "stage": "vendor_send_failed", "detail": vendor_result})
-
-    # 6) Enviar ack al cliente usando Zoho SMTP
-    customer_result = _send_customer_ack_via_zoho(email, name, project_type, message)
+    if vendor_result.get("error") and not vendor_result.get("maybe_sent"):
+        return _response(500, {
+            "ok": False,
+            "stage": "vendor_send_failed",
+            "detail": vendor_result,
+            "customer_result": customer_result
+        })
 
-    if not customer_result.get("ok"):
+    if not customer_result.get("ok") and not customer_result.get("maybe_sent"):
         # Ya notificamos al vendor, pero reportamos el fallo del ack
         return _response(500, {
             "ok": False,
@@ -441,6 +813,16 @@ def handler(event, context):
             "vendor_result": vendor_result
         })
 
+    if unconfirmed:
+        # Aceptado sin confirmar: un reintento (mismo envío) devuelve esto mismo sin reenviar
+        return _response(202, {
+            "ok": True,
+            "message": "accepted_unconfirmed",
+            "unconfirmed": unconfirmed,
+            "vendor_result": vendor_result,
+            "customer_result": customer_result
+        })
+
     # 7) Todo OK
     return _response(200, {
         "ok": True,
@@ -0,0 +1,250 @@
+"""
+Rate limiting por IP y global (token bucket) antes de verificar reCAPTCHA.
+
+Las ráfagas de spam no deben llegar a Google ni a los envíos: el handler consulta
+check() justo después de parsear el body y responde 429 sin salir a la red.
+
+  - Camino rápido por contenedor: buckets locales (LRU) por IP y global; si el
+    bucket local ya está vacío se rechaza sin tocar el backend compartido.
+  - Backend compartido opcional (DynamoDB o en memoria para pruebas) para que el
+    límite valga entre contenedores. Si el backend falla, se deja pasar (fail-open).
+
+Un request solo gasta tokens si pasa los dos ámbitos: primero se revisan el bucket de la
+IP y el global, y se descuentan ambos solo si los dos tienen token (un pico global no deja
+sin tokens a las IPs que rechazó).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Bucket con capacidad `burst` que se rellena a `rate` tokens por segundo."""
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def available(self, now: float | None = None) -> bool:
+        """Hay al menos un token (sin consumirlo)."""
+        self._refill(time.time() if now is None else now)
+        return self.tokens >= 1
+
+    def take(self, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        """Devuelve un token tomado para un request que al final se rechazó."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def retry_after(self) -> float:
+        """Segundos hasta que haya un token disponible."""
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else 0.0
+
+
+def _refill(tokens: float, updated: float, rate: float, burst: float, now: float) -> float:
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Backend compartido en memoria (stand-in local de DynamoDB)."""
+
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key: str, rate: float, burst: float) -> float:
+        """Tokens disponibles sin consumir."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return burst
+            bucket.available()
+            return bucket.tokens
+
+    def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        """Consume un token. Devuelve (permitido, tokens restantes)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            allowed = bucket.take()
+            return allowed, bucket.tokens
+
+
+class DynamoBucketStore:
+    """
+    Backend compartido en DynamoDB. Tabla con PK 'pk' (S), atributos 'tokens' y
+    'updated_at' (N) y TTL en 'expires_at'. El refill se calcula aquí y se escribe
+    con un put condicional sobre 'updated_at' (control optimista entre contenedores).
+    """
+
+    def __init__(self, table_name: str, client=None, max_attempts: int = 3):
+        self.table_name = table_name
+        self.max_attempts = max_attempts
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def peek(self, key: str, rate: float, burst: float) -> float:
+        item = self.client.get_item(TableName=self.table_name, Key={"pk": {"S": key}},
+                                    ConsistentRead=True).get("Item")
+        if not item:
+            return burst
+        return _refill(float(item["tokens"]["N"]), float(item["updated_at"]["N"]), rate, burst, time.time())
+
+    def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        from botocore.exceptions import ClientError
+        tokens = 0.0
+        for _ in range(self.max_attempts):
+            now = time.time()
+            item = self.client.get_item(TableName=self.table_name, Key={"pk": {"S": key}},
+                                        ConsistentRead=True).get("Item")
+            if item:
+                prev = item["updated_at"]["N"]
+                tokens = _refill(float(item["tokens"]["N"]), float(prev), rate, burst, now)
+                condition = {"ConditionExpression": "updated_at = :prev",
+                             "ExpressionAttributeValues": {":prev": {"N": prev}}}
+            else:
+                tokens = burst
+                condition = {"ConditionExpression": "attribute_not_exists(pk)"}
+            if tokens < 1:
+                return False, tokens
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "pk": {"S": key},
+                        "tokens": {"N": repr(tokens - 1)},
+                        "updated_at": {"N": repr(now)},
+                        # El bucket lleno equivale a no tener registro: expira cuando se habría rellenado
+                        "expires_at": {"N": str(int(now + burst / rate) + 60)},
+                    },
+                    **condition,
+                )
+                return True, tokens - 1
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+        # Contención sostenida sobre la misma clave: tratarlo como límite alcanzado
+        return False, tokens
+
+
+class RateLimiter:
+    """
+    Límite por IP (rate por minuto) y global (rate por segundo). Un rate <= 0 desactiva ese ámbito.
+    check(ip) -> (permitido, ámbito que rechazó: "ip" | "global" | None, retry_after en segundos).
+    """
+
+    def __init__(self, ip_rate_per_min: float = 6, ip_burst: float = 3,
+                 global_rate_per_sec: float = 2, global_burst: float = 20,
+                 shared=None, max_keys: int = 10000):
+        self.ip_rate = ip_rate_per_min / 60
+        self.ip_burst = ip_burst
+        self.global_rate = global_rate_per_sec
+        self.global_burst = global_burst
+        self.shared = shared
+        self.max_keys = max_keys
+        self._ip_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._global_bucket = TokenBucket(self.global_rate, global_burst) if self.global_rate > 0 else None
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "limited_ip": 0, "limited_global": 0,
+                       "local_rejects": 0, "shared_errors": 0}
+
+    def _local_ip_bucket(self, ip: str) -> TokenBucket:
+        bucket = self._ip_buckets.get(ip)
+        if bucket is None:
+            bucket = self._ip_buckets[ip] = TokenBucket(self.ip_rate, self.ip_burst)
+            while len(self._ip_buckets) > self.max_keys:
+                self._ip_buckets.popitem(last=False)
+        else:
+            self._ip_buckets.move_to_end(ip)
+        return bucket
+
+    def _scopes(self, ip: str):
+        if self.ip_rate > 0:
+            yield "ip", f"ip#{ip}", self.ip_rate, self.ip_burst
+        if self.global_rate > 0:
+            yield "global", "global", self.global_rate, self.global_burst
+
+    def _limited(self, scope: str, retry_after: float, local: bool):
+        with self._lock:
+            self._stats[f"limited_{scope}"] += 1
+            if local:
+                self._stats["local_rejects"] += 1
+        return False, scope, round(retry_after, 3)
+
+    def _refund(self, local: list):
+        with self._lock:
+            for _, bucket in local:
+                bucket.refund()
+
+    def check(self, ip: str | None) -> tuple[bool, str | None, float]:
+        ip = ip or "unknown"
+
+        # 1) Camino rápido: buckets del contenedor; se descuentan solo si todos tienen token
+        limited = None
+        with self._lock:
+            local = []
+            if self.ip_rate > 0:
+                local.append(("ip", self._local_ip_bucket(ip)))
+            if self._global_bucket is not None:
+                local.append(("global", self._global_bucket))
+            now = time.time()
+            for scope, bucket in local:
+                if not bucket.available(now):
+                    limited = (scope, bucket.retry_after())
+                    break
+            else:
+                for _, bucket in local:
+                    bucket.take(now)
+        if limited is not None:
+            return self._limited(*limited, local=True)
+
+        # 2) Backend compartido (límite entre contenedores): igual, revisar ambos y luego descontar.
+        # Si rechaza, se devuelven los tokens locales que ya se habían tomado
+        if self.shared is not None:
+            scopes = list(self._scopes(ip))
+            try:
+                for scope, key, rate, burst in scopes:
+                    tokens = self.shared.peek(key, rate, burst)
+                    if tokens < 1:
+                        self._refund(local)
+                        return self._limited(scope, (1 - tokens) / rate, local=False)
+                for scope, key, rate, burst in scopes:
+                    allowed, tokens = self.shared.take(key, rate, burst)
+                    if not allowed:
+                        # Otro contenedor se llevó el último token entre la revisión y el descuento
+                        self._refund(local)
+                        return self._limited(scope, (1 - tokens) / rate, local=False)
+            except Exception as e:
+                print("Rate limit shared store error:", repr(e))
+                with self._lock:
+                    self._stats["shared_errors"] += 1
+
+        with self._lock:
+            self._stats["allowed"] += 1
+        return True, None, 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["ip_keys"] = len(self._ip_buckets)
+        return s
@@ -0,0 +1,186 @@
+"""
+Sesión SMTP persistente para el ack al cliente (Zoho).
+
+La conexión (TLS + login) vive a nivel de módulo y se reutiliza entre
+invocaciones "warm" del mismo contenedor. Antes de usarla se valida con NOOP;
+si el servidor la cerró, se reconecta y se vuelve a hacer login.
+"""
+import smtplib
+import threading
+
+from orbit_shared import emf
+
+
+class SmtpSessionManager:
+    """Mantiene una conexión SMTP_SSL abierta y cuenta conexiones/reusos."""
+
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 timeout: float = 10, factory=smtplib.SMTP_SSL):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self._factory = factory
+        self._server = None
+        self._lock = threading.Lock()
+        self._counters = {"connects": 0, "reuses": 0, "reconnects": 0}
+        # MAIL FROM enviado en el envío en curso (None: el servidor no permite saberlo)
+        self._mail_started = None
+
+    # -----------------------------
+    # Conexión
+    # -----------------------------
+    def _connect(self):
+        with emf.stage("smtp_connect"):
+            server = self._factory(self.host, self.port, timeout=self.timeout)
+        try:
+            with emf.stage("smtp_login"):
+                server.login(self.user, self.password)
+        except Exception:
+            self._safe_close(server)
+            raise
+        self._server = server
+        self._track_mail_from(server)
+
+    def _track_mail_from(self, server):
+        """Marca cuándo empieza la transacción (MAIL FROM): desde ahí el servidor pudo aceptar el DATA."""
+        mail = getattr(server, "mail", None)
+        if mail is None:
+            return
+
+        def tracked(*args, __mail=mail, **kwargs):
+            self._mail_started = True
+            return __mail(*args, **kwargs)
+
+        server.mail = tracked
+
+    @staticmethod
+    def _safe_close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self) -> bool:
+        if self._server is None:
+            return False
+        try:
+            with emf.stage("smtp_noop"):
+                code, _ = self._server.noop()
+            return code == 250
+        except Exception:
+            return False
+
+    def _apply_timeout(self):
+        """El timeout puede cambiar por request (presupuesto restante): aplicarlo al socket reutilizado."""
+        sock = getattr(self._server, "sock", None)
+        if sock is not None:
+            sock.settimeout(self.timeout)
+
+    def _reconnect(self):
+        if self._server is not None:
+            self._safe_close(self._server)
+            self._server = None
+        self._connect()
+        self._counters["reconnects"] += 1
+
+    def _ensure_session(self) -> str:
+        """Devuelve cómo se obtuvo la sesión: 'reused', 'reconnected' o 'connected'."""
+        if self._server is None:
+            self._connect()
+            self._counters["connects"] += 1
+            return "connected"
+        if self._is_alive():
+            self._counters["reuses"] += 1
+            return "reused"
+        self._reconnect()
+        return "reconnected"
+
+    # -----------------------------
+    # API pública
+    # -----------------------------
+    def _send(self, send) -> str:
+        """
+        Ejecuta send(server) reutilizando la sesión abierta.
+        Si el servidor corta la conexión después del NOOP pero antes de MAIL FROM, reintenta
+        una vez con una sesión nueva. Un corte posterior (o si no se puede saber) se propaga:
+        el servidor pudo haber aceptado el DATA y reintentar duplicaría el correo.
+        Devuelve el modo de sesión usado.
+        """
+        with self._lock:
+            if self._server is not None:
+                self._apply_timeout()
+            mode = self._ensure_session()
+            self._mail_started = False if getattr(self._server, "mail", None) is not None else None
+            try:
+                with emf.stage("smtp_send"):
+                    send(self._server)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if self._mail_started is not False:
+                    # Conexión inservible: la próxima request abre una nueva
+                    self._safe_close(self._server)
+                    self._server = None
+                    raise
+                self._reconnect()
+                mode = "reconnected"
+                with emf.stage("smtp_send"):
+                    send(self._server)
+            return mode
+
+    def warm(self) -> str:
+        """Abre (o valida con NOOP) la sesión sin enviar nada (prewarm). Devuelve el modo de sesión."""
+        with self._lock:
+            if self._server is not None:
+                self._apply_timeout()
+            return self._ensure_session()
+
+    def send_message(self, msg) -> str:
+        """Envía un EmailMessage."""
+        return self._send(lambda server: server.send_message(msg))
+
+    def sendmail(self, from_addr: str, to_addrs: list[str], raw: bytes) -> str:
+        """Envía un mensaje ya serializado (p.ej. el ack pre-renderizado)."""
+        return self._send(lambda server: server.sendmail(from_addr, to_addrs, raw))
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                self._safe_close(self._server)
+                self._server = None
+
+    def stats(self) -> dict:
+        c = dict(self._counters)
+        total = c["connects"] + c["reuses"] + c["reconnects"]
+        c["hit_rate"] = round(c["reuses"] / total, 4) if total else 0.0
+        return c
+
+
+# Sesión compartida por el contenedor
+_session: SmtpSessionManager | None = None
+_session_lock = threading.Lock()
+
+
+def get_session(host: str, port: int, user: str, password: str, timeout: float = 10) -> SmtpSessionManager:
+    """
+    Devuelve la sesión del contenedor; la recrea si cambian host/puerto/credenciales
+    (p.ej. rotación de la contraseña SMTP).
+    """
+    global _session
+    with _session_lock:
+        s = _session
+        if s is None or (s.host, s.port, s.user, s.password) != (host, port, user, password):
+            if s is not None:
+                s.close()
+            s = SmtpSessionManager(host, port, user, password, timeout=timeout)
+            _session = s
+        s.timeout = timeout
+        return s
+
+
+def session_stats() -> dict:
+    """Contadores de la sesión actual (vacío si aún no se creó)."""
+    return _session.stats() if _session is not None else {}
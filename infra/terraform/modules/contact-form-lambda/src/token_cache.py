@@ -0,0 +1,154 @@
+"""
+Caché anti-replay de tokens reCAPTCHA.
+
+Un token solo se puede verificar una vez con Google; los reenvíos (doble click,
+reintentos del cliente o de Lambda) fallan allá con "timeout-or-duplicate" después
+de pagar el round trip. Aquí se detectan antes de salir a la red.
+
+  - LRU local con TTL (por contenedor), clave = sha256 del token (nunca el token).
+  - Backend compartido opcional (DynamoDB o en memoria para pruebas) para
+    detectar el replay aunque llegue a otro contenedor.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_key(token: str) -> str:
+    return "sha256:" + hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class MemoryTokenStore:
+    """Backend compartido en memoria (stand-in local de DynamoDB)."""
+
+    def __init__(self):
+        self._items: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def put_if_absent(self, key: str, expires_at: float) -> bool:
+        """True si se insertó; False si ya existía y no ha expirado."""
+        now = time.time()
+        with self._lock:
+            current = self._items.get(key)
+            if current is not None and current > now:
+                return False
+            self._items[key] = expires_at
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class DynamoTokenStore:
+    """
+    Backend compartido en DynamoDB. Tabla con PK 'pk' (S) y TTL en 'expires_at' (N).
+    El put condicional hace atómico el "check and mark" entre contenedores.
+    """
+
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def put_if_absent(self, key: str, expires_at: float) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={"pk": {"S": key}, "expires_at": {"N": str(int(expires_at))}},
+                ConditionExpression="attribute_not_exists(pk) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(int(time.time()))}},
+            )
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_item(TableName=self.table_name, Key={"pk": {"S": key}})
+
+
+class TokenReplayCache:
+    """LRU con TTL + backend compartido opcional. seen() marca el token y dice si ya se había visto."""
+
+    def __init__(self, ttl_seconds: float = 120, max_entries: int = 10000, shared=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "shared_hits": 0, "evictions": 0, "shared_errors": 0}
+
+    def _local_seen(self, key: str, now: float) -> bool:
+        expires = self._entries.get(key)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def _remember(self, key: str, expires_at: float):
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def seen(self, token: str) -> bool:
+        key = token_key(token)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            if self._local_seen(key, now):
+                self._stats["hits"] += 1
+                return True
+            self._remember(key, expires_at)
+
+        if self.shared is not None:
+            try:
+                inserted = self.shared.put_if_absent(key, expires_at)
+            except Exception as e:
+                # Si el backend compartido falla, seguimos solo con la caché local
+                print("Token replay shared store error:", repr(e))
+                inserted = True
+                with self._lock:
+                    self._stats["shared_errors"] += 1
+            if not inserted:
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["shared_hits"] += 1
+                return True
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return False
+
+    def forget(self, token: str) -> None:
+        """Olvida el token (p.ej. si Google no llegó a verificarlo por un error de red)."""
+        key = token_key(token)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                print("Token replay shared store error:", repr(e))
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["size"] = len(self._entries)
+        total = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / total, 4) if total else 0.0
+        return s
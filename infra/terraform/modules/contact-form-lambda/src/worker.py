@@ -0,0 +1,193 @@
+"""
+Worker del modo async-accept: drena la cola de emails y ejecuta los envíos
+(dispatcher para el vendor + Zoho SMTP para el cliente) con la misma lógica de index.py.
+
+Entradas:
+  - Evento SQS (event source mapping): procesa los Records y devuelve
+    batchItemFailures para que SQS reentregue solo los fallidos.
+  - Cualquier otro evento (p.ej. programado o invocación local): drena
+    get_queue() en lotes hasta vaciarla.
+"""
+import json
+import os
+
+import email_queue
+import index
+from orbit_shared import deadline, emf, tracing
+
+# Presupuesto mínimo (s) para empezar un trabajo; con menos se deja para la reentrega
+JOB_MIN_SECONDS = float(os.getenv("WORKER_JOB_MIN_SECONDS", "2"))
+
+
+def process_job(job: dict) -> dict:
+    """
+    Ejecuta los envíos pendientes de un trabajo y devuelve su estado. Las etapas que ya
+    terminaron no se reenvían: las que registra el propio trabajo (payload["completed"]) y,
+    con idempotency_key, las del store (otro intento o la request original). Si quedan etapas
+    pendientes y alguna terminó ahora, el estado trae "job": el trabajo reescrito con ellas
+    marcadas (y los destinatarios del vendor que ya recibieron), para que la reentrega no
+    repita lo ya enviado aunque no haya store.
+    Cada trabajo continúa la traza de la request que lo encoló.
+    """
+    payload = job.get("payload") or {}
+    trace = tracing.start("contact-form-worker", tracing.extract(payload),
+                          job_id=job.get("id"), attempts=job.get("attempts", 0))
+    result = None
+    try:
+        result = _process_job(job, payload)
+        return result
+    finally:
+        trace.flush(status=result["status"] if result else "error")
+
+
+def _process_job(job: dict, payload: dict) -> dict:
+    customer = payload.get("customer") or {}
+    idem_key = payload.get("idempotency_key")
+    claimed = index._idempotency.claim(idem_key) if idem_key else {}
+    if claimed is None:
+        # Otro intento del mismo envío está en curso: se reentrega más tarde
+        return {"job_id": job.get("id"), "attempts": job.get("attempts", 0), "status": "failed",
+                "error": "submission_in_progress"}
+    completed = {**(payload.get("completed") or {}), **claimed}
+    try:
+        vendor_result, customer_result = index._run_sends(
+            idem_key or job.get("id") or "",
+            completed,
+            payload.get("vendor_payload") or {},
+            customer.get("email", ""),
+            customer.get("name", ""),
+            customer.get("projectType", ""),
+            customer.get("message", ""),
+            customer.get("locale"),
+        )
+    finally:
+        if idem_key:
+            index._idempotency.release(idem_key)
+    # Sin confirmar (plazo vencido con el envío en curso) cuenta como hecho: reentregar duplicaría el correo
+    vendor_ok = not vendor_result.get("error") or bool(vendor_result.get("maybe_sent"))
+    customer_ok = bool(customer_result.get("ok") or customer_result.get("maybe_sent"))
+    if vendor_ok and customer_ok:
+        status = "sent"
+    elif vendor_ok or customer_ok:
+        status = "partial"
+    else:
+        status = "failed"
+    result = {
+        "job_id": job.get("id"),
+        "attempts": job.get("attempts", 0),
+        "status": status,
+        "vendor_result": vendor_result,
+        "customer_result": customer_result,
+    }
+    newly_done = {stage: r for stage, r, ok in (("vendor_send", vendor_result, vendor_ok),
+                                                ("customer_send", customer_result, customer_ok))
+                  if ok and stage not in completed}
+    vendor_delivered = index._vendor_delivered_stage(vendor_result, completed)
+    if vendor_delivered:
+        # Entrega parcial a las rutas del vendor: la reentrega solo manda a los que fallaron
+        newly_done["vendor_delivered"] = vendor_delivered
+    if status != "sent" and newly_done:
+        result["job"] = {**job, "payload": {**payload, "completed": {**completed, **newly_done}}}
+    return result
+
+
+def _log_status(result: dict) -> None:
+    print("email_job", json.dumps({k: result[k] for k in ("job_id", "attempts", "status")}))
+
+
+def drain(queue: email_queue.EmailQueue | None = None, batch_size: int = 10,
+          max_batches: int | None = None) -> list[dict]:
+    """Procesa lotes hasta vaciar la cola (o llegar a max_batches). Reentrega lo que no quedó 'sent'."""
+    queue = queue or email_queue.get_queue()
+    results = []
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        if deadline.current().remaining() < JOB_MIN_SECONDS:
+            break
+        batch = queue.receive(batch_size)
+        if not batch:
+            break
+        batches += 1
+        for receipt, job in batch:
+            if deadline.current().remaining() < JOB_MIN_SECONDS:
+                # Sin tiempo para otro trabajo: se devuelve a la cola intacto, sin contar un intento
+                queue.release(receipt, job=job, count_attempt=False)
+                emf.current().increment("jobs_deferred")
+                continue
+            try:
+                result = process_job(job)
+            except Exception as e:
+                result = {"job_id": job.get("id"), "attempts": job.get("attempts", 0),
+                          "status": "failed", "error": f"{e.__class__.__name__}: {e}"}
+            _log_status(result)
+            emf.current().increment(f"jobs_{result['status']}")
+            if result["status"] == "sent":
+                queue.ack(receipt)
+            else:
+                # Con "job": vuelve a la cola con las etapas ya enviadas marcadas
+                queue.release(receipt, job=result.get("job"))
+            results.append(result)
+    return results
+
+
+def handler(event, context):
+    metrics = emf.start(index.METRICS_NAMESPACE, "contact-form-worker")
+    deadline.start(context)
+    try:
+        return _handle(event)
+    except Exception:
+        metrics.set_outcome("error", "unhandled_exception")
+        raise
+    finally:
+        metrics.flush()
+
+
+def _record_job(record: dict) -> dict:
+    """Trabajo de un record SQS; los intentos suman los del body (trabajos reencolados) y las recepciones."""
+    job = json.loads(record["body"])
+    job["attempts"] = job.get("attempts", 0) + int(
+        record.get("attributes", {}).get("ApproximateReceiveCount", "1")) - 1
+    return job
+
+
+def _handle(event):
+    records = event.get("Records") if isinstance(event, dict) else None
+    if records is None:
+        results = drain()
+        return {"ok": True, "processed": len(results),
+                "statuses": [{"job_id": r["job_id"], "status": r["status"]} for r in results]}
+
+    # Evento SQS: respuesta parcial por lote (ReportBatchItemFailures)
+    failures = []
+    for record in records:
+        if deadline.current().remaining() < JOB_MIN_SECONDS:
+            # Sin tiempo para otro trabajo: se encola de nuevo con los mismos intentos (reentregar
+            # el record sumaría uno al ApproximateReceiveCount y acercaría a la DLQ un trabajo que no corrió)
+            emf.current().increment("jobs_deferred")
+            try:
+                email_queue.get_queue().enqueue(_record_job(record))
+                continue
+            except Exception as e:
+                print("Email job defer failed:", repr(e))
+            failures.append({"itemIdentifier": record.get("messageId")})
+            continue
+        try:
+            job = _record_job(record)
+            result = process_job(job)
+        except Exception as e:
+            result = {"job_id": None, "attempts": 0, "status": "failed",
+                      "error": f"{e.__class__.__name__}: {e}"}
+        _log_status(result)
+        emf.current().increment(f"jobs_{result['status']}")
+        if result["status"] != "sent" and result.get("job"):
+            # El mensaje de SQS no se puede editar: se encola el trabajo con las etapas ya enviadas
+            # y el original se da por procesado (si falla el encolado, se reentrega el original)
+            try:
+                job = result["job"]
+                email_queue.get_queue().enqueue({**job, "attempts": job.get("attempts", 0) + 1})
+                continue
+            except Exception as e:
+                print("Email job requeue failed:", repr(e))
+        if result["status"] != "sent":
+            failures.append({"itemIdentifier": record.get("messageId")})
+    return {"batchItemFailures": failures}
@@ -108,3 +108,221 @@ variable "smtp_pass" {
 variable "zoho_from_email" {
   type = string
 }
+
+variable "dispatch_transport" {
+  type        = string
+  description = "Notificación al vendor: invoke (dispatcher síncrono), event (dispatcher async) o inprocess (SES directo)"
+  default     = "invoke"
+
+  validation {
+    condition     = contains(["invoke", "event", "inprocess"], var.dispatch_transport)
+    error_message = "dispatch_transport debe ser invoke, event o inprocess."
+  }
+}
+
+variable "max_body_bytes" {
+  type        = number
+  description = "Tamaño máximo del body (bytes ya decodificados); más grande se rechaza con 413 antes de parsear"
+  default     = 16384
+}
+
+variable "ses_content_mode" {
+  type        = string
+  description = "Contenido de los envíos SES: template (plantilla guardada en SES) o simple (render local desde modules/ses/templates)"
+  default     = "template"
+
+  validation {
+    condition     = contains(["template", "simple"], var.ses_content_mode)
+    error_message = "ses_content_mode debe ser template o simple."
+  }
+}
+
+variable "ses_from_email" {
+  type        = string
+  description = "Remitente SES para dispatch_transport = inprocess"
+  default     = ""
+}
+
+variable "vendor_email" {
+  type        = string
+  description = "Destinatario de la notificación al vendor (dispatch_transport = inprocess)"
+  default     = ""
+}
+
+variable "ses_region" {
+  type    = string
+  default = "us-east-1"
+}
+
+variable "async_accept" {
+  type        = bool
+  description = "Responder 202 tras validar y enviar los emails desde un worker con cola SQS"
+  default     = false
+}
+
+variable "async_batch_size" {
+  type        = number
+  description = "Trabajos por lote que recibe el worker async"
+  default     = 10
+}
+
+variable "async_max_receives" {
+  type        = number
+  description = "Entregas máximas de un trabajo antes de mandarlo a la DLQ"
+  default     = 3
+}
+
+variable "recaptcha_replay_table_enabled" {
+  type        = bool
+  description = "Crear tabla DynamoDB para detectar tokens reCAPTCHA repetidos entre contenedores"
+  default     = false
+}
+
+variable "idempotency_window_seconds" {
+  type        = number
+  description = "Ventana en la que un reintento del mismo envío retoma solo las etapas pendientes"
+  default     = 900
+}
+
+variable "idempotency_table_enabled" {
+  type        = bool
+  description = "Crear tabla DynamoDB para compartir el estado de idempotencia entre contenedores"
+  default     = false
+}
+
+variable "rate_limit_ip_per_minute" {
+  type        = number
+  description = "Requests por minuto por IP antes de responder 429 (0 desactiva el límite por IP)"
+  default     = 6
+}
+
+variable "rate_limit_ip_burst" {
+  type    = number
+  default = 3
+}
+
+variable "rate_limit_global_per_second" {
+  type        = number
+  description = "Requests por segundo en total antes de responder 429 (0 desactiva el límite global)"
+  default     = 2
+}
+
+variable "rate_limit_global_burst" {
+  type    = number
+  default = 20
+}
+
+variable "rate_limit_table_enabled" {
+  type        = bool
+  description = "Crear tabla DynamoDB para compartir los buckets de rate limiting entre contenedores"
+  default     = false
+}
+
+variable "precompile_bytecode" {
+  type        = bool
+  description = "Empaquetar bytecode precompilado (.pyc) en lambda.zip para reducir el cold start"
+  default     = false
+}
+
+variable "build_python" {
+  type        = string
+  description = "Intérprete con la misma versión que el runtime, usado para precompilar el bytecode"
+  default     = "python3.12"
+}
+
+variable "prewarm_schedule" {
+  type        = string
+  description = "Expresión de EventBridge para el ping de prewarm (p.ej. rate(5 minutes)); vacío = deshabilitado"
+  default     = ""
+}
+
+variable "prewarm_concurrency" {
+  type        = number
+  description = "Contenedores a calentar por ping (fan-out con invocaciones a sí misma)"
+  default     = 1
+
+  validation {
+    condition     = var.prewarm_concurrency >= 1 && var.prewarm_concurrency <= 20
+    error_message = "prewarm_concurrency debe estar entre 1 y 20."
+  }
+}
+
+variable "secrets_backend" {
+  type        = string
+  description = "De dónde salen RECAPTCHA_SECRET y ZOHO_SMTP_PASS: env, secretsmanager o ssm"
+  default     = "env"
+
+  validation {
+    condition     = contains(["env", "secretsmanager", "ssm"], var.secrets_backend)
+    error_message = "secrets_backend debe ser env, secretsmanager o ssm."
+  }
+}
+
+variable "secrets_id" {
+  type        = string
+  description = "Secreto (nombre/ARN) o ruta SSM existente; vacío = el módulo lo crea con recaptcha_secret_key/smtp_pass"
+  default     = ""
+}
+
+variable "secrets_ttl_seconds" {
+  type        = number
+  description = "TTL de la caché de secretos en el contenedor (se refresca en segundo plano antes de vencer)"
+  default     = 300
+}
+
+variable "tracing_mode" {
+  type        = string
+  description = "X-Ray de la función: PassThrough (solo trazas en logs) o Active (además exporta los spans a X-Ray)"
+  default     = "PassThrough"
+
+  validation {
+    condition     = contains(["PassThrough", "Active"], var.tracing_mode)
+    error_message = "tracing_mode debe ser PassThrough o Active."
+  }
+}
+
+variable "recipient_mx_resolver" {
+  type        = string
+  description = "Validación del destinatario antes de enviar (orbit_shared.recipient_check): off (solo sintaxis), doh (MX por DNS-over-HTTPS) o dns (dnspython, hay que empaquetarlo)"
+  default     = "off"
+
+  validation {
+    condition     = contains(["off", "doh", "dns"], var.recipient_mx_resolver)
+    error_message = "recipient_mx_resolver debe ser off, doh o dns."
+  }
+}
+
+variable "traffic_capture" {
+  type        = string
+  description = "Captura de eventos sin PII para reproducirlos con infra/bench/bench_replay.py (orbit_shared.capture): off, local (/tmp del contenedor) o s3"
+  default     = "off"
+
+  validation {
+    condition     = contains(["off", "local", "s3"], var.traffic_capture)
+    error_message = "traffic_capture debe ser off, local o s3."
+  }
+}
+
+variable "traffic_capture_sample" {
+  type        = number
+  description = "Fracción de invocaciones capturadas (0-1)"
+  default     = 1
+
+  validation {
+    condition     = var.traffic_capture_sample >= 0 && var.traffic_capture_sample <= 1
+    error_message = "traffic_capture_sample debe estar entre 0 y 1."
+  }
+}
+
+variable "traffic_capture_salt" {
+  type        = string
+  description = "Sal de los seudónimos de la captura (emails, IPs); vacía = aleatoria por contenedor"
+  default     = ""
+  sensitive   = true
+}
+
+variable "traffic_capture_bucket" {
+  type        = string
+  description = "Bucket de las capturas con traffic_capture = s3 (output traffic_capture_bucket de email-dispatcher-lambda)"
+  default     = ""
+}
@@ -47,12 +47,37 @@ resource "aws_iam_role_policy" "email_dispatcher_policy" {
             "ses:SendEmail",
             "ses:SendRawEmail",
             "ses:SendTemplatedEmail",
-            "ses:SendBulkTemplatedEmail"
+            "ses:SendBulkTemplatedEmail",
+            "ses:SendBulkEmail"
           ]
           Resource = "*"
         },
         local.ses_condition
-      )
+      ),
+      {
+        # Cuota de envío (MaxSendRate) para el rate limiting del lado del cliente
+        Effect   = "Allow"
+        Action   = ["ses:GetAccount"]
+        Resource = "*"
+      },
+      {
+        # Tabla de resúmenes al vendor (vendor_digest_enabled en email-dispatcher-lambda)
+        Effect   = "Allow"
+        Action   = ["dynamodb:GetItem", "dynamodb:UpdateItem"]
+        Resource = "arn:aws:dynamodb:*:*:table/${var.project}-${var.env}-*-vendor-digest"
+      },
+      {
+        # Capturas de tráfico (traffic_capture = s3 en email-dispatcher-lambda)
+        Effect   = "Allow"
+        Action   = ["s3:PutObject"]
+        Resource = "arn:aws:s3:::${var.project}-${var.env}-traffic-capture/*"
+      },
+      {
+        # Segmentos de orbit_shared.tracing (tracing_mode = "Active")
+        Effect   = "Allow"
+        Action   = ["xray:PutTraceSegments", "xray:PutTelemetryRecords"]
+        Resource = "*"
+      }
     ]
   })
 }
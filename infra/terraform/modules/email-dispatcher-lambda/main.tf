@@ -4,32 +4,75 @@ locals {
 }
 
 # Empaquetar el código desde ./src
+# Con precompile_bytecode, el zip sale de build/ (src + .pyc generados con el runtime)
+resource "terraform_data" "build" {
+  count = var.precompile_bytecode ? 1 : 0
+
+  triggers_replace = [
+    sha1(join("", [for f in sort(fileset("${path.module}/src", "**/*.{py,html,txt,json}")) : filesha1("${path.module}/src/${f}")]))
+  ]
+
+  provisioner "local-exec" {
+    command = "${var.build_python} ${path.module}/../../../scripts/build_lambda.py ${path.module}/src ${path.module}/build --precompile --runtime python3.12"
+  }
+}
+
 data "archive_file" "lambda_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/src"
+  source_dir  = var.precompile_bytecode ? "${path.module}/build" : "${path.module}/src"
   output_path = "${path.module}/lambda.zip"
+
+  depends_on = [terraform_data.build]
 }
 
 resource "aws_lambda_function" "this" {
-  function_name = local.fn_name_final
-  role          = var.role_arn
-  handler       = "index.lambda_handler"
-  runtime       = "python3.12"
-  filename      = data.archive_file.lambda_zip.output_path
-  architectures = ["x86_64"]
-  memory_size   = var.memory_mb
-  timeout       = var.timeout_seconds
-  publish       = true
+  function_name    = local.fn_name_final
+  role             = var.role_arn
+  handler          = "index.lambda_handler"
+  runtime          = "python3.12"
+  filename         = data.archive_file.lambda_zip.output_path
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  architectures    = ["x86_64"]
+  memory_size      = var.memory_mb
+  timeout          = var.timeout_seconds
+  publish          = true
+  layers           = var.layers
 
   environment {
     variables = {
-      SES_REGION     = var.ses_region
-      FROM_EMAIL     = var.from_email
-      VENDOR_EMAIL   = var.vendor_email
-      ALLOWED_ORIGIN = var.allowed_origin
+      SES_REGION       = var.ses_region
+      FROM_EMAIL       = var.from_email
+      VENDOR_EMAIL     = var.vendor_email
+      ALLOWED_ORIGIN   = var.allowed_origin
+      SES_CONTENT_MODE = var.ses_content_mode
+      MAX_BODY_BYTES   = tostring(var.max_body_bytes)
+      TRACE_XRAY       = tostring(var.tracing_mode == "Active")
+      # Sintaxis + MX del destinatario de ContactAckTemplate antes de SES (recipient_check)
+      RECIPIENT_MX_RESOLVER = var.recipient_mx_resolver
+
+      # Resúmenes al vendor durante picos (vendor_digest.py)
+      VENDOR_DIGEST_ENABLED              = tostring(var.vendor_digest_enabled)
+      VENDOR_DIGEST_TABLE                = try(aws_dynamodb_table.vendor_digest[0].name, "")
+      VENDOR_DIGEST_THRESHOLD_PER_MINUTE = tostring(var.vendor_digest_threshold_per_minute)
+      VENDOR_DIGEST_WINDOW_SECONDS       = tostring(var.vendor_digest_window_seconds)
+      VENDOR_DIGEST_MAX_ITEMS            = tostring(var.vendor_digest_max_items)
+
+      # Rutas del vendor por campos del mensaje (vendor_routing.py); vacío = VENDOR_EMAIL
+      VENDOR_ROUTES = var.vendor_routes == null ? "" : jsonencode(var.vendor_routes)
+
+      # Captura de tráfico sin PII (orbit_shared.capture); off en producción salvo para replays
+      TRAFFIC_CAPTURE        = var.traffic_capture
+      TRAFFIC_CAPTURE_SAMPLE = tostring(var.traffic_capture_sample)
+      TRAFFIC_CAPTURE_BUCKET = try(aws_s3_bucket.traffic_capture[0].bucket, "")
+      TRAFFIC_CAPTURE_SALT   = var.traffic_capture_salt
     }
   }
 
+  # Las líneas orbit_trace van siempre a los logs; Active además manda los spans a X-Ray
+  tracing_config {
+    mode = var.tracing_mode
+  }
+
   tags = var.tags
 }
 
@@ -39,3 +82,98 @@ resource "aws_cloudwatch_log_group" "this" {
   retention_in_days = 30
   tags              = var.tags
 }
+
+########################################
+# Resúmenes al vendor (vendor_digest_enabled)
+########################################
+# Contadores de ritmo y chunks de cada ventana, compartidos entre contenedores
+resource "aws_dynamodb_table" "vendor_digest" {
+  count        = var.vendor_digest_enabled ? 1 : 0
+  name         = "${local.base_name}-vendor-digest"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+# Cada minuto: envía los resúmenes de ventanas cerradas y reintenta los atascados
+resource "aws_cloudwatch_event_rule" "vendor_digest_flush" {
+  count               = var.vendor_digest_enabled ? 1 : 0
+  name                = "${local.base_name}-vendor-digest-flush"
+  description         = "Flush de resúmenes al vendor de ${local.fn_name_final}"
+  schedule_expression = "rate(1 minute)"
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "vendor_digest_flush" {
+  count = var.vendor_digest_enabled ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.vendor_digest_flush[0].name
+  arn   = aws_lambda_function.this.arn
+  input = jsonencode({ vendor_digest = "flush" })
+}
+
+resource "aws_lambda_permission" "vendor_digest_flush" {
+  count         = var.vendor_digest_enabled ? 1 : 0
+  statement_id  = "AllowVendorDigestFlush"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.this.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.vendor_digest_flush[0].arn
+}
+
+########################################
+# Captura de tráfico (traffic_capture = s3)
+########################################
+# Lotes .jsonl.gz de ambos handlers (contact-form recibe el nombre por variable)
+resource "aws_s3_bucket" "traffic_capture" {
+  count         = var.traffic_capture == "s3" ? 1 : 0
+  bucket        = "${var.project}-${var.env}-traffic-capture"
+  force_destroy = true
+  tags          = var.tags
+}
+
+resource "aws_s3_bucket_public_access_block" "traffic_capture" {
+  count                   = var.traffic_capture == "s3" ? 1 : 0
+  bucket                  = aws_s3_bucket.traffic_capture[0].id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "traffic_capture" {
+  count  = var.traffic_capture == "s3" ? 1 : 0
+  bucket = aws_s3_bucket.traffic_capture[0].id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "traffic_capture" {
+  count  = var.traffic_capture == "s3" ? 1 : 0
+  bucket = aws_s3_bucket.traffic_capture[0].id
+
+  rule {
+    id     = "expire-captures"
+    status = "Enabled"
+
+    filter {}
+
+    expiration {
+      days = var.traffic_capture_retention_days
+    }
+  }
+}
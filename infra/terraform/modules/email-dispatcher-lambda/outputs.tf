@@ -5,3 +5,7 @@ output "function_name" {
 output "function_arn" {
   value = aws_lambda_function.this.arn
 }
+
+output "traffic_capture_bucket" {
+  value = try(aws_s3_bucket.traffic_capture[0].bucket, "")
+}
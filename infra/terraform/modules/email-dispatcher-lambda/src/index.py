@@ -1,34 +1,92 @@
-import json, os, base64
-import boto3
-from botocore.exceptions import ClientError
+import json, os
+
+from orbit_shared import capture, deadline, emf, prewarm, request_schema, ses_sender, tracing
+
+import vendor_digest
+import vendor_routing
 
 SES_REGION     = os.getenv("SES_REGION", "us-east-1")
 FROM_EMAIL     = os.getenv("FROM_EMAIL")
 ALLOWED_ORIGIN = os.getenv("ALLOWED_ORIGIN", "*")
 VENDOR_EMAIL   = os.getenv("VENDOR_EMAIL")
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "Orbit/EmailDispatcher")
 
-TEMPLATES = {
-    "ContactAckTemplate": {
-        "required": ["email"],
-        "to_mode": "payload",
-        "to_key": "email",
-        "whitelist": [],
-    },
-    "VendorNotifyTemplate": {
-        "required": ["name", "email", "phone", "projectType", "message"],
-        "to_mode": "env",
-        "env_key": "VENDOR_EMAIL",
-        "whitelist": ["name", "email", "phone", "projectType", "message"],
-    },
-}
+# Plantillas y envío SES viven en la capa compartida (orbit_shared.ses_sender)
+TEMPLATES = ses_sender.TEMPLATES
+
+# Modo batch: límite de SESv2 SendBulkEmail por llamada y mensajes máximos por evento
+BULK_MAX_ENTRIES = ses_sender.BULK_MAX_ENTRIES
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "500"))
+
+# Cliente SES creado al primer envío (boto3 no se importa en preflight / eventos inválidos)
+ses = None
+
+
+def _get_ses():
+    global ses
+    if ses is None:
+        ses = ses_sender.new_client(SES_REGION)
+    return ses
+
+
+# Resúmenes de VendorNotifyTemplate durante picos (VENDOR_DIGEST_ENABLED); se crea al primer uso
+_vendor_digest = None
+
+
+def _get_vendor_digest():
+    global _vendor_digest
+    if _vendor_digest is None:
+        store = (vendor_digest.DynamoDigestStore(vendor_digest.VENDOR_DIGEST_TABLE)
+                 if vendor_digest.VENDOR_DIGEST_TABLE else vendor_digest.MemoryDigestStore())
+        _vendor_digest = vendor_digest.VendorDigest(
+            store, lambda data: ses_sender.send_templated_email(data, _get_ses, FROM_EMAIL))
+    return _vendor_digest
+
+
+# Tabla de rutas del vendor (VENDOR_ROUTES / VENDOR_ROUTES_FILE), compilada una vez por contenedor.
+# None: sin tabla (o inválida), la notificación va a VENDOR_EMAIL como siempre
+_vendor_routes = None
+_vendor_routes_loaded = False
+_vendor_routes_error = None
+# Hilos para mandar en paralelo los destinatarios de las rutas; se crea al primer envío enrutado
+_route_executor = None
+
+
+def _get_vendor_routes():
+    global _vendor_routes, _vendor_routes_loaded, _vendor_routes_error
+    if not _vendor_routes_loaded:
+        try:
+            _vendor_routes = vendor_routing.load(TEMPLATES)
+        except (OSError, ValueError) as e:
+            # Tabla inválida: no se pierden notificaciones, van al destino de siempre
+            print("Vendor routes error, using VENDOR_EMAIL:", str(e))
+            _vendor_routes, _vendor_routes_error = None, str(e)
+        _vendor_routes_loaded = True
+    return _vendor_routes
 
-ses = boto3.client("sesv2", region_name=SES_REGION)
+
+def _get_route_executor():
+    global _route_executor
+    if _route_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _route_executor = ThreadPoolExecutor(max_workers=vendor_routing.VENDOR_ROUTES_MAX_PARALLEL,
+                                             thread_name_prefix="vendor-route")
+    return _route_executor
+
+
+def _vendor_routes_stats():
+    """Prewarm: carga y compila la tabla fuera del camino de la request."""
+    table = _get_vendor_routes()
+    if _vendor_routes_error:
+        return {"ok": False, "error": _vendor_routes_error}
+    return table.stats() if table is not None else {"routes": 0}
 
 # -----------------------------
 # Helpers
 # -----------------------------
 def _api_response(code, body):
     """Respuesta con CORS para API Gateway."""
+    _record_outcome(body, code)
     return {
         "statusCode": code,
         "headers": {
@@ -43,98 +101,172 @@ def _api_response(code, body):
 def _normalize_event_to_data(event):
     """
     Acepta:
-      - HTTP API (v2 o v1) con body (string JSON, quizá base64)
+      - HTTP API (v2 o v1) con body (string JSON, quizá base64), con el mismo límite
+        de tamaño que contact-form (request_schema.decode_body)
       - Dict directo (invocación de otra Lambda) con keys nivel raíz
     Devuelve: (data_dict, is_http) donde is_http=True si viene de API Gateway.
     """
-    # 1) API Gateway HTTP v2
-    if isinstance(event, dict) and "requestContext" in event and isinstance(event.get("body"), (str, type(None))):
-        is_http = True
-        body = event.get("body")
-        if body is None:
+    # 1) API Gateway HTTP v2 (requestContext) o REST v1 (httpMethod)
+    if isinstance(event, dict) and ("requestContext" in event or "httpMethod" in event) \
+            and isinstance(event.get("body"), (str, type(None))):
+        data, code = request_schema.decode_body(event)
+        if code == "missing":
             return None, True  # HTTP sin body => 400 después
-        if event.get("isBase64Encoded"):
-            body = base64.b64decode(body).decode("utf-8")
-        try:
-            data = json.loads(body)
-            return data, True
-        except Exception:
+        if code == "too_large":
+            return "__TOO_LARGE__", True
+        if code:
             return "__INVALID_JSON__", True
+        return data, True
 
-    # 2) API Gateway REST (v1) con httpMethod
-    if isinstance(event, dict) and "httpMethod" in event and isinstance(event.get("body"), (str, type(None))):
-        is_http = True
-        body = event.get("body")
-        if body is None:
-            return None, True
-        if event.get("isBase64Encoded"):
-            body = base64.b64decode(body).decode("utf-8")
-        try:
-            data = json.loads(body)
-            return data, True
-        except Exception:
-            return "__INVALID_JSON__", True
-
-    # 3) Invocación directa de Lambda: esperamos un dict ya usable
+    # 2) Invocación directa de Lambda: esperamos un dict ya usable
     if isinstance(event, dict):
         # Si ya trae 'template' o campos requeridos, úsalo tal cual
         return event, False
 
-    # 4) Cualquier otro caso
+    # 3) Cualquier otro caso
     return "__INVALID_EVENT__", False
 
+
+def _validate_message(data):
+    """Tipos y longitudes del mensaje (request_schema.MESSAGE). Devuelve (data, None) o (None, {"error": ...})."""
+    if not isinstance(data, dict):
+        return None, {"error": "Invalid event"}
+    clean, errors = request_schema.MESSAGE.validate(data)
+    if errors:
+        return None, {"error": request_schema.field_errors_message(errors), "fields": errors}
+    return clean, None
+
+
+def _prepare_templated_email(data):
+    """Valida y resuelve destinatario + TemplateData. Devuelve (prepared, None) o (None, {"error": ...})."""
+    return ses_sender.prepare_templated_email(data, FROM_EMAIL)
+
+
 def _send_templated_email(data):
     """
     Lógica pura: valida, arma TemplateData y envía por SES.
     data: dict con al menos {"template": "<name>", ...}
     Devuelve dict {"ok": True, "messageId": "..."} o {"error": "..."}
     """
-    template_name = (data.get("template") or "").strip()
-    tpl = TEMPLATES.get(template_name)
-    if not tpl:
-        return {"error": "Unknown template"}
-
-    missing = [f for f in tpl["required"] if not str(data.get(f) or "").strip()]
-    if missing:
-        return {"error": f"Missing fields: {', '.join(missing)}"}
-
-    if not FROM_EMAIL:
-        return {"error": "FROM_EMAIL not configured"}
-
-    # Resolver destinatario
-    if tpl["to_mode"] == "payload":
-        to_email = (data.get(tpl["to_key"]) or "").strip()
-        if not to_email:
-            return {"error": f"Missing destination field '{tpl['to_key']}'"}
-    elif tpl["to_mode"] == "env":
-        env_key = tpl["env_key"]
-        to_email = os.getenv(env_key, "").strip()
-        if not to_email:
-            return {"error": f"{env_key} not configured"}
-    else:
-        return {"error": "Invalid template routing"}
+    data, error = _validate_message(data)
+    if error:
+        return error
+    if data.get("template") == vendor_routing.SOURCE_TEMPLATE:
+        routed = _route_vendor_notification(data)
+        if routed is not None:
+            return routed
+    if vendor_digest.VENDOR_DIGEST_ENABLED and data.get("template") == vendor_digest.SOURCE_TEMPLATE:
+        coalesced = _coalesce_vendor_notification(data)
+        if coalesced is not None:
+            return coalesced
+    return ses_sender.send_templated_email(data, _get_ses, FROM_EMAIL)
+
+
+def _route_vendor_notification(data):
+    """
+    Rutas de la tabla que aplican a la notificación, mandadas en paralelo con resultado por
+    destinatario. None si no hay tabla o solo aplica VENDOR_EMAIL (envío de siempre, con resúmenes).
+    Un reintento tras entrega parcial trae "_delivered" (el "delivered" del intento anterior):
+    esos destinatarios no se vuelven a mandar.
+    """
+    table = _get_vendor_routes()
+    if table is None:
+        return None
+    with emf.stage("vendor_route_match"):
+        routes = table.match(data)
+    if not routes or (len(routes) == 1 and routes[0].implicit):
+        return None
+    emf.current().put_property("vendor_routes", [r.name for r in routes])
+    with emf.stage("vendor_route_send"):
+        result = vendor_routing.deliver(
+            routes, data, lambda message, to: ses_sender.send_templated_email(message, _get_ses, FROM_EMAIL, to),
+            _get_route_executor())
+    emf.current().increment("vendor_route_sends", result["sent"] + result.get("failed", 0))
+    return result
+
+
+def _coalesce_vendor_notification(data):
+    """
+    Por encima del umbral, la notificación entra a un resumen (vendor_digest) en vez de salir sola.
+    Devuelve el resultado del agrupado, un error de validación, o None para enviarla ya.
+    """
+    # Mismas validaciones que un envío normal: un mensaje incompleto no entra al resumen
+    _, error = ses_sender.prepare_templated_email(data, FROM_EMAIL)
+    if error:
+        return error
+    digest = _get_vendor_digest()
+    with emf.stage("vendor_digest"):
+        result = digest.submit(data)
+    emf.current().put_property("vendor_digest", digest.stats())
+    if result is not None:
+        emf.current().increment("vendor_coalesced")
+    return result
+
+
+def _send_batch(messages):
+    """
+    SendBulkEmail agrupado por plantilla; un resultado por mensaje, en orden.
+    Los mensajes que no pasan el esquema no llegan a SES y se reportan en su posición.
+    """
+    results = [None] * len(messages)
+    valid = []
+    for i, data in enumerate(messages):
+        clean, error = _validate_message(data)
+        if error:
+            results[i] = {"index": i, **error}
+        else:
+            valid.append((i, clean))
+    if len(valid) == len(messages):
+        return ses_sender.send_batch([m for _, m in valid], _get_ses, FROM_EMAIL)
+
+    sent = ses_sender.send_batch([m for _, m in valid], _get_ses, FROM_EMAIL) if valid else {"results": []}
+    for (i, _), result in zip(valid, sent["results"]):
+        results[i] = {**result, "index": i}
+    failed = sum(1 for r in results if not r.get("ok"))
+    return {"ok": failed == 0, "sent": len(results) - failed, "failed": failed, "results": results}
+
+
+def _is_batch(data):
+    return isinstance(data, dict) and isinstance(data.get("messages"), list)
+
 
-    # Construir TemplateData seguro
-    if template_name == "ContactAckTemplate":
-        safe_payload = {"supportEmail": FROM_EMAIL}
+def _handle_batch(data):
+    """Valida el tamaño del lote y lo envía. Devuelve (status_code, body)."""
+    messages = data["messages"]
+    if not messages:
+        return 400, {"error": "Empty batch"}
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return 400, {"error": f"Batch too large (max {BATCH_MAX_MESSAGES})"}
+    result = _send_batch(messages)
+    # 207: lote aceptado con fallas parciales (detalle por mensaje en results)
+    return (200 if result["ok"] else 207), result
+
+# Errores atribuibles al llamador (métrica Outcome=rejected)
+CLIENT_ERRORS = ("Unknown template", "Missing fields", "Missing destination field", "Invalid event",
+                 "Missing body", "Invalid JSON", "Invalid fields", "Body too large", "Empty batch",
+                 "Batch too large", "Invalid recipient")
+
+
+def _record_outcome(result, status=None):
+    """Resultado de la request para las métricas; ErrorCode sin el detalle variable ('Missing fields')."""
+    error = result.get("error") if isinstance(result, dict) else None
+    if status is not None and status < 400 and status != 207:
+        emf.current().set_outcome("ok")
+    elif error:
+        code = error.split(":")[0].split(" (")[0]
+        emf.current().set_outcome("rejected" if code.startswith(CLIENT_ERRORS) else "error", code)
+    elif isinstance(result, dict) and result.get("failed"):
+        emf.current().set_outcome("partial", "batch_partial_failure")
     else:
-        whitelist = tpl.get("whitelist", [])
-        safe_payload = {k: data.get(k, "") for k in whitelist}
+        emf.current().set_outcome("ok")
 
-    template_data = json.dumps(safe_payload)
 
-    # Enviar por SES
-    try:
-        resp = ses.send_email(
-            FromEmailAddress=FROM_EMAIL,
-            Destination={"ToAddresses": [to_email]},
-            Content={"Template": {"TemplateName": template_name, "TemplateData": template_data}},
-            ReplyToAddresses=[FROM_EMAIL],
-        )
-        return {"ok": True, "messageId": resp.get("MessageId")}
-    except ClientError as e:
-        print("SES error:", str(e))
-        return {"error": "SES error", "detail": str(e)}
+# Conexiones y recursos que abre un evento de warm-up (ver orbit_shared.prewarm)
+PREWARM_PRIMERS = {
+    "ses": lambda: ses_sender.warm(_get_ses),
+    "vendor_routes": _vendor_routes_stats,
+}
+
 
 # -----------------------------
 # Handlers
@@ -143,8 +275,51 @@ def lambda_handler(event, context):
     """
     - Si viene de API Gateway (v1/v2), responde con formato HTTP (CORS).
     - Si viene de otra Lambda (dict directo), devuelve dict simple sin CORS.
+    - {"messages": [...]} activa el modo batch (SendBulkEmail) con resultados por mensaje.
+    - {"warmup": ...} (o un Scheduled Event de EventBridge) solo calienta el contenedor.
+    - {"vendor_digest": "flush"} (regla programada) envía los resúmenes de ventanas cerradas.
+    Cada invocación emite una línea EMF con los tiempos por etapa y una línea orbit_trace
+    con sus spans; si el payload trae "_trace" (contact-form), la traza continúa la suya.
+    Los envíos a SES usan el presupuesto del context; si se agota, la respuesta es
+    {"error": "deadline_exceeded", "stage": ...} (503 por HTTP).
     """
-    data, is_http = _normalize_event_to_data(event)
+    metrics = emf.start(METRICS_NAMESPACE, "email-dispatcher")
+    deadline.start(context)
+    trace = None
+    try:
+        # Warm-up (ping programado o invocación desde contact-form): solo abre la conexión SES
+        if prewarm.is_warmup(event):
+            return prewarm.run(event, context, PREWARM_PRIMERS)
+        capture.record("email-dispatcher", event)
+        trace = tracing.start("email-dispatcher", tracing.extract(event), cold_start=metrics.cold_start,
+                              request_id=getattr(context, "aws_request_id", None))
+        metrics.put_property("trace_id", trace.trace_id)
+        if isinstance(event, dict) and event.get("vendor_digest") == "flush":
+            return _flush_vendor_digests()
+        return _handle(event)
+    except Exception:
+        metrics.set_outcome("error", "unhandled_exception")
+        raise
+    finally:
+        if trace is not None:
+            trace.flush(outcome=metrics.outcome, error_code=metrics.error_code)
+        metrics.flush()
+
+
+def _flush_vendor_digests():
+    """Evento programado: resúmenes de ventanas cerradas y chunks atascados en flushing."""
+    digest = _get_vendor_digest()
+    with emf.stage("vendor_digest_flush"):
+        result = digest.flush_due()
+    emf.current().increment("vendor_digests_flushed", result["flushed"])
+    emf.current().put_property("vendor_digest", digest.stats())
+    _record_outcome(result if result["ok"] else {"error": "vendor_digest_flush_failed"})
+    return result
+
+
+def _handle(event):
+    with emf.stage("body_parse"):
+        data, is_http = _normalize_event_to_data(event)
 
     if is_http:
         # Soporte preflight
@@ -155,23 +330,37 @@ def lambda_handler(event, context):
 
         if data is None:
             return _api_response(400, {"error": "Missing body"})
+        if data == "__TOO_LARGE__":
+            return _api_response(413, {"error": f"Body too large (max {request_schema.MAX_BODY_BYTES} bytes)"})
         if data == "__INVALID_JSON__":
             return _api_response(400, {"error": "Invalid JSON"})
         if data == "__INVALID_EVENT__":
             return _api_response(400, {"error": "Invalid event"})
 
+        if _is_batch(data):
+            code, result = _handle_batch(data)
+            return _api_response(code, result)
+
         result = _send_templated_email(data)
         if "ok" in result:
             return _api_response(200, result)
+        # Presupuesto agotado o SES throttled / transitorio tras los reintentos: el llamador puede reintentar
+        if result.get("error") == "deadline_exceeded" or result.get("retryable"):
+            return _api_response(503, result)
         # Diferencia errores de cliente (400) vs servidor (500)
-        client_errors = ("Unknown template", "Missing fields", "Missing destination field")
+        client_errors = ("Unknown template", "Missing fields", "Missing destination field", "Invalid fields",
+                         "Invalid recipient")
         if any(result.get("error", "").startswith(e) for e in client_errors):
             return _api_response(400, result)
         return _api_response(500, result)
 
     # Invocación directa (otra Lambda)
     if data in ("__INVALID_JSON__", "__INVALID_EVENT__", None):
-        return {"error": "Invalid event"}
-    result = _send_templated_email(data)
+        result = {"error": "Invalid event"}
+    elif _is_batch(data):
+        _, result = _handle_batch(data)
+    else:
+        result = _send_templated_email(data)
+    _record_outcome(result)
     # Aquí devolvemos dict simple, útil para await en otra Lambda
     return result
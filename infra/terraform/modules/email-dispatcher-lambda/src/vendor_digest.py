@@ -0,0 +1,329 @@
+"""
+Agrupación de notificaciones al vendor (VendorNotifyTemplate) en resúmenes durante picos.
+
+Con poco tráfico cada envío sale solo, como siempre. Si el ritmo de notificaciones
+supera VENDOR_DIGEST_THRESHOLD_PER_MINUTE (contador por minuto en el store compartido,
+con ventana deslizante aproximada), las siguientes se guardan en un "chunk" de la
+ventana actual (VENDOR_DIGEST_WINDOW_SECONDS) y salen juntas en un solo correo
+VendorDigestTemplate:
+  - cuando el chunk llega a VENDOR_DIGEST_MAX_ITEMS: lo envía la request que lo llenó
+  - cuando la ventana cierra: lo envía flush_due(), que el dispatcher corre con el
+    evento programado {"vendor_digest": "flush"} (EventBridge, cada minuto)
+
+Cada chunk es un solo ítem (entries + estado), así agregar y reclamar son escrituras
+condicionales sobre el mismo ítem: una vez reclamado (flushing) ya no acepta entradas y
+la siguiente va al chunk que sigue. Si el envío del resumen falla, el chunk queda en
+flushing y flush_due() lo reintenta pasados VENDOR_DIGEST_RETRY_SECONDS.
+
+Backends: DynamoDB (PK 'pk', TTL en 'expires_at') o en memoria (por contenedor / pruebas).
+Si el store falla, la notificación se envía sola (fail-open).
+"""
+import os
+import threading
+import time
+
+VENDOR_DIGEST_ENABLED = os.getenv("VENDOR_DIGEST_ENABLED", "false").lower() in ("1", "true", "yes")
+VENDOR_DIGEST_TABLE = os.getenv("VENDOR_DIGEST_TABLE", "")
+# Notificaciones por minuto a partir de las cuales se agrupa
+VENDOR_DIGEST_THRESHOLD_PER_MINUTE = float(os.getenv("VENDOR_DIGEST_THRESHOLD_PER_MINUTE", "10"))
+VENDOR_DIGEST_WINDOW_SECONDS = int(os.getenv("VENDOR_DIGEST_WINDOW_SECONDS", "300"))
+VENDOR_DIGEST_MAX_ITEMS = int(os.getenv("VENDOR_DIGEST_MAX_ITEMS", "20"))
+# Tope por mensaje dentro del resumen (el ítem de DynamoDB no pasa de 400 KB)
+VENDOR_DIGEST_MESSAGE_MAX_CHARS = int(os.getenv("VENDOR_DIGEST_MESSAGE_MAX_CHARS", "1500"))
+# Chunks en flushing más viejos que esto se reintentan (envío fallido o Lambda cortada)
+VENDOR_DIGEST_RETRY_SECONDS = float(os.getenv("VENDOR_DIGEST_RETRY_SECONDS", "120"))
+# Ventanas cerradas que revisa flush_due()
+VENDOR_DIGEST_LOOKBACK_WINDOWS = int(os.getenv("VENDOR_DIGEST_LOOKBACK_WINDOWS", "12"))
+# Vida de los ítems del store (TTL)
+VENDOR_DIGEST_TTL_SECONDS = int(os.getenv("VENDOR_DIGEST_TTL_SECONDS", "86400"))
+
+SOURCE_TEMPLATE = "VendorNotifyTemplate"
+DIGEST_TEMPLATE = "VendorDigestTemplate"
+ENTRY_FIELDS = ("name", "email", "phone", "projectType", "message")
+
+
+class MemoryDigestStore:
+    """Backend en memoria (stand-in local de DynamoDB)."""
+
+    def __init__(self):
+        self._items: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, ttl_seconds: float) -> int:
+        with self._lock:
+            item = self._items.setdefault(key, {"count": 0})
+            item["count"] += 1
+            return item["count"]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return self._items.get(key, {}).get("count", 0)
+
+    def append(self, key: str, entry: dict, max_items: int, ttl_seconds: float) -> int | None:
+        """Agrega la entrada si el chunk sigue abierto y tiene lugar. Devuelve el total o None."""
+        with self._lock:
+            item = self._items.setdefault(key, {"entries": [], "state": "open"})
+            if item["state"] != "open" or len(item["entries"]) >= max_items:
+                return None
+            item["entries"].append(entry)
+            return len(item["entries"])
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            item = self._items.get(key)
+            return {**item, "entries": list(item.get("entries", []))} if item else None
+
+    def claim(self, key: str, now: float, stale_before: float) -> list | None:
+        """Pasa el chunk a flushing (abierto, o en flushing desde antes de stale_before) y devuelve sus entradas."""
+        with self._lock:
+            item = self._items.get(key)
+            if not item or not item.get("entries"):
+                return None
+            if item["state"] == "sent" or (item["state"] == "flushing" and item["claimed_at"] >= stale_before):
+                return None
+            item["state"], item["claimed_at"] = "flushing", now
+            return list(item["entries"])
+
+    def mark_sent(self, key: str, message_id: str | None):
+        with self._lock:
+            self._items[key].update(state="sent", message_id=message_id)
+
+
+class DynamoDigestStore:
+    """
+    Backend en DynamoDB. Tabla con PK 'pk' (S) y TTL en 'expires_at'. Ítems:
+      rate#<minuto>         contador de notificaciones (ADD)
+      chunk#<ventana>#<n>   entries (lista), n, state (open | flushing | sent), claimed_at
+    """
+
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def incr(self, key: str, ttl_seconds: float) -> int:
+        resp = self.client.update_item(
+            TableName=self.table_name, Key={"pk": {"S": key}},
+            UpdateExpression="ADD #c :one SET expires_at = if_not_exists(expires_at, :exp)",
+            ExpressionAttributeNames={"#c": "count"},
+            ExpressionAttributeValues={":one": {"N": "1"}, ":exp": {"N": str(int(time.time() + ttl_seconds))}},
+            ReturnValues="UPDATED_NEW",
+        )
+        return int(resp["Attributes"]["count"]["N"])
+
+    def count(self, key: str) -> int:
+        item = self.client.get_item(TableName=self.table_name, Key={"pk": {"S": key}}).get("Item")
+        return int(item["count"]["N"]) if item and "count" in item else 0
+
+    def append(self, key: str, entry: dict, max_items: int, ttl_seconds: float) -> int | None:
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.client.update_item(
+                TableName=self.table_name, Key={"pk": {"S": key}},
+                UpdateExpression=("SET #e = list_append(if_not_exists(#e, :empty), :e), "
+                                  "#s = if_not_exists(#s, :open), expires_at = if_not_exists(expires_at, :exp) "
+                                  "ADD #n :one"),
+                ConditionExpression="(attribute_not_exists(#s) OR #s = :open) AND "
+                                    "(attribute_not_exists(#n) OR #n < :max)",
+                ExpressionAttributeNames={"#s": "state", "#e": "entries", "#n": "n"},
+                ExpressionAttributeValues={
+                    ":e": {"L": [{"M": {k: {"S": str(v)} for k, v in entry.items()}}]},
+                    ":empty": {"L": []}, ":open": {"S": "open"}, ":one": {"N": "1"},
+                    ":max": {"N": str(max_items)}, ":exp": {"N": str(int(time.time() + ttl_seconds))},
+                },
+                ReturnValues="UPDATED_NEW",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        return int(resp["Attributes"]["n"]["N"])
+
+    @staticmethod
+    def _entries(item: dict) -> list:
+        return [{k: v["S"] for k, v in e["M"].items()} for e in item.get("entries", {}).get("L", [])]
+
+    def get(self, key: str) -> dict | None:
+        item = self.client.get_item(TableName=self.table_name, Key={"pk": {"S": key}},
+                                    ConsistentRead=True).get("Item")
+        if not item:
+            return None
+        return {"state": item.get("state", {}).get("S", "open"), "entries": self._entries(item)}
+
+    def claim(self, key: str, now: float, stale_before: float) -> list | None:
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.client.update_item(
+                TableName=self.table_name, Key={"pk": {"S": key}},
+                UpdateExpression="SET #s = :flushing, claimed_at = :now",
+                ConditionExpression="attribute_exists(#e) AND "
+                                    "(#s = :open OR (#s = :flushing AND claimed_at < :stale))",
+                ExpressionAttributeNames={"#s": "state", "#e": "entries"},
+                ExpressionAttributeValues={":flushing": {"S": "flushing"}, ":open": {"S": "open"},
+                                           ":now": {"N": repr(now)}, ":stale": {"N": repr(stale_before)}},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        return self._entries(resp["Attributes"])
+
+    def mark_sent(self, key: str, message_id: str | None):
+        self.client.update_item(
+            TableName=self.table_name, Key={"pk": {"S": key}},
+            UpdateExpression="SET #s = :sent, message_id = :mid",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={":sent": {"S": "sent"}, ":mid": {"S": message_id or ""}},
+        )
+
+
+def _fmt_time(epoch: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(epoch))
+
+
+def render_entries(entries: list) -> str:
+    """Texto plano del resumen: un bloque por envío (la plantilla HTML lo muestra con pre-wrap)."""
+    blocks = []
+    for i, e in enumerate(entries, 1):
+        message = e.get("message", "")
+        if len(message) > VENDOR_DIGEST_MESSAGE_MAX_CHARS:
+            message = message[:VENDOR_DIGEST_MESSAGE_MAX_CHARS] + " […]"
+        received = _fmt_time(float(e["received_at"])) if e.get("received_at") else ""
+        blocks.append(
+            f"#{i} · {received}\n"
+            f"Nombre: {e.get('name', '')}\nCorreo: {e.get('email', '')}\n"
+            f"Teléfono: {e.get('phone', '')}\nAsunto: {e.get('projectType', '')}\n\n"
+            f"Mensaje:\n{message}"
+        )
+    return "\n\n────────────\n\n".join(blocks)
+
+
+class VendorDigest:
+    """
+    submit(data) -> None (enviar solo, como siempre) o el resultado de haberlo agrupado.
+    send_digest(entries) es la función que manda el resumen (p.ej. ses_sender con DIGEST_TEMPLATE).
+    """
+
+    def __init__(self, store, send_digest, threshold_per_minute: float = VENDOR_DIGEST_THRESHOLD_PER_MINUTE,
+                 window_seconds: int = VENDOR_DIGEST_WINDOW_SECONDS, max_items: int = VENDOR_DIGEST_MAX_ITEMS,
+                 clock=time.time):
+        self.store = store
+        self.send_digest = send_digest
+        self.threshold = threshold_per_minute
+        self.window_seconds = max(60, int(window_seconds))
+        self.max_items = max(2, min(int(max_items), 100))
+        self._clock = clock
+        # Chunk abierto conocido por ventana (evita recorrer los llenos en cada envío)
+        self._chunk_hint: dict[int, int] = {}
+        self._prev_minute: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+        self._stats = {"immediate": 0, "coalesced": 0, "digests_sent": 0, "digest_errors": 0, "store_errors": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def rate_per_minute(self, now: float) -> float:
+        """Suma esta notificación y estima el ritmo (minuto actual + parte proporcional del anterior)."""
+        minute = int(now // 60)
+        current = self.store.incr(f"rate#{minute}", 180)
+        if self._prev_minute is None or self._prev_minute[0] != minute - 1:
+            # El minuto anterior ya cerró: se lee una vez por contenedor
+            self._prev_minute = (minute - 1, self.store.count(f"rate#{minute - 1}"))
+        elapsed = (now % 60) / 60
+        return current + self._prev_minute[1] * (1 - elapsed)
+
+    @staticmethod
+    def _chunk_key(window: int, n: int) -> str:
+        return f"chunk#{window}#{n}"
+
+    def submit(self, data: dict) -> dict | None:
+        now = self._clock()
+        try:
+            rate = self.rate_per_minute(now)
+            if rate <= self.threshold:
+                self._count("immediate")
+                return None
+            entry = {k: str(data.get(k, "")) for k in ENTRY_FIELDS}
+            entry["received_at"] = repr(round(now, 3))
+            window = int(now // self.window_seconds)
+            n = self._chunk_hint.get(window, 0)
+            for _ in range(64):
+                key = self._chunk_key(window, n)
+                size = self.store.append(key, entry, self.max_items, VENDOR_DIGEST_TTL_SECONDS)
+                if size is not None:
+                    break
+                n += 1  # lleno o ya reclamado: el siguiente chunk de la ventana
+            else:
+                self._count("immediate")
+                return None
+            self._chunk_hint = {window: n}
+        except Exception as e:
+            print("Vendor digest store error, sending immediately:", repr(e))
+            self._count("store_errors")
+            return None
+
+        self._count("coalesced")
+        result = {"ok": True, "coalesced": True, "digest": key, "position": size,
+                  "rate_per_minute": round(rate, 2)}
+        if size >= self.max_items:
+            # Esta entrada llenó el chunk: el resumen sale ya, sin esperar a que cierre la ventana
+            result["digest_result"] = self.flush(key)
+        return result
+
+    def flush(self, key: str, stale_before: float | None = None) -> dict | None:
+        """Reclama el chunk y manda el resumen. None si otro contenedor ya lo reclamó o está vacío."""
+        now = self._clock()
+        entries = self.store.claim(key, now, now - VENDOR_DIGEST_RETRY_SECONDS if stale_before is None
+                                   else stale_before)
+        if not entries:
+            return None
+        window = int(key.split("#")[1])
+        start = window * self.window_seconds
+        received = [float(e["received_at"]) for e in entries if e.get("received_at")]
+        data = {
+            "template": DIGEST_TEMPLATE,
+            "count": str(len(entries)),
+            "window": f"{_fmt_time(min(received) if received else start)} – "
+                      f"{_fmt_time(max(received) if received else start + self.window_seconds)}",
+            "entries": render_entries(entries),
+        }
+        result = self.send_digest(data)
+        if result.get("ok"):
+            self.store.mark_sent(key, result.get("messageId"))
+            self._count("digests_sent")
+        else:
+            # Queda en flushing: flush_due() lo reintenta pasados VENDOR_DIGEST_RETRY_SECONDS
+            self._count("digest_errors")
+        return {**result, "digest": key, "entries": len(entries)}
+
+    def flush_due(self, lookback_windows: int = VENDOR_DIGEST_LOOKBACK_WINDOWS) -> dict:
+        """Envía los chunks de ventanas ya cerradas (y reintenta los atascados en flushing)."""
+        now = self._clock()
+        current = int(now // self.window_seconds)
+        results = []
+        for window in range(current - lookback_windows, current + 1):
+            n = 0
+            while n < 1000:
+                key = self._chunk_key(window, n)
+                item = self.store.get(key)
+                if item is None:
+                    break
+                if item["state"] != "sent" and (window < current or item["state"] == "flushing"):
+                    result = self.flush(key)
+                    if result is not None:
+                        results.append(result)
+                n += 1
+        return {"ok": all(r.get("ok") for r in results), "flushed": len(results),
+                "entries": sum(r.get("entries", 0) for r in results), "results": results}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
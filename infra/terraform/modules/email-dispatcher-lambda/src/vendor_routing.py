@@ -0,0 +1,343 @@
+"""
+Enrutamiento de las notificaciones al vendor (VendorNotifyTemplate) por campos del mensaje.
+
+Sin tabla de rutas todo sigue igual: la notificación va a VENDOR_EMAIL (ses_sender.TEMPLATES).
+Con tabla (VENDOR_ROUTES, JSON en el env, o VENDOR_ROUTES_FILE, un JSON empaquetado con la
+Lambda para tablas que no caben en los 4 KB del env), cada ruta dice a quién y con qué
+plantilla va un mensaje según sus campos:
+
+    {
+      "routes": [
+        {"name": "ecommerce", "when": {"projectType": ["ecommerce", "tienda en línea"]},
+         "to": ["ventas-ecommerce@orbit.com.mx", "$VENDOR_EMAIL"]},
+        {"name": "urgente", "when": {"message": {"contains": "urgente"}}, "to": ["guardia@orbit.com.mx"],
+         "continue": true},
+        {"name": "apps", "when": {"projectType": {"prefix": "app"}, "locale": {"regex": "^en"}},
+         "to": ["apps@orbit.com.mx"], "template": "VendorNotifyTemplate"}
+      ],
+      "default": {"to": ["$VENDOR_EMAIL"]}
+    }
+
+Condiciones por campo (sin distinguir mayúsculas, con espacios recortados; todas deben
+cumplirse, "when" vacío siempre cumple): un valor o lista de valores (igualdad), o un
+objeto con "in", "prefix", "contains", "regex" o "exists". Las rutas se evalúan en orden y
+la primera que cumple corta, salvo que tenga "continue": true (entonces también se evalúan
+las siguientes). Si ninguna ruta que corta coincide, también aplica "default" (sin "default",
+VENDOR_EMAIL como siempre).
+"$NOMBRE" en "to" se toma del env al compilar.
+
+La tabla se carga y compila una vez por contenedor: las condiciones de igualdad se indexan
+por (campo, valor), así que un mensaje solo evalúa las rutas candidatas de su projectType
+y las que no tienen igualdad, en vez de recorrer cientos de reglas.
+
+deliver() manda cada (ruta, destinatario) en paralelo y devuelve el resultado de cada uno,
+más "delivered": las claves "plantilla:destinatario" que ya recibieron. Tras una entrega
+parcial, el llamador reintenta el mismo mensaje con esas claves en "_delivered" y solo se
+manda a los destinatarios que fallaron.
+"""
+import json
+import os
+import re
+
+from orbit_shared import emf, request_schema
+
+VENDOR_ROUTES = os.getenv("VENDOR_ROUTES", "").strip()
+VENDOR_ROUTES_FILE = os.getenv("VENDOR_ROUTES_FILE", os.path.join(os.path.dirname(__file__), "vendor_routes.json"))
+# Destinatarios máximos por mensaje, sumando todas las rutas que coinciden
+VENDOR_ROUTES_MAX_RECIPIENTS = int(os.getenv("VENDOR_ROUTES_MAX_RECIPIENTS", "10"))
+# Envíos simultáneos de una notificación enrutada
+VENDOR_ROUTES_MAX_PARALLEL = int(os.getenv("VENDOR_ROUTES_MAX_PARALLEL", "4"))
+
+SOURCE_TEMPLATE = "VendorNotifyTemplate"
+# Campo del mensaje con los destinatarios que ya recibieron en un intento anterior
+DELIVERED_FIELD = "_delivered"
+OPERATORS = ("in", "prefix", "contains", "regex", "exists")
+_EMAIL_RE = re.compile(request_schema.EMAIL_PATTERN)
+
+
+def _norm(value) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+class _Fields(dict):
+    """Campos normalizados de un mensaje, calculados al primer uso (una vez por campo, no por regla)."""
+
+    def __init__(self, data: dict):
+        super().__init__()
+        self.data = data
+
+    def __missing__(self, field):
+        value = self[field] = _norm(self.data.get(field))
+        return value
+
+
+def _compile_condition(route: str, field: str, spec):
+    """(igualdad, predicado): igualdad = frozenset de valores indexables o None; predicado(valor normalizado)."""
+    if isinstance(spec, (str, int, float)) and not isinstance(spec, bool):
+        spec = {"in": [spec]}
+    elif isinstance(spec, list):
+        spec = {"in": spec}
+    if not isinstance(spec, dict) or len(spec) != 1 or next(iter(spec)) not in OPERATORS:
+        raise ValueError(f"route {route!r}: condition on {field!r} must be a value, a list or one of {OPERATORS}")
+    op, arg = next(iter(spec.items()))
+    if op == "in":
+        if not isinstance(arg, list) or not arg:
+            raise ValueError(f"route {route!r}: 'in' on {field!r} needs a non-empty list")
+        values = frozenset(_norm(v) for v in arg)
+        return values, values.__contains__
+    if op == "exists":
+        return None, (lambda v: bool(v)) if arg else (lambda v: not v)
+    if not isinstance(arg, str) or not arg:
+        raise ValueError(f"route {route!r}: {op!r} on {field!r} needs a non-empty string")
+    if op == "prefix":
+        prefix = _norm(arg)
+        return None, lambda v: v.startswith(prefix)
+    if op == "contains":
+        needle = _norm(arg)
+        return None, lambda v: needle in v
+    try:
+        pattern = re.compile(arg, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"route {route!r}: invalid regex on {field!r}: {e}") from None
+    return None, lambda v: pattern.search(v) is not None
+
+
+def _compile_recipients(route: str, to, env) -> tuple[str, ...]:
+    if isinstance(to, str):
+        to = [to]
+    if not isinstance(to, list) or not to:
+        raise ValueError(f"route {route!r}: 'to' needs at least one recipient")
+    recipients = []
+    for address in to:
+        address = str(address).strip()
+        if address.startswith("$"):
+            address = (env.get(address[1:]) or "").strip()
+            if not address:
+                continue  # variable sin configurar (p.ej. VENDOR_EMAIL en pruebas): se omite
+        if not _EMAIL_RE.fullmatch(address):
+            raise ValueError(f"route {route!r}: invalid recipient {address!r}")
+        if address.lower() not in (r.lower() for r in recipients):
+            recipients.append(address)
+    if not recipients:
+        raise ValueError(f"route {route!r}: no recipients after resolving env variables")
+    if len(recipients) > VENDOR_ROUTES_MAX_RECIPIENTS:
+        raise ValueError(f"route {route!r}: more than {VENDOR_ROUTES_MAX_RECIPIENTS} recipients")
+    return tuple(recipients)
+
+
+class Route:
+    __slots__ = ("name", "order", "template", "recipients", "stop", "conditions", "implicit")
+
+    def __init__(self, name, order, template, recipients, stop, conditions, implicit=False):
+        self.name = name
+        self.order = order
+        self.template = template
+        self.recipients = recipients
+        self.stop = stop
+        # [(campo, predicado)] que quedan por evaluar después del índice
+        self.conditions = conditions
+        # Default sin "default" en la tabla: VENDOR_EMAIL, el destino de siempre
+        self.implicit = implicit
+
+    def matches(self, fields: dict) -> bool:
+        """fields: campos normalizados del mensaje (_Fields)."""
+        for field, pred in self.conditions:
+            if not pred(fields[field]):
+                return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "template": self.template, "to": list(self.recipients)}
+
+
+class RoutingTable:
+    """Tabla compilada: índice (campo, valor) -> rutas candidatas + rutas que siempre se evalúan."""
+
+    def __init__(self, routes: list[Route], default: Route | None, index: dict[str, dict[str, list[int]]],
+                 always: list[int]):
+        self.routes = routes
+        self.default = default
+        self._index = index
+        self._always = always
+        self._fields = tuple(index)
+        # Con un solo campo indexado (lo normal: projectType) los candidatos de cada valor ya van
+        # mezclados con las rutas sin igualdad, en orden: match() no arma conjuntos por mensaje
+        self._merged = None
+        if len(index) == 1:
+            only = next(iter(index.values()))
+            self._merged = {value: sorted(set(hit).union(always)) for value, hit in only.items()}
+
+    @classmethod
+    def compile(cls, table, templates, env=None) -> "RoutingTable":
+        """
+        Valida y compila la tabla (dict ya parseado). templates: plantillas válidas
+        (ses_sender.TEMPLATES). Lanza ValueError con la ruta y el campo si algo no cuadra.
+        """
+        env = os.environ if env is None else env
+        if not isinstance(table, dict) or not isinstance(table.get("routes", []), list):
+            raise ValueError("routing table must be an object with a 'routes' list")
+
+        def template_of(name, spec):
+            template = spec.get("template", SOURCE_TEMPLATE)
+            if template not in templates:
+                raise ValueError(f"route {name!r}: unknown template {template!r}")
+            return template
+
+        routes, index, always = [], {}, []
+        for order, spec in enumerate(table.get("routes", [])):
+            if not isinstance(spec, dict):
+                raise ValueError(f"route #{order} must be an object")
+            name = str(spec.get("name") or f"route-{order}")
+            when = spec.get("when") or {}
+            if not isinstance(when, dict):
+                raise ValueError(f"route {name!r}: 'when' must be an object")
+            indexed, conditions = None, []
+            for field, cond in when.items():
+                values, pred = _compile_condition(name, field, cond)
+                # La primera igualdad va al índice; el resto queda como predicado
+                if values is not None and indexed is None:
+                    indexed = (field, values)
+                else:
+                    conditions.append((field, pred))
+            route = Route(name, order, template_of(name, spec), _compile_recipients(name, spec.get("to"), env),
+                          not spec.get("continue", False), conditions)
+            routes.append(route)
+            if indexed is None:
+                always.append(order)
+            else:
+                field_index = index.setdefault(indexed[0], {})
+                for value in indexed[1]:
+                    field_index.setdefault(value, []).append(order)
+
+        default = None
+        if table.get("default") is not None:
+            spec = table["default"]
+            if not isinstance(spec, dict):
+                raise ValueError("'default' must be an object")
+            default = Route("default", len(routes), template_of("default", spec),
+                            _compile_recipients("default", spec.get("to"), env), True, [])
+        elif (env.get("VENDOR_EMAIL") or "").strip():
+            default = Route("default", len(routes), SOURCE_TEMPLATE,
+                            _compile_recipients("default", "$VENDOR_EMAIL", env), True, [], implicit=True)
+
+        return cls(routes, default, index, always)
+
+    def match(self, data: dict) -> list[Route]:
+        """Rutas que aplican al mensaje, en orden; la default va al final si ninguna ruta que corta coincidió."""
+        fields = _Fields(data)
+        if self._merged is not None:
+            candidates = self._merged.get(fields[self._fields[0]], self._always)
+        else:
+            candidates = self._always
+            for field in self._fields:
+                hit = self._index[field].get(fields[field])
+                if hit:
+                    candidates = sorted(set(candidates).union(hit)) if candidates else hit
+        matched = []
+        routes = self.routes
+        for order in candidates:
+            route = routes[order]
+            if route.matches(fields):
+                matched.append(route)
+                if route.stop:
+                    return matched
+        if self.default is not None:
+            matched.append(self.default)
+        return matched
+
+    def stats(self) -> dict:
+        default = None if self.default is None else ("VENDOR_EMAIL" if self.default.implicit else "table")
+        return {"routes": len(self.routes), "indexed_fields": list(self._fields),
+                "unindexed_routes": len(self._always), "default": default}
+
+
+def load(templates, env=None) -> RoutingTable | None:
+    """
+    Tabla de VENDOR_ROUTES o VENDOR_ROUTES_FILE, compilada; None si no hay ninguna
+    (destino de siempre). Lanza ValueError si la tabla no es válida.
+    """
+    if VENDOR_ROUTES:
+        source, raw = "VENDOR_ROUTES", VENDOR_ROUTES
+    elif VENDOR_ROUTES_FILE and os.path.isfile(VENDOR_ROUTES_FILE):
+        source = VENDOR_ROUTES_FILE
+        with open(VENDOR_ROUTES_FILE, encoding="utf-8") as f:
+            raw = f.read()
+    else:
+        return None
+    try:
+        table = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"{source}: invalid JSON: {e}") from None
+    return RoutingTable.compile(table, templates, env)
+
+
+def delivery_key(template: str, to: str) -> str:
+    """Clave de un envío (plantilla, destinatario) en "delivered" / "_delivered"."""
+    return f"{template}:{to.strip().lower()}"
+
+
+def deliver(routes: list[Route], data: dict, send, executor=None) -> dict:
+    """
+    Manda el mensaje a cada destinatario de cada ruta (send(data, to_email) -> resultado de
+    ses_sender), en paralelo con `executor` si hay más de uno. Un destinatario repetido entre
+    rutas con la misma plantilla se manda una vez, y los que ya están en data["_delivered"]
+    (reintento tras una entrega parcial) no se vuelven a mandar. Devuelve
+    {"ok": True, "messageId", "sent", "delivered", "routes": [...]} o, si alguno falló,
+    {"error", "retryable", "sent", "failed", "delivered", "routes": [...]} con el resultado de
+    cada destinatario; "delivered" acumula los de intentos anteriores para el siguiente reintento.
+    """
+    already = data.get(DELIVERED_FIELD) or []
+    already = {str(k) for k in already} if isinstance(already, list) else set()
+    base = {k: v for k, v in data.items() if k != DELIVERED_FIELD}
+    targets, seen = [], set()
+    for route in routes:
+        message = {**base, "template": route.template}
+        for to in route.recipients:
+            key = delivery_key(route.template, to)
+            if key not in seen:
+                seen.add(key)
+                targets.append((route, to, message, key))
+    truncated = max(0, len(targets) - VENDOR_ROUTES_MAX_RECIPIENTS)
+    if truncated:
+        print(f"Vendor routes: {truncated} recipients over VENDOR_ROUTES_MAX_RECIPIENTS skipped")
+        targets = targets[:VENDOR_ROUTES_MAX_RECIPIENTS]
+    sends = [t for t in targets if t[3] not in already]
+
+    if executor is not None and len(sends) > 1:
+        futures = [executor.submit(emf.run_in_context(send, message, to)) for _, to, message, _ in sends]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"error": "SES error", "detail": f"{e.__class__.__name__}: {e}"})
+    else:
+        results = []
+        for _, to, message, _ in sends:
+            try:
+                results.append(send(message, to))
+            except Exception as e:
+                results.append({"error": "SES error", "detail": f"{e.__class__.__name__}: {e}"})
+
+    outcome = {key: result for (_, _, _, key), result in zip(sends, results)}
+    by_route: dict[str, dict] = {}
+    delivered = []
+    for route, to, _, key in targets:
+        result = outcome.get(key, {"ok": True, "skipped": "already_delivered"})
+        entry = by_route.setdefault(route.name, {"route": route.name, "template": route.template, "results": []})
+        entry["results"].append({"to": to, **result})
+        if result.get("ok"):
+            delivered.append(key)
+    failures = [r for r in results if not r.get("ok")]
+    body = {"sent": len(results) - len(failures), "delivered": delivered, "routes": list(by_route.values())}
+    if len(sends) < len(targets):
+        body["already_delivered"] = len(targets) - len(sends)
+    if truncated:
+        body["skipped_recipients"] = truncated
+    if not failures:
+        return {"ok": True, "messageId": results[0].get("messageId") if results else None, **body}
+    error = failures[0]
+    if delivered:
+        # Entrega parcial: el reintento con "_delivered" = delivered solo manda a los que fallaron
+        error = {"error": "SES partial delivery", "detail": error.get("error")}
+    return {**error, "retryable": any(f.get("retryable") for f in failures), "failed": len(failures), **body}
@@ -47,7 +47,139 @@ variable "allowed_origin" {
   default = "*"
 }
 
+variable "max_body_bytes" {
+  type        = number
+  description = "Tamaño máximo del body (bytes ya decodificados); más grande se rechaza con 413 antes de parsear"
+  default     = 16384
+}
+
+variable "ses_content_mode" {
+  type        = string
+  description = "Contenido de los envíos SES: template (plantilla guardada en SES) o simple (render local desde modules/ses/templates)"
+  default     = "template"
+
+  validation {
+    condition     = contains(["template", "simple"], var.ses_content_mode)
+    error_message = "ses_content_mode debe ser template o simple."
+  }
+}
+
+variable "layers" {
+  type        = list(string)
+  description = "ARNs de capas (p.ej. lambda-shared-layer con orbit_shared)"
+  default     = []
+}
+
 variable "tags" {
   type    = map(string)
   default = {}
 }
+
+variable "precompile_bytecode" {
+  type        = bool
+  description = "Empaquetar bytecode precompilado (.pyc) en lambda.zip para reducir el cold start"
+  default     = false
+}
+
+variable "build_python" {
+  type        = string
+  description = "Intérprete con la misma versión que el runtime, usado para precompilar el bytecode"
+  default     = "python3.12"
+}
+
+variable "tracing_mode" {
+  type        = string
+  description = "X-Ray de la función: PassThrough (solo trazas en logs) o Active (además exporta los spans a X-Ray)"
+  default     = "PassThrough"
+
+  validation {
+    condition     = contains(["PassThrough", "Active"], var.tracing_mode)
+    error_message = "tracing_mode debe ser PassThrough o Active."
+  }
+}
+
+variable "vendor_digest_enabled" {
+  type        = bool
+  description = "Agrupa las notificaciones al vendor en resúmenes (VendorDigestTemplate) cuando el ritmo pasa el umbral"
+  default     = false
+}
+
+variable "vendor_digest_threshold_per_minute" {
+  type        = number
+  description = "Notificaciones por minuto a partir de las cuales se agrupan"
+  default     = 10
+}
+
+variable "vendor_digest_window_seconds" {
+  type        = number
+  description = "Ventana de cada resumen (s); al cerrar, el flush programado envía lo acumulado"
+  default     = 300
+
+  validation {
+    condition     = var.vendor_digest_window_seconds >= 60
+    error_message = "vendor_digest_window_seconds debe ser al menos 60 (el flush corre cada minuto)."
+  }
+}
+
+variable "vendor_digest_max_items" {
+  type        = number
+  description = "Envíos por resumen; al llenarse sale sin esperar a que cierre la ventana"
+  default     = 20
+
+  validation {
+    condition     = var.vendor_digest_max_items >= 2 && var.vendor_digest_max_items <= 100
+    error_message = "vendor_digest_max_items debe estar entre 2 y 100."
+  }
+}
+
+variable "vendor_routes" {
+  type        = any
+  description = "Tabla de rutas del vendor por projectType y otros campos ({routes = [...], default = {...}}, ver src/vendor_routing.py). null: todo a vendor_email. Tablas que no caben en el env (4 KB) van en src/vendor_routes.json"
+  default     = null
+}
+
+variable "recipient_mx_resolver" {
+  type        = string
+  description = "Validación del destinatario antes de enviar (orbit_shared.recipient_check): off (solo sintaxis), doh (MX por DNS-over-HTTPS) o dns (dnspython, hay que empaquetarlo)"
+  default     = "off"
+
+  validation {
+    condition     = contains(["off", "doh", "dns"], var.recipient_mx_resolver)
+    error_message = "recipient_mx_resolver debe ser off, doh o dns."
+  }
+}
+
+variable "traffic_capture" {
+  type        = string
+  description = "Captura de eventos sin PII para reproducirlos con infra/bench/bench_replay.py (orbit_shared.capture): off, local (/tmp del contenedor) o s3"
+  default     = "off"
+
+  validation {
+    condition     = contains(["off", "local", "s3"], var.traffic_capture)
+    error_message = "traffic_capture debe ser off, local o s3."
+  }
+}
+
+variable "traffic_capture_sample" {
+  type        = number
+  description = "Fracción de invocaciones capturadas (0-1)"
+  default     = 1
+
+  validation {
+    condition     = var.traffic_capture_sample >= 0 && var.traffic_capture_sample <= 1
+    error_message = "traffic_capture_sample debe estar entre 0 y 1."
+  }
+}
+
+variable "traffic_capture_salt" {
+  type        = string
+  description = "Sal de los seudónimos de la captura (emails, IPs); vacía = aleatoria por contenedor"
+  default     = ""
+  sensitive   = true
+}
+
+variable "traffic_capture_retention_days" {
+  type        = number
+  description = "Días que se guardan las capturas en el bucket (traffic_capture = s3)"
+  default     = 14
+}
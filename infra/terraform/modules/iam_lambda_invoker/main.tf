@@ -65,3 +65,153 @@ resource "aws_iam_role_policy" "lambda_invoke_policy" {
     ]
   })
 }
+
+########################################################
+# Política SES (notificación al vendor en proceso)     #
+########################################################
+
+resource "aws_iam_role_policy" "ses_send_policy" {
+  name = "${local.role_name}-ses-send-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "ses:SendEmail",
+          "ses:SendTemplatedEmail",
+          "ses:GetAccount"
+        ]
+        Resource = "*"
+      }
+    ]
+  })
+}
+
+########################################################
+# Política para la cola de emails (modo async-accept)  #
+########################################################
+
+resource "aws_iam_role_policy" "email_queue_policy" {
+  name = "${local.role_name}-email-queue-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
+          "sqs:GetQueueAttributes"
+        ]
+        # Solo la cola de trabajos de contact-form-lambda (<function_name>-email-jobs); la DLQ la
+        # alimenta SQS con la redrive policy, la Lambda no la usa
+        Resource = "arn:aws:sqs:*:*:${var.project}-${var.env}-*-email-jobs"
+      }
+    ]
+  })
+}
+
+########################################################
+# Política para tablas DynamoDB de estado compartido   #
+########################################################
+
+resource "aws_iam_role_policy" "dynamodb_state_policy" {
+  name = "${local.role_name}-dynamodb-state-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        # Tablas de contact-form-lambda (<function_name>-idempotency, -rate-limit, -recaptcha-replay)
+        Resource = [
+          "arn:aws:dynamodb:*:*:table/${var.project}-${var.env}-*-idempotency",
+          "arn:aws:dynamodb:*:*:table/${var.project}-${var.env}-*-rate-limit",
+          "arn:aws:dynamodb:*:*:table/${var.project}-${var.env}-*-recaptcha-replay"
+        ]
+      }
+    ]
+  })
+}
+
+########################################################
+# Política para secretos (SECRETS_BACKEND de la Lambda) #
+########################################################
+
+# Secretos del proyecto/ambiente: Secrets Manager <project>-<env>-* y SSM /<project>/<env>/*
+resource "aws_iam_role_policy" "secrets_read_policy" {
+  name = "${local.role_name}-secrets-read-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["secretsmanager:GetSecretValue"]
+        Resource = "arn:aws:secretsmanager:*:*:secret:${var.project}-${var.env}-*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["ssm:GetParametersByPath"]
+        Resource = "arn:aws:ssm:*:*:parameter/${var.project}/${var.env}/*"
+      }
+    ]
+  })
+}
+
+###############################################
+# Política para X-Ray (tracing_mode = Active) #
+###############################################
+
+resource "aws_iam_role_policy" "xray_policy" {
+  name = "${local.role_name}-xray-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        # Segmentos de orbit_shared.tracing (tracing_mode = "Active")
+        Effect   = "Allow"
+        Action   = ["xray:PutTraceSegments", "xray:PutTelemetryRecords"]
+        Resource = "*"
+      }
+    ]
+  })
+}
+
+#####################################################
+# Política para capturas de tráfico (traffic_capture) #
+#####################################################
+
+resource "aws_iam_role_policy" "traffic_capture_policy" {
+  name = "${local.role_name}-traffic-capture-policy"
+  role = aws_iam_role.lambda_invoke.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        # Lotes de orbit_shared.capture (bucket del módulo email-dispatcher-lambda)
+        Effect   = "Allow"
+        Action   = ["s3:PutObject"]
+        Resource = "arn:aws:s3:::${var.project}-${var.env}-traffic-capture/*"
+      }
+    ]
+  })
+}
@@ -0,0 +1 @@
+"""Módulos compartidos por las Lambdas de Orbit (se publican como Lambda Layer)."""
@@ -0,0 +1,358 @@
+"""
+Captura opcional del tráfico real de los handlers, sin PII, para reproducirlo localmente
+(infra/bench/bench_replay.py).
+
+Con TRAFFIC_CAPTURE=local|s3, cada invocación (salvo los pings de warm-up) guarda una línea
+JSON con el sobre del evento y la hora de llegada:
+    {"v": 1, "service", "ts", "container", "seq", "source": "http" | "invoke" | "schedule",
+     "body_bytes", "event": {...}}
+El evento conserva su forma (requestContext, headers, isBase64Encoded, body en base64 si así
+llegó, lotes "messages", "_trace"), que es lo que los eventos sintéticos no reproducen. Lo
+que identifica a alguien se reemplaza antes de escribir:
+  - el body JSON y los eventos invoke/schedule/lotes van por lista blanca: solo SAFE_FIELDS
+    (template, projectType, locale, _trace y los marcadores de eventos programados) se
+    guardan tal cual y cada mensaje de "messages" sigue las mismas reglas; cualquier otro
+    campo (el esquema del dispatcher acepta campos extra) se enmascara con el mismo largo y
+    forma (letras -> x, dígitos -> 0, números -> 0), así el esquema y los límites de tamaño
+    responden igual; recaptchaToken e idempotencyKey derivan del hash (dos llaves distintas
+    siguen siendo distintas); los emails válidos pasan a u<hash>@<dominio>, conservando solo
+    los dominios públicos de recipient_check.RECIPIENT_KNOWN_DOMAINS
+  - IPs (sourceIp, x-forwarded-for): una IP 10.x.y.z estable por IP, así el rate limiting
+    por IP se reproduce
+  - authorization, cookie, query string: enmascarados
+Los hashes usan TRAFFIC_CAPTURE_SALT; sin sal cada contenedor usa una aleatoria (la misma
+persona en dos contenedores ya no coincide). Un body de más de TRAFFIC_CAPTURE_MAX_BODY_BYTES
+no se guarda: queda "body_synth" con su tamaño y el replay lo regenera.
+
+Destinos (log append-only comprimido):
+  - local: <TRAFFIC_CAPTURE_DIR>/<service>-<container>.jsonl.gz, un miembro gzip con flush
+    por línea (una Lambda cortada deja a lo más la última línea incompleta)
+  - s3:    un objeto .jsonl.gz por lote (TRAFFIC_CAPTURE_BATCH líneas o
+    TRAFFIC_CAPTURE_FLUSH_SECONDS), subido en segundo plano bajo
+    s3://<TRAFFIC_CAPTURE_BUCKET>/<TRAFFIC_CAPTURE_PREFIX><service>/<fecha>/
+La captura nunca rompe la request: cualquier error se imprime y la invocación sigue.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+
+from orbit_shared import prewarm, recipient_check
+
+TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE", "off").strip().lower()
+# Fracción de invocaciones capturadas
+TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", "1.0"))
+TRAFFIC_CAPTURE_DIR = os.getenv("TRAFFIC_CAPTURE_DIR", "/tmp/orbit-capture")
+TRAFFIC_CAPTURE_BUCKET = os.getenv("TRAFFIC_CAPTURE_BUCKET", "")
+TRAFFIC_CAPTURE_PREFIX = os.getenv("TRAFFIC_CAPTURE_PREFIX", "capture/")
+TRAFFIC_CAPTURE_BATCH = int(os.getenv("TRAFFIC_CAPTURE_BATCH", "50"))
+TRAFFIC_CAPTURE_FLUSH_SECONDS = float(os.getenv("TRAFFIC_CAPTURE_FLUSH_SECONDS", "60"))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "65536"))
+TRAFFIC_CAPTURE_SALT = os.getenv("TRAFFIC_CAPTURE_SALT", "").encode("utf-8") or os.urandom(16)
+
+FORMAT_VERSION = 1
+# Lista blanca: lo que no está aquí se enmascara (body JSON, eventos invoke/schedule, lotes)
+SAFE_FIELDS = frozenset(("template", "projectType", "locale", "_trace", "source", "detail-type", "vendor_digest"))
+# Lotes: cada elemento es un mensaje y se redacta con las mismas reglas
+BATCH_FIELDS = frozenset(("messages",))
+# Se enmascaran conservando que dos valores distintos sigan siendo distintos (deduplicación)
+KEYED_FIELDS = frozenset(("recaptchaToken", "idempotencyKey"))
+IP_HEADERS = frozenset(("x-forwarded-for", "x-real-ip", "true-client-ip", "cf-connecting-ip"))
+MASKED_HEADERS = frozenset(("authorization", "cookie", "x-api-key", "referer"))
+
+
+# -----------------------------
+# Redacción
+# -----------------------------
+def _digest(value: str, salt: bytes) -> str:
+    return hmac.new(salt, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def mask_text(value: str) -> str:
+    """Mismo largo y forma: letras -> x/X, dígitos -> 0; espacios y puntuación se quedan."""
+    return "".join("0" if c.isdigit() else ("X" if c.isupper() else "x") if c.isalpha() else c for c in value)
+
+
+def mask_keyed(value: str, salt: bytes) -> str:
+    """Como mask_text pero derivado del hash: valores distintos siguen siendo distintos (llaves, tokens)."""
+    h = _digest(value, salt)
+    stream = (int(h[i % 64], 16) for i in range(len(value)))
+    return "".join(str(n % 10) if c.isdigit() else chr(97 + n) if c.isalpha() else c
+                   for c, n in zip(value, stream))
+
+
+def mask_email(value: str, salt: bytes) -> str:
+    domain = recipient_check.check_syntax(value)
+    if domain is None:
+        return mask_text(value)  # inválido sigue inválido (el 400 del esquema se reproduce)
+    local = "u" + _digest(value.strip().lower(), salt)[:12]
+    return f"{local}@{domain if domain in recipient_check.RECIPIENT_KNOWN_DOMAINS else 'example.com'}"
+
+
+def mask_ip(value: str, salt: bytes) -> str:
+    h = _digest(value.strip(), salt)
+    return f"10.{int(h[0:2], 16)}.{int(h[2:4], 16)}.{int(h[4:6], 16) or 1}"
+
+
+def _mask_value(key: str, value, salt: bytes):
+    if isinstance(value, str):
+        if key in KEYED_FIELDS:
+            return mask_keyed(value, salt)
+        # email, to_email o cualquier campo extra con un correo (inválido -> mask_text)
+        return mask_email(value, salt) if key == "email" or "@" in value else mask_text(value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return type(value)()
+    if isinstance(value, dict):
+        return {k: _mask_value(k, v, salt) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_mask_value(key, v, salt) for v in value]
+    return mask_text(str(value))
+
+
+def redact_fields(value, salt: bytes):
+    """Copia con todo enmascarado salvo SAFE_FIELDS; los lotes ("messages") siguen las mismas reglas."""
+    if isinstance(value, dict):
+        return {k: (v if k in SAFE_FIELDS else redact_fields(v, salt) if k in BATCH_FIELDS
+                    else _mask_value(k, v, salt))
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact_fields(v, salt) for v in value]
+    return _mask_value("", value, salt)
+
+
+def _redact_headers(headers, salt: bytes):
+    if not isinstance(headers, dict):
+        return headers
+    out = {}
+    for key, value in headers.items():
+        name = str(key).lower()
+        if name in IP_HEADERS:
+            mask = (lambda v: ", ".join(mask_ip(ip, salt) for ip in str(v).split(",") if ip.strip()))
+        elif name in MASKED_HEADERS:
+            mask = mask_text
+        else:
+            out[key] = value
+            continue
+        out[key] = [mask(str(v)) for v in value] if isinstance(value, list) else mask(str(value))
+    return out
+
+
+def _redact_body(event: dict, salt: bytes) -> tuple[dict, int]:
+    """Body decodificado, redactado y vuelto a codificar igual que llegó. Devuelve (cambios, bytes)."""
+    body = event.get("body")
+    if not isinstance(body, str):
+        return {}, 0
+    is_b64 = bool(event.get("isBase64Encoded"))
+    try:
+        raw = base64.b64decode(body, validate=False) if is_b64 else body.encode("utf-8")
+    except (ValueError, TypeError):
+        return {"body": mask_text(body)}, len(body)
+    if len(raw) > TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+        return {"body": None, "body_synth": len(raw)}, len(raw)
+    text = raw.decode("utf-8", errors="replace")
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        redacted = mask_text(text)  # JSON roto: se conserva la forma para el 400 Invalid JSON
+    else:
+        redacted = json.dumps(redact_fields(parsed, salt), ensure_ascii=False, separators=(", ", ": "))
+    encoded = base64.b64encode(redacted.encode("utf-8")).decode("ascii") if is_b64 else redacted
+    return {"body": encoded}, len(raw)
+
+
+def redact_event(event, salt: bytes = TRAFFIC_CAPTURE_SALT) -> tuple[object, dict]:
+    """(evento redactado, metadatos {"source", "body_bytes", ["body_synth"]})."""
+    if not isinstance(event, dict):
+        return mask_text(str(event)), {"source": "invoke", "body_bytes": 0}
+    if "requestContext" in event or "httpMethod" in event:
+        out = dict(event)
+        changes, body_bytes = _redact_body(event, salt)
+        synth = changes.pop("body_synth", None)
+        out.update(changes)
+        for key in ("headers", "multiValueHeaders"):
+            if key in out:
+                out[key] = _redact_headers(out[key], salt)
+        if isinstance(out.get("cookies"), list):
+            out["cookies"] = [mask_text(str(c)) for c in out["cookies"]]
+        for key in ("queryStringParameters", "multiValueQueryStringParameters"):
+            if isinstance(out.get(key), dict):
+                out[key] = {k: ([mask_text(str(x)) for x in v] if isinstance(v, list) else mask_text(str(v)))
+                            for k, v in out[key].items()}
+        if "rawQueryString" in out:
+            out["rawQueryString"] = mask_text(str(out["rawQueryString"] or ""))
+        ctx = out.get("requestContext")
+        if isinstance(ctx, dict):
+            ctx = dict(ctx)
+            ctx.pop("authorizer", None)
+            if isinstance(ctx.get("http"), dict) and ctx["http"].get("sourceIp"):
+                ctx["http"] = {**ctx["http"], "sourceIp": mask_ip(ctx["http"]["sourceIp"], salt)}
+            if isinstance(ctx.get("identity"), dict) and ctx["identity"].get("sourceIp"):
+                ctx["identity"] = {**ctx["identity"], "sourceIp": mask_ip(ctx["identity"]["sourceIp"], salt)}
+            out["requestContext"] = ctx
+        meta = {"source": "http", "body_bytes": body_bytes}
+        if synth is not None:
+            meta["body_synth"] = synth
+        return out, meta
+    source = "schedule" if event.get("source") == "aws.events" or "vendor_digest" in event else "invoke"
+    return redact_fields(event, salt), {"source": source, "body_bytes": 0}
+
+
+# -----------------------------
+# Destinos
+# -----------------------------
+class LocalSink:
+    """Archivo .jsonl.gz append-only por servicio y contenedor."""
+
+    def __init__(self, directory: str, service: str):
+        import gzip
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{service}-{prewarm.CONTAINER_ID}.jsonl.gz")
+        self._file = gzip.open(self.path, "ab")
+        self._lock = threading.Lock()
+
+    def write(self, line: str):
+        with self._lock:
+            self._file.write(line.encode("utf-8") + b"\n")
+            # Sync flush: lo escrito hasta aquí se puede leer aunque el contenedor muera
+            self._file.flush()
+
+
+class S3Sink:
+    """Lotes comprimidos como objetos nuevos (S3 no tiene append); la subida va en segundo plano."""
+
+    def __init__(self, bucket: str, prefix: str, service: str, batch: int = TRAFFIC_CAPTURE_BATCH,
+                 flush_seconds: float = TRAFFIC_CAPTURE_FLUSH_SECONDS):
+        self.bucket, self.prefix, self.service = bucket, prefix, service
+        self.batch, self.flush_seconds = batch, flush_seconds
+        self._lines: list[str] = []
+        self._first = 0.0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._client = None
+
+    def write(self, line: str):
+        with self._lock:
+            if not self._lines:
+                self._first = time.time()
+            self._lines.append(line)
+            if len(self._lines) < self.batch and time.time() - self._first < self.flush_seconds:
+                return
+            lines, self._lines = self._lines, []
+            self._seq += 1
+            seq = self._seq
+        threading.Thread(target=self._upload, args=(lines, seq), daemon=True).start()
+
+    def _upload(self, lines: list[str], seq: int):
+        import gzip
+        try:
+            if self._client is None:
+                import boto3
+                self._client = boto3.client("s3")
+            key = (f"{self.prefix}{self.service}/{time.strftime('%Y/%m/%d', time.gmtime())}/"
+                   f"{int(time.time())}-{prewarm.CONTAINER_ID}-{seq:05d}.jsonl.gz")
+            body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+            self._client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType="application/x-ndjson",
+                                    ContentEncoding="gzip")
+        except Exception as e:
+            print("Traffic capture upload failed:", repr(e), len(lines), "lines dropped")
+
+
+_sinks: dict[str, object] = {}
+_seq = 0
+_sinks_lock = threading.Lock()
+
+
+def _sink(service: str):
+    sink = _sinks.get(service)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(service)
+            if sink is None:
+                if TRAFFIC_CAPTURE == "s3":
+                    sink = S3Sink(TRAFFIC_CAPTURE_BUCKET, TRAFFIC_CAPTURE_PREFIX, service)
+                else:
+                    sink = LocalSink(TRAFFIC_CAPTURE_DIR, service)
+                _sinks[service] = sink
+    return sink
+
+
+def enabled() -> bool:
+    return TRAFFIC_CAPTURE in ("local", "s3") and (TRAFFIC_CAPTURE != "s3" or bool(TRAFFIC_CAPTURE_BUCKET))
+
+
+def record(service: str, event) -> None:
+    """Guarda el sobre redactado del evento con su hora de llegada (no-op si la captura está apagada)."""
+    global _seq
+    if not enabled() or (TRAFFIC_CAPTURE_SAMPLE < 1 and random.random() >= TRAFFIC_CAPTURE_SAMPLE):
+        return
+    arrived = time.time()
+    try:
+        redacted, meta = redact_event(event)
+        with _sinks_lock:
+            _seq += 1
+            seq = _seq
+        envelope = {"v": FORMAT_VERSION, "service": service, "ts": round(arrived, 6),
+                    "container": prewarm.CONTAINER_ID, "seq": seq, **meta, "event": redacted}
+        _sink(service).write(json.dumps(envelope, ensure_ascii=False, default=str))
+    except Exception as e:
+        print("Traffic capture failed:", repr(e))
+
+
+# -----------------------------
+# Lectura (replay)
+# -----------------------------
+def _read_gzip_lines(fileobj):
+    """Líneas de un .jsonl.gz con varios miembros; tolera un final truncado (Lambda cortada)."""
+    import gzip
+    import zlib
+    with gzip.GzipFile(fileobj=fileobj) as f:
+        try:
+            for line in f:
+                yield line
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return
+
+
+def read(sources) -> list[dict]:
+    """
+    Sobres de capturas locales (archivos o directorios, .jsonl.gz o .jsonl) o de S3
+    (s3://bucket/prefijo, con boto3), ordenados por hora de llegada. Líneas truncadas se omiten.
+    """
+    import io
+    lines = []
+    for source in sources:
+        if source.startswith("s3://"):
+            import boto3
+            bucket, _, prefix = source[5:].partition("/")
+            s3 = boto3.client("s3")
+            for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    data = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+                    lines.extend(_read_gzip_lines(io.BytesIO(data)) if obj["Key"].endswith(".gz")
+                                 else data.splitlines())
+            continue
+        paths = ([os.path.join(dp, f) for dp, _, fs in os.walk(source) for f in sorted(fs)]
+                 if os.path.isdir(source) else [source])
+        for path in paths:
+            if path.endswith(".gz"):
+                with open(path, "rb") as f:
+                    lines.extend(_read_gzip_lines(f))
+            elif path.endswith((".jsonl", ".json")):
+                with open(path, "rb") as f:
+                    lines.extend(f.read().splitlines())
+    envelopes = []
+    for line in lines:
+        try:
+            doc = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(doc, dict) and doc.get("v") == FORMAT_VERSION and "event" in doc:
+            envelopes.append(doc)
+    envelopes.sort(key=lambda d: (d["ts"], d.get("container", ""), d.get("seq", 0)))
+    return envelopes
@@ -0,0 +1,178 @@
+"""
+Circuit breakers por dependencia (Google siteverify, Lambda dispatcher, SES, Zoho SMTP).
+
+Si una dependencia se degrada, las requests dejan de esperar su timeout completo:
+  - closed:    todo pasa; se lleva una ventana móvil de llamadas (error y lentitud).
+  - open:      con tasa de error o de llamadas lentas sobre el umbral, se falla rápido
+               durante open_seconds sin tocar la red.
+  - half_open: pasado ese tiempo se dejan pasar pocas llamadas de prueba; si salen bien
+               se cierra, si no se vuelve a abrir.
+
+Uso (los llamadores devuelven dicts de error, no excepciones):
+    breaker = circuit_breaker.get("recaptcha", slow_call_ms=2000)
+    if not breaker.allow():
+        return {"error": "..._circuit_open", "retry_after_seconds": breaker.retry_after()}
+    t0 = time.perf_counter()
+    ... llamada ...
+    breaker.record(ok, (time.perf_counter() - t0) * 1000)
+
+El estado vive por contenedor. Cada uso deja el estado en la línea EMF de la request
+(propiedad "breaker_<nombre>") y las transiciones se logean.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from orbit_shared import emf
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Config por defecto (CIRCUIT_* en env); slow_call_ms se define por dependencia
+ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+SLOW_RATE = float(os.getenv("CIRCUIT_SLOW_RATE", "0.8"))
+OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, slow_call_ms: float | None = None, window_seconds: float = WINDOW_SECONDS,
+                 min_calls: int = MIN_CALLS, failure_rate: float = FAILURE_RATE, slow_rate: float = SLOW_RATE,
+                 open_seconds: float = OPEN_SECONDS, half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+                 enabled: bool = ENABLED, clock=time.monotonic):
+        self.name = name
+        self.slow_call_ms = slow_call_ms
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.enabled = enabled
+        self._clock = clock
+        self.state = CLOSED
+        self._calls: deque[tuple[float, bool, bool]] = deque()  # (t, failed, slow)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    # -----------------------------
+    # Estado
+    # -----------------------------
+    def _transition(self, state: str, reason: str = ""):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self._counters["opened"] += 1
+        if state in (CLOSED, HALF_OPEN):
+            self._calls.clear()
+        self._probes = 0
+        print("circuit_breaker", json.dumps({"name": self.name, "from": previous, "to": state, "reason": reason}))
+
+    def _trim(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> tuple[float, float]:
+        n = len(self._calls)
+        if not n:
+            return 0.0, 0.0
+        return (sum(1 for _, failed, _ in self._calls if failed) / n,
+                sum(1 for _, _, slow in self._calls if slow) / n)
+
+    def allow(self) -> bool:
+        """True si la llamada puede salir; False = fallar rápido (circuito abierto)."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, "open_timeout_elapsed")
+            if self.state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                allowed = True
+            else:
+                allowed = self.state == CLOSED
+            if not allowed:
+                self._counters["rejected"] += 1
+        self._report(rejected=not allowed)
+        return allowed
+
+    def record(self, ok: bool, duration_ms: float) -> None:
+        """Registra el resultado de una llamada que sí salió."""
+        if not self.enabled:
+            return
+        slow = self.slow_call_ms is not None and duration_ms >= self.slow_call_ms
+        with self._lock:
+            now = self._clock()
+            self._counters["calls"] += 1
+            self._counters["failures"] += 0 if ok else 1
+            self._counters["slow"] += 1 if slow else 0
+
+            if self.state == HALF_OPEN:
+                if ok and not slow:
+                    self._transition(CLOSED, "probe_succeeded")
+                else:
+                    self._transition(OPEN, "probe_failed" if not ok else "probe_slow")
+                return
+            if self.state == OPEN:
+                return
+
+            self._calls.append((now, not ok, slow))
+            self._trim(now)
+            if len(self._calls) >= self.min_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate:
+                    self._transition(OPEN, f"failure_rate={failure_rate:.2f}")
+                elif self.slow_call_ms is not None and slow_rate >= self.slow_rate:
+                    self._transition(OPEN, f"slow_rate={slow_rate:.2f}")
+
+    def retry_after(self) -> float:
+        """Segundos hasta el próximo intento de prueba (0 si no está abierto)."""
+        if self.state != OPEN:
+            return 0.0
+        return round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 3)
+
+    def _report(self, rejected: bool):
+        metrics = emf.current()
+        metrics.put_property(f"breaker_{self.name}", self.state)
+        if rejected:
+            metrics.increment(f"breaker_{self.name}_rejected")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._trim(self._clock())
+            failure_rate, slow_rate = self._rates()
+            return {"name": self.name, "state": self.state, "window_calls": len(self._calls),
+                    "failure_rate": round(failure_rate, 4), "slow_rate": round(slow_rate, 4),
+                    **self._counters}
+
+
+# Breakers del contenedor, uno por dependencia
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get(name: str, **config) -> CircuitBreaker:
+    """Devuelve (o crea con `config`) el breaker de la dependencia."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, **config)
+    return breaker
+
+
+def snapshots() -> dict:
+    return {name: b.snapshot() for name, b in _breakers.items()}
+
+
+def reset() -> None:
+    """Olvida todos los breakers (pruebas / benchmarks)."""
+    with _registry_lock:
+        _breakers.clear()
@@ -0,0 +1,108 @@
+"""
+Presupuesto de tiempo por request a partir de context.get_remaining_time_in_millis().
+
+Los timeouts fijos (siteverify 5 s, SMTP 10 s, boto 60 s) sumados pasan del timeout
+de la Lambda: si una dependencia se cuelga, la Lambda muere sin responder. Con un
+Deadline cada llamada saliente pide su timeout al presupuesto que queda:
+
+    deadline.start(context)                       # en el handler
+    t = deadline.current().timeout("smtp_send", cap=10, minimum=0.5)
+    ... llamada con timeout=t ...
+
+Si ya no alcanza ni el mínimo de la etapa, timeout() lanza DeadlineExceeded(stage)
+y el handler responde 503 con el nombre de la etapa. Se reserva DEADLINE_RESERVE_MS
+para armar la respuesta y escribir los logs antes de que Lambda corte.
+
+El deadline de la request vive en un ContextVar (como emf): los hilos del fan-out
+lo heredan si se lanzan con emf.run_in_context().
+"""
+import contextvars
+import math
+import os
+import time
+
+# Margen (ms) que se deja para responder y hacer flush de métricas
+DEADLINE_RESERVE_MS = float(os.getenv("DEADLINE_RESERVE_MS", "500"))
+
+_current: contextvars.ContextVar = contextvars.ContextVar("orbit_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """No queda presupuesto para la etapa `stage`."""
+
+    def __init__(self, stage: str, remaining_seconds: float):
+        super().__init__(f"deadline exceeded before {stage} ({remaining_seconds:.3f}s left)")
+        self.stage = stage
+        self.remaining_seconds = remaining_seconds
+
+    def to_result(self) -> dict:
+        """Dict de error con el contrato de los envíos ({"error": ...})."""
+        return {"error": "deadline_exceeded", "stage": self.stage,
+                "remaining_ms": round(self.remaining_seconds * 1000)}
+
+
+class Deadline:
+    """Instante límite de la request (monotónico). Sin límite si budget_seconds es None."""
+
+    def __init__(self, budget_seconds: float | None, clock=time.monotonic):
+        self._clock = clock
+        self._expires_at = math.inf if budget_seconds is None else clock() + budget_seconds
+
+    @classmethod
+    def from_context(cls, context, reserve_ms: float = DEADLINE_RESERVE_MS) -> "Deadline":
+        """Deadline del context de Lambda menos la reserva; sin context (local) no hay límite."""
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if get_remaining is None:
+            return cls(None)
+        return cls(max(0.0, (get_remaining() - reserve_ms) / 1000))
+
+    def remaining(self) -> float:
+        """Segundos que quedan (inf si no hay límite)."""
+        return max(0.0, self._expires_at - self._clock())
+
+    def timeout(self, stage: str, cap: float, minimum: float = 0.1) -> float:
+        """
+        Timeout (s) para la llamada de `stage`: lo que queda del presupuesto, como mucho `cap`.
+        Lanza DeadlineExceeded si queda menos que `minimum`.
+        """
+        remaining = self.remaining()
+        if remaining < minimum:
+            raise DeadlineExceeded(stage, remaining)
+        return min(cap, remaining)
+
+    def check(self, stage: str, minimum: float = 0.1) -> None:
+        """Lanza DeadlineExceeded si no queda al menos `minimum` para `stage`."""
+        self.timeout(stage, math.inf, minimum)
+
+    def sub(self, budget_seconds: float) -> "Deadline":
+        """Deadline más corto dentro de éste (p.ej. el plazo del fan-out): vence el que llegue antes."""
+        child = Deadline(budget_seconds, self._clock)
+        child._expires_at = min(child._expires_at, self._expires_at)
+        return child
+
+
+_UNBOUNDED = Deadline(None)
+
+
+def start(context) -> Deadline:
+    """Crea el deadline de la request desde el context de Lambda y lo deja como actual."""
+    deadline = Deadline.from_context(context)
+    _current.set(deadline)
+    return deadline
+
+
+def run_within(deadline: Deadline, fn, *args, **kwargs):
+    """
+    Ejecuta fn con `deadline` como actual; los timeouts que pida no pasan de él:
+        executor.submit(emf.run_in_context(deadline.run_within, fanout, fn, a))
+    """
+    token = _current.set(deadline)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.reset(token)
+
+
+def current() -> Deadline:
+    """Deadline de la request actual (sin límite fuera de un handler)."""
+    return _current.get() or _UNBOUNDED
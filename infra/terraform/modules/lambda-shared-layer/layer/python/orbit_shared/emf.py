@@ -0,0 +1,167 @@
+"""
+Métricas por etapa en CloudWatch Embedded Metric Format (EMF).
+
+Cada request junta los tiempos de sus etapas y al final imprime UNA línea JSON en
+formato EMF; CloudWatch Logs la convierte en métricas sin llamar a PutMetricData.
+
+Uso:
+    metrics = emf.start("Orbit/ContactForm", "contact-form")
+    with emf.stage("recaptcha_verify"):
+        ...
+    metrics.set_outcome("rejected", "invalid_recaptcha")
+    metrics.flush()
+
+La request actual vive en un ContextVar; los hilos del fan-out la heredan si se
+lanzan con emf.run_in_context(). Con una traza activa (orbit_shared.tracing) cada
+etapa también queda como span.
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from orbit_shared import tracing
+
+# Dimensiones: por resultado/código de error y por tipo de arranque
+DIMENSION_SETS = [["Service", "Outcome", "ErrorCode"], ["Service", "StartType"]]
+
+_current: contextvars.ContextVar = contextvars.ContextVar("orbit_emf_metrics", default=None)
+_cold_start = True
+_cold_lock = threading.Lock()
+
+
+class RequestMetrics:
+    def __init__(self, namespace: str, service: str, cold_start: bool):
+        self.namespace = namespace
+        self.service = service
+        self.cold_start = cold_start
+        self.outcome = "ok"
+        self.error_code = "none"
+        self._t0 = time.perf_counter()
+        self._timings: dict[str, float] = {}
+        self._counts: dict[str, float] = {}
+        self._properties: dict = {}
+        self._lock = threading.Lock()
+        self._flushed = False
+
+    def add_timing(self, stage: str, ms: float) -> None:
+        """Acumula ms en la etapa (una etapa puede repetirse, p.ej. reintentos)."""
+        with self._lock:
+            self._timings[stage] = self._timings.get(stage, 0.0) + ms
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + value
+
+    def put_property(self, key: str, value) -> None:
+        """Campo extra en el log (no es métrica ni dimensión)."""
+        with self._lock:
+            self._properties[key] = value
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            self.add_timing(name, (time.perf_counter() - t0) * 1000)
+
+    def set_outcome(self, outcome: str, error_code: str | None = None) -> None:
+        self.outcome = outcome
+        self.error_code = error_code or "none"
+
+    def to_document(self) -> dict:
+        total_ms = (time.perf_counter() - self._t0) * 1000
+        with self._lock:
+            timings = dict(self._timings)
+            counts = dict(self._counts)
+            properties = dict(self._properties)
+
+        metrics = [{"Name": "latency_ms", "Unit": "Milliseconds"},
+                   {"Name": "Requests", "Unit": "Count"},
+                   {"Name": "Errors", "Unit": "Count"},
+                   {"Name": "ColdStart", "Unit": "Count"}]
+        metrics += [{"Name": f"{k}_ms", "Unit": "Milliseconds"} for k in timings]
+        metrics += [{"Name": k, "Unit": "Count"} for k in counts]
+
+        doc = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": DIMENSION_SETS,
+                    "Metrics": metrics,
+                }],
+            },
+            "Service": self.service,
+            "Outcome": self.outcome,
+            "ErrorCode": self.error_code,
+            "StartType": "cold" if self.cold_start else "warm",
+            "latency_ms": round(total_ms, 3),
+            "Requests": 1,
+            "Errors": 1 if self.outcome == "error" else 0,
+            "ColdStart": 1 if self.cold_start else 0,
+        }
+        doc.update({f"{k}_ms": round(v, 3) for k, v in timings.items()})
+        doc.update(counts)
+        doc.update(properties)
+        return doc
+
+    def flush(self) -> None:
+        """Imprime la línea EMF (una sola vez por request)."""
+        if self._flushed:
+            return
+        self._flushed = True
+        print(json.dumps(self.to_document(), ensure_ascii=False))
+
+
+class _NullMetrics(RequestMetrics):
+    """Receptor inerte cuando no hay request activa (p.ej. llamadas directas en pruebas)."""
+
+    def __init__(self):
+        super().__init__("", "", False)
+
+    def add_timing(self, stage, ms):
+        pass
+
+    def increment(self, name, value=1):
+        pass
+
+    def put_property(self, key, value):
+        pass
+
+    def flush(self):
+        pass
+
+
+_NULL = _NullMetrics()
+
+
+def start(namespace: str, service: str) -> RequestMetrics:
+    """Crea las métricas de la request y las deja como actuales. La primera del contenedor es cold."""
+    global _cold_start
+    with _cold_lock:
+        cold, _cold_start = _cold_start, False
+    metrics = RequestMetrics(namespace, service, cold)
+    _current.set(metrics)
+    return metrics
+
+
+def current() -> RequestMetrics:
+    return _current.get() or _NULL
+
+
+def stage(name: str):
+    """Context manager que cronometra una etapa de la request actual."""
+    return current().stage(name)
+
+
+def run_in_context(fn, *args, **kwargs):
+    """
+    Envuelve fn para ejecutarla en otro hilo con el contexto actual (métricas incluidas):
+        executor.submit(emf.run_in_context(fn, a, b))
+    """
+    ctx = contextvars.copy_context()
+    return lambda: ctx.run(fn, *args, **kwargs)
@@ -0,0 +1,190 @@
+"""
+Prewarm: eventos de calentamiento que abren las conexiones del contenedor sin
+ejecutar lógica de negocio.
+
+Un evento es de warm-up si:
+  - trae la clave WARMUP_MARKER ("warmup") en la raíz del evento, p.ej. el input de
+    la regla EventBridge del módulo: {"warmup": {"concurrency": 4}}
+  - o es un "Scheduled Event" de EventBridge sin input propio (source aws.events)
+Los eventos de API Gateway nunca lo son (el body no se mira), así que no se puede
+disparar desde fuera.
+
+Cada handler pasa sus "primers" (nombre -> función sin argumentos que abre una
+conexión o carga un recurso y devuelve detalles). Con concurrency > 1 el contenedor
+que recibe el ping se invoca a sí mismo N-1 veces en paralelo (RequestResponse);
+cada hijo se queda ocupado hold_ms para que los hermanos caigan en contenedores
+distintos. El reporte dice qué se abrió, cuánto tardó y cuántos contenedores se
+alcanzaron.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+from orbit_shared import deadline, emf
+
+WARMUP_MARKER = os.getenv("WARMUP_MARKER", "warmup")
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "1"))
+PREWARM_MAX_CONCURRENCY = int(os.getenv("PREWARM_MAX_CONCURRENCY", "20"))
+# Tiempo que cada hijo del fan-out retiene su contenedor después de calentar
+PREWARM_HOLD_MS = float(os.getenv("PREWARM_HOLD_MS", "300"))
+# Presupuesto mínimo para intentar un primer (no abre conexiones a medias)
+PREWARM_MIN_SECONDS = float(os.getenv("PREWARM_MIN_SECONDS", "1"))
+
+# Identidad del contenedor (estado de módulo: vive lo que vive el contenedor)
+CONTAINER_ID = uuid.uuid4().hex[:12]
+
+# Cliente lambda propio para el fan-out si el handler no comparte el suyo
+_lambda_client = None
+_client_lock = threading.Lock()
+
+
+def is_warmup(event) -> bool:
+    if not isinstance(event, dict):
+        return False
+    if WARMUP_MARKER in event:
+        return True
+    return event.get("source") == "aws.events" and event.get("detail-type") == "Scheduled Event"
+
+
+def options(event) -> dict:
+    """concurrency / fanout / hold_ms del evento (el marcador puede ser true o un dict)."""
+    marker = event.get(WARMUP_MARKER)
+    opts = marker if isinstance(marker, dict) else {}
+    try:
+        concurrency = int(opts.get("concurrency", PREWARM_CONCURRENCY))
+    except (TypeError, ValueError):
+        concurrency = PREWARM_CONCURRENCY
+    try:
+        hold_ms = float(opts.get("hold_ms", PREWARM_HOLD_MS))
+    except (TypeError, ValueError):
+        hold_ms = PREWARM_HOLD_MS
+    return {
+        "concurrency": max(1, min(concurrency, PREWARM_MAX_CONCURRENCY)),
+        "fanout": opts.get("fanout", True) is not False,
+        "hold_ms": max(0.0, min(hold_ms, 5000.0)),
+    }
+
+
+def child_event(hold_ms: float) -> dict:
+    """Evento para un hijo del fan-out (o para calentar otra Lambda): sin fan-out propio."""
+    return {WARMUP_MARKER: {"concurrency": 1, "fanout": False, "hold_ms": hold_ms}}
+
+
+def _get_lambda_client():
+    global _lambda_client
+    if _lambda_client is None:
+        with _client_lock:
+            if _lambda_client is None:
+                import boto3
+                from botocore.config import Config
+                _lambda_client = boto3.client("lambda", config=Config(
+                    connect_timeout=2, read_timeout=10, retries={"max_attempts": 1, "mode": "standard"}))
+    return _lambda_client
+
+
+def _prime(name: str, fn) -> dict:
+    t0 = time.perf_counter()
+    try:
+        deadline.current().check(f"prewarm_{name}", PREWARM_MIN_SECONDS)
+        with emf.stage(f"prewarm_{name}"):
+            detail = fn()
+        result = {"ok": True}
+        if isinstance(detail, dict):
+            result.update(detail)
+        elif detail is not None:
+            result["detail"] = detail
+    except deadline.DeadlineExceeded as e:
+        result = e.to_result()
+    except Exception as e:
+        result = {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return result
+
+
+def invoke_warmup(get_client, function_name: str, hold_ms: float = 0) -> dict:
+    """Invoca `function_name` con un evento de warm-up (RequestResponse) y devuelve su reporte."""
+    resp = get_client().invoke(FunctionName=function_name, InvocationType="RequestResponse",
+                               Payload=json.dumps(child_event(hold_ms)).encode("utf-8"))
+    payload = resp.get("Payload")
+    raw = payload.read() if payload is not None else b""
+    if resp.get("FunctionError"):
+        return {"ok": False, "error": f"FunctionError: {resp['FunctionError']}",
+                "detail": raw[:200].decode("utf-8", "replace")}
+    try:
+        report = json.loads(raw or b"{}")
+    except ValueError:
+        return {"ok": False, "error": "invalid warmup response"}
+    if not isinstance(report, dict):
+        return {"ok": False, "error": "invalid warmup response"}
+    return report
+
+
+def _fan_out(function_arn: str, n: int, hold_ms: float, get_client) -> dict:
+    """n invocaciones concurrentes a la propia función; resume contenedores alcanzados."""
+    from concurrent.futures import ThreadPoolExecutor
+    get_client = get_client or _get_lambda_client
+
+    def one(_):
+        try:
+            return invoke_warmup(get_client, function_arn, hold_ms)
+        except Exception as e:
+            return {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+
+    with ThreadPoolExecutor(max_workers=min(n, 16), thread_name_prefix="prewarm") as pool:
+        reports = list(pool.map(one, range(n)))
+
+    ok = [r for r in reports if r.get("ok")]
+    containers = {r.get("container_id") for r in ok}
+    return {
+        "invoked": n,
+        "ok": len(ok),
+        "containers": len(containers - {CONTAINER_ID, None}),
+        "cold_starts": sum(1 for r in ok if r.get("cold_start")),
+        "errors": sorted({r.get("error", "") for r in reports if not r.get("ok")}),
+    }
+
+
+def run(event, context, primers: dict, get_lambda_client=None) -> dict:
+    """
+    Ejecuta los primers y, si aplica, el fan-out. Devuelve el reporte del warm-up:
+    {"ok", "warmup": True, "container_id", "cold_start", "primed": {...}, "fanout": {...} | None}.
+    """
+    t0 = time.perf_counter()
+    opts = options(event)
+    metrics = emf.current()
+
+    # El fan-out arranca antes de los primers: este contenedor sigue ocupado mientras
+    # los hijos calientan, y las llamadas de los primers se solapan con las de los hijos
+    fanout_thread, fanout = None, {}
+    function_arn = getattr(context, "invoked_function_arn", None)
+    if opts["fanout"] and opts["concurrency"] > 1 and function_arn:
+        def fan_out():
+            fanout.update(_fan_out(function_arn, opts["concurrency"] - 1, opts["hold_ms"], get_lambda_client))
+        fanout_thread = threading.Thread(target=fan_out, name="prewarm-fanout", daemon=True)
+        fanout_thread.start()
+
+    primed = {name: _prime(name, fn) for name, fn in primers.items()}
+
+    if fanout_thread is not None:
+        fanout_thread.join()
+    elif not opts["fanout"] and opts["hold_ms"]:
+        # Hijo del fan-out: retener el contenedor para que los hermanos no lo reutilicen
+        remaining = opts["hold_ms"] / 1000 - (time.perf_counter() - t0)
+        budget = deadline.current().remaining() - PREWARM_MIN_SECONDS
+        if remaining > 0 and budget > 0:
+            time.sleep(min(remaining, budget))
+
+    report = {
+        "ok": all(p.get("ok") for p in primed.values()),
+        "warmup": True,
+        "container_id": CONTAINER_ID,
+        "cold_start": bool(getattr(metrics, "cold_start", False)),
+        "primed": primed,
+        "fanout": fanout or None,
+        "ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    metrics.set_outcome("warmup")
+    metrics.put_property("warmup", report)
+    return report
@@ -0,0 +1,322 @@
+"""
+Validación del destinatario antes de mandar a SES o Zoho: sintaxis + registros MX del dominio.
+
+Un dominio mal escrito ("gmial.con") cuesta una sesión SMTP o una llamada a SES y después
+un rebote que baja la reputación del remitente. check() rechaza antes del envío:
+  - "syntax":           la dirección no es válida (request_schema.EMAIL_PATTERN + límites RFC 5321)
+  - "domain_not_found": el dominio no existe (NXDOMAIN)
+  - "no_mail_server":   sin MX ni A/AAAA (no hay a dónde entregar)
+  - "null_mx":          MX nulo (RFC 7505: el dominio declara que no recibe correo)
+
+El resolver es intercambiable (RECIPIENT_MX_RESOLVER):
+  - "off":  solo sintaxis (default)
+  - "doh":  DNS-over-HTTPS con JSON (RECIPIENT_DOH_URL), sin dependencias
+  - "dns":  dnspython (dependencia opcional; sin ella cae a "doh")
+  - "stub": tabla local (RECIPIENT_MX_STUB, JSON {dominio: [mx, ...] | "nxdomain"}) para pruebas
+
+Cada contenedor cachea las respuestas: positivas RECIPIENT_MX_TTL_SECONDS (acotado por el TTL
+del DNS), negativas RECIPIENT_MX_NEGATIVE_TTL_SECONDS. Los dominios de RECIPIENT_KNOWN_DOMAINS
+(gmail.com, outlook.com, ...) no se consultan. Si el resolver falla o no hay presupuesto, el
+destinatario pasa sin verificar (fail-open) y la falla se recuerda RECIPIENT_MX_ERROR_TTL_SECONDS.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from orbit_shared import deadline, emf, request_schema
+
+RECIPIENT_MX_RESOLVER = os.getenv("RECIPIENT_MX_RESOLVER", "off").strip().lower()
+RECIPIENT_DOH_URL = os.getenv("RECIPIENT_DOH_URL", "https://cloudflare-dns.com/dns-query")
+RECIPIENT_MX_STUB = os.getenv("RECIPIENT_MX_STUB", "")
+# Tope por consulta (s); la request manda si le queda menos
+RECIPIENT_MX_TIMEOUT_SECONDS = float(os.getenv("RECIPIENT_MX_TIMEOUT_SECONDS", "1.5"))
+RECIPIENT_MX_TTL_SECONDS = float(os.getenv("RECIPIENT_MX_TTL_SECONDS", "3600"))
+# Piso del TTL positivo: un TTL de DNS muy corto no debe forzar una consulta por request
+RECIPIENT_MX_MIN_TTL_SECONDS = float(os.getenv("RECIPIENT_MX_MIN_TTL_SECONDS", "300"))
+RECIPIENT_MX_NEGATIVE_TTL_SECONDS = float(os.getenv("RECIPIENT_MX_NEGATIVE_TTL_SECONDS", "900"))
+RECIPIENT_MX_ERROR_TTL_SECONDS = float(os.getenv("RECIPIENT_MX_ERROR_TTL_SECONDS", "30"))
+RECIPIENT_MX_CACHE_SIZE = int(os.getenv("RECIPIENT_MX_CACHE_SIZE", "2048"))
+RECIPIENT_KNOWN_DOMAINS = frozenset(
+    d.strip().lower() for d in os.getenv(
+        "RECIPIENT_KNOWN_DOMAINS",
+        "gmail.com,googlemail.com,outlook.com,hotmail.com,hotmail.es,live.com,live.com.mx,msn.com,"
+        "yahoo.com,yahoo.com.mx,icloud.com,me.com,protonmail.com,proton.me,aol.com,gmx.com,prodigy.net.mx",
+    ).split(",") if d.strip()
+)
+
+REASONS = ("syntax", "domain_not_found", "no_mail_server", "null_mx")
+_EMAIL_RE = re.compile(request_schema.EMAIL_PATTERN)
+
+
+class ResolverError(Exception):
+    """Falla transitoria del resolver (timeout, SERVFAIL, red): el destinatario pasa sin verificar."""
+
+
+def check_syntax(address: str) -> str | None:
+    """Dominio normalizado (minúsculas) si la dirección es válida; None si no."""
+    address = (address or "").strip()
+    if len(address) > 254 or not _EMAIL_RE.fullmatch(address):
+        return None
+    local, _, domain = address.rpartition("@")
+    if len(local) > 64 or ".." in local or local.startswith(".") or local.endswith("."):
+        return None
+    domain = domain.lower()
+    if len(domain) > 253 or any(len(label) > 63 or label.startswith("-") or label.endswith("-")
+                                for label in domain.split(".")):
+        return None
+    return domain
+
+
+# -----------------------------
+# Resolvers: resolve(domain, timeout) -> {"status", "hosts", "ttl"}
+#   status: "ok" | "null_mx" | "no_mail_server" | "domain_not_found"; ResolverError si falla
+# -----------------------------
+def _mx_answer(records, ttl):
+    """records: [(preferencia, host)] del MX. Aplica MX nulo (RFC 7505)."""
+    hosts = [host.rstrip(".").lower() for _, host in sorted(records)]
+    if hosts and all(h == "" for h in hosts):
+        return {"status": "null_mx", "hosts": [], "ttl": ttl}
+    return {"status": "ok", "hosts": [h for h in hosts if h], "ttl": ttl}
+
+
+class DohResolver:
+    """DNS-over-HTTPS con el formato JSON (application/dns-json) de Cloudflare/Google."""
+
+    MX, A, AAAA = 15, 1, 28
+
+    def __init__(self, url: str = RECIPIENT_DOH_URL):
+        self.url = url
+
+    def _query(self, domain: str, rtype: int, timeout: float) -> dict:
+        import urllib.error
+        import urllib.parse
+        import urllib.request
+        query = urllib.parse.urlencode({"name": domain, "type": rtype})
+        req = urllib.request.Request(f"{self.url}?{query}", headers={"Accept": "application/dns-json"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                doc = json.loads(resp.read().decode("utf-8"))
+        except (OSError, ValueError, urllib.error.URLError) as e:
+            raise ResolverError(f"{e.__class__.__name__}: {e}") from None
+        # Status: 0 NOERROR, 3 NXDOMAIN; el resto (SERVFAIL, REFUSED) es transitorio
+        if doc.get("Status") not in (0, 3):
+            raise ResolverError(f"DNS status {doc.get('Status')}")
+        return doc
+
+    def resolve(self, domain: str, timeout: float) -> dict:
+        doc = self._query(domain, self.MX, timeout)
+        if doc.get("Status") == 3:
+            return {"status": "domain_not_found", "hosts": [], "ttl": None}
+        answers = [a for a in doc.get("Answer") or [] if a.get("type") == self.MX]
+        if answers:
+            records = []
+            for a in answers:
+                pref, _, host = str(a.get("data", "")).partition(" ")
+                records.append((int(pref) if pref.isdigit() else 0, host.strip()))
+            return _mx_answer(records, min(a.get("TTL", 0) for a in answers) or None)
+        # Sin MX: el dominio recibe en su A/AAAA (MX implícito, RFC 5321 5.1)
+        for rtype in (self.A, self.AAAA):
+            doc = self._query(domain, rtype, timeout)
+            if any(a.get("type") == rtype for a in doc.get("Answer") or []):
+                return {"status": "ok", "hosts": [domain], "ttl": None}
+        return {"status": "no_mail_server", "hosts": [], "ttl": None}
+
+
+class DnsPythonResolver:
+    """Resolver del sistema con dnspython (no viene en la capa; agregarlo al paquete para usarlo)."""
+
+    def __init__(self):
+        import dns.resolver  # noqa: F401  (ImportError si no está instalado)
+
+    def resolve(self, domain: str, timeout: float) -> dict:
+        import dns.exception
+        import dns.resolver
+        try:
+            answer = dns.resolver.resolve(domain, "MX", lifetime=timeout)
+            return _mx_answer([(r.preference, r.exchange.to_text()) for r in answer], answer.rrset.ttl)
+        except dns.resolver.NXDOMAIN:
+            return {"status": "domain_not_found", "hosts": [], "ttl": None}
+        except dns.resolver.NoAnswer:
+            pass
+        except dns.exception.DNSException as e:
+            raise ResolverError(f"{e.__class__.__name__}: {e}") from None
+        for rtype in ("A", "AAAA"):
+            try:
+                dns.resolver.resolve(domain, rtype, lifetime=timeout)
+                return {"status": "ok", "hosts": [domain], "ttl": None}
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                continue
+            except dns.exception.DNSException as e:
+                raise ResolverError(f"{e.__class__.__name__}: {e}") from None
+        return {"status": "no_mail_server", "hosts": [], "ttl": None}
+
+
+class StubResolver:
+    """
+    Resolver local para pruebas y benchmarks: {dominio: ["mx1", ...] | [] (sin correo) |
+    "nxdomain" | "null_mx" | "error"}. Dominios que no están -> `missing` ("nxdomain" por default).
+    """
+
+    def __init__(self, records: dict | None = None, missing: str = "nxdomain", latency_s: float = 0.0):
+        self.records = {k.lower(): v for k, v in (records or {}).items()}
+        self.missing = missing
+        self.latency_s = latency_s
+        self.queries = 0
+
+    def resolve(self, domain: str, timeout: float) -> dict:
+        self.queries += 1
+        if self.latency_s:
+            time.sleep(min(self.latency_s, timeout))
+        value = self.records.get(domain, self.missing)
+        if value == "error":
+            raise ResolverError("stub error")
+        if value == "nxdomain":
+            return {"status": "domain_not_found", "hosts": [], "ttl": None}
+        if value == "null_mx":
+            return {"status": "null_mx", "hosts": [], "ttl": None}
+        if not value:
+            return {"status": "no_mail_server", "hosts": [], "ttl": None}
+        return {"status": "ok", "hosts": list(value), "ttl": None}
+
+
+def new_resolver(kind: str = RECIPIENT_MX_RESOLVER):
+    """Resolver de RECIPIENT_MX_RESOLVER (None = solo sintaxis)."""
+    if kind == "doh":
+        return DohResolver()
+    if kind == "dns":
+        try:
+            return DnsPythonResolver()
+        except ImportError:
+            print("dnspython not installed, RECIPIENT_MX_RESOLVER=dns falls back to doh")
+            return DohResolver()
+    if kind == "stub":
+        return StubResolver(json.loads(RECIPIENT_MX_STUB) if RECIPIENT_MX_STUB else {})
+    return None
+
+
+class RecipientChecker:
+    """Sintaxis + MX con caché LRU por contenedor (positiva, negativa y de errores del resolver)."""
+
+    def __init__(self, resolver=None, ttl_seconds: float = RECIPIENT_MX_TTL_SECONDS,
+                 min_ttl_seconds: float = RECIPIENT_MX_MIN_TTL_SECONDS,
+                 negative_ttl_seconds: float = RECIPIENT_MX_NEGATIVE_TTL_SECONDS,
+                 error_ttl_seconds: float = RECIPIENT_MX_ERROR_TTL_SECONDS,
+                 max_entries: int = RECIPIENT_MX_CACHE_SIZE, known_domains=RECIPIENT_KNOWN_DOMAINS,
+                 timeout_seconds: float = RECIPIENT_MX_TIMEOUT_SECONDS, clock=time.monotonic):
+        self.resolver = resolver
+        self.ttl_seconds = ttl_seconds
+        self.min_ttl_seconds = min(min_ttl_seconds, ttl_seconds)
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self.max_entries = max_entries
+        self.known_domains = frozenset(known_domains)
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        # dominio -> (expira, status)
+        self._cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "rejected": 0, "known": 0, "hits": 0, "negative_hits": 0,
+                       "lookups": 0, "resolver_errors": 0, "unverified": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _cached(self, domain: str) -> str | None:
+        with self._lock:
+            entry = self._cache.get(domain)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._cache[domain]
+                return None
+            self._cache.move_to_end(domain)
+            return entry[1]
+
+    def _store(self, domain: str, status: str, ttl: float):
+        with self._lock:
+            self._cache[domain] = (self._clock() + ttl, status)
+            self._cache.move_to_end(domain)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _lookup(self, domain: str) -> str:
+        """Status del dominio ("ok", rechazo o "unverified"), del caché o del resolver."""
+        status = self._cached(domain)
+        if status is not None:
+            self._count("hits" if status in ("ok", "unverified") else "negative_hits")
+            return status
+        self._count("lookups")
+        try:
+            timeout = deadline.current().timeout("mx_lookup", self.timeout_seconds, minimum=0.2)
+            with emf.stage("mx_lookup"):
+                answer = self.resolver.resolve(domain, timeout)
+        except deadline.DeadlineExceeded:
+            # Sin presupuesto para consultar: no se bloquea el envío por esto (y no se cachea)
+            return "unverified"
+        except Exception as e:
+            self._count("resolver_errors")
+            print("MX lookup error:", domain, repr(e))
+            self._store(domain, "unverified", self.error_ttl_seconds)
+            return "unverified"
+        status = answer["status"]
+        if status == "ok":
+            dns_ttl = answer.get("ttl") or self.ttl_seconds
+            self._store(domain, status, min(self.ttl_seconds, max(dns_ttl, self.min_ttl_seconds)))
+        else:
+            self._store(domain, status, self.negative_ttl_seconds)
+        return status
+
+    def check(self, address: str) -> dict:
+        """
+        {"ok": True, "domain", "mx": "known" | "verified" | "unverified" | "skipped"} o
+        {"error": "invalid_recipient", "reason": <REASONS>, "domain"}.
+        """
+        self._count("checks")
+        domain = check_syntax(address)
+        if domain is None:
+            self._count("rejected")
+            return {"error": "invalid_recipient", "reason": "syntax", "domain": None}
+        if self.resolver is None:
+            return {"ok": True, "domain": domain, "mx": "skipped"}
+        if domain in self.known_domains:
+            self._count("known")
+            return {"ok": True, "domain": domain, "mx": "known"}
+        status = self._lookup(domain)
+        if status == "ok":
+            return {"ok": True, "domain": domain, "mx": "verified"}
+        if status == "unverified":
+            self._count("unverified")
+            return {"ok": True, "domain": domain, "mx": "unverified"}
+        self._count("rejected")
+        return {"error": "invalid_recipient", "reason": status, "domain": domain}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "cached_domains": len(self._cache)}
+
+
+# Checker del contenedor (caché compartida por los hilos del fan-out); se crea al primer uso
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_checker() -> RecipientChecker:
+    global _checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                _checker = RecipientChecker(new_resolver())
+    return _checker
+
+
+def check(address: str) -> dict:
+    """check() del checker del contenedor, con el resultado en las métricas de la request."""
+    result = get_checker().check(address)
+    if result.get("error"):
+        emf.current().increment("recipient_rejected")
+        emf.current().put_property("recipient_rejected_reason", result["reason"])
+    return result
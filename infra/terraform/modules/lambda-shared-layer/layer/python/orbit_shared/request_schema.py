@@ -0,0 +1,184 @@
+"""
+Validación acotada del body de las requests (contact-form y email-dispatcher).
+
+1) decode_body: límite de tamaño ANTES de decodificar base64 o parsear JSON, así una
+   request gigante o basura se rechaza sin asignar memoria proporcional a ella.
+2) Schema: campos con tipo, longitud y formato, compilado una vez al importar el
+   módulo (una tupla de validadores por campo). validate() devuelve los errores por
+   campo en microsegundos y copia solo los campos declarados (salvo extra="allow").
+
+Uso:
+    data, code = request_schema.decode_body(event)      # code: missing | too_large | invalid_json
+    clean, errors = request_schema.CONTACT_FORM.validate(data)
+    if errors: ...  # {"email": "format", "message": "too_long", ...}
+"""
+import base64
+import binascii
+import json
+import os
+import re
+
+# Tamaño máximo del body ya decodificado (bytes); el formulario real pesa ~1-2 KB
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", "16384"))
+
+# Códigos de error por campo
+REQUIRED = "required"
+TYPE = "type"
+TOO_LONG = "too_long"
+FORMAT = "format"
+UNEXPECTED = "unexpected"
+
+# Sintaxis básica de un correo (una sola @, sin espacios ni caracteres de header)
+EMAIL_PATTERN = r"[^@\s<>\"',;:()\[\]\\]+@[A-Za-z0-9-]+(\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"
+# Etiqueta de idioma (es, es-MX, en_US)
+LOCALE_PATTERN = r"[A-Za-z]{2,8}([-_][A-Za-z0-9]{1,8})*"
+
+
+def decode_body(event, max_bytes: int | None = None):
+    """
+    Body JSON de un evento de API Gateway (v1/v2), con base64 si aplica.
+    Devuelve (data, None) o (None, code) con code en missing / too_large / invalid_json.
+    El tamaño se revisa sobre el string crudo (y sobre los bytes ya decodificados) antes
+    de json.loads.
+    """
+    max_bytes = MAX_BODY_BYTES if max_bytes is None else max_bytes
+    raw = event.get("body") if isinstance(event, dict) else None
+    if raw in (None, ""):
+        return None, "missing"
+    if not isinstance(raw, str):
+        return None, "invalid_json"
+
+    if event.get("isBase64Encoded"):
+        # base64 ocupa 4/3 del original: se descarta sin decodificar si no puede caber
+        if len(raw) > (max_bytes + 2) // 3 * 4:
+            return None, "too_large"
+        try:
+            raw_bytes = base64.b64decode(raw, validate=True)
+        except (binascii.Error, ValueError):
+            return None, "invalid_json"
+    else:
+        # Cada carácter ocupa al menos un byte en UTF-8
+        if len(raw) > max_bytes:
+            return None, "too_large"
+        raw_bytes = raw.encode("utf-8", errors="surrogatepass")
+    if len(raw_bytes) > max_bytes:
+        return None, "too_large"
+
+    try:
+        return json.loads(raw_bytes.decode("utf-8")), None
+    except (UnicodeDecodeError, ValueError, RecursionError):
+        return None, "invalid_json"
+
+
+class Field:
+    """
+    Campo de texto: requerido (no vacío), longitud máxima y regex opcional (match completo).
+    Un valor de solo espacios cuenta como vacío (""), salvo con keep_blank=True: se conserva tal
+    cual (p.ej. el honeypot, donde cualquier valor no vacío delata un bot).
+    """
+
+    __slots__ = ("name", "required", "max_length", "pattern", "keep_blank")
+
+    def __init__(self, name: str, required: bool = False, max_length: int = 200, pattern: str | None = None,
+                 keep_blank: bool = False):
+        self.name = name
+        self.required = required
+        self.max_length = max_length
+        self.pattern = pattern
+        self.keep_blank = keep_blank
+
+    def compile(self):
+        """Validador del campo: value -> (valor limpio, código de error o None)."""
+        required, max_length, keep_blank = self.required, self.max_length, self.keep_blank
+        fullmatch = re.compile(self.pattern).fullmatch if self.pattern else None
+
+        def check(value):
+            if value is None:
+                value = ""
+            elif not isinstance(value, str):
+                return None, TYPE
+            if len(value) > max_length:
+                return None, TOO_LONG
+            if not value.strip():
+                if keep_blank and value:
+                    return value, None
+                return ("", REQUIRED) if required else ("", None)
+            if fullmatch is not None and not fullmatch(value.strip()):
+                return None, FORMAT
+            return value, None
+
+        return check
+
+
+class Schema:
+    """
+    Conjunto de campos compilado al crearlo. Las claves no declaradas se descartan
+    (extra="ignore"), se reportan como error (extra="forbid") o pasan sin validar
+    (extra="allow").
+    """
+
+    def __init__(self, fields: list[Field], extra: str = "ignore", max_keys: int = 32):
+        if extra not in ("ignore", "forbid", "allow"):
+            raise ValueError(f"extra must be 'ignore', 'forbid' or 'allow', got {extra!r}")
+        self.fields = tuple(fields)
+        self.names = frozenset(f.name for f in fields)
+        self.extra = extra
+        self.max_keys = max_keys
+        self._checks = tuple((f.name, f.compile()) for f in fields)
+
+    def validate(self, data):
+        """
+        Devuelve (clean, None) con los campos declarados (más los extra si extra="allow"),
+        o (None, errors) con errors = {campo: código}. Un body que no es objeto JSON da
+        {"_body": "type"}.
+        """
+        if not isinstance(data, dict):
+            return None, {"_body": TYPE}
+        if len(data) > self.max_keys:
+            return None, {"_body": TOO_LONG}
+
+        clean = {k: v for k, v in data.items() if k not in self.names} if self.extra == "allow" else {}
+        errors = {}
+        for name, check in self._checks:
+            value, code = check(data.get(name))
+            if code is None:
+                clean[name] = value
+            else:
+                errors[name] = code
+        if self.extra == "forbid":
+            for key in data.keys() - self.names:
+                errors[str(key)[:64]] = UNEXPECTED
+        return (None, errors) if errors else (clean, None)
+
+
+# Body del formulario de contacto (frontend ContactForm.jsx). Todos los campos del
+# correo al vendor son requeridos: VendorNotifyTemplate los usa todos.
+CONTACT_FORM = Schema([
+    Field("name", required=True, max_length=200),
+    Field("email", required=True, max_length=254, pattern=EMAIL_PATTERN),
+    Field("phone", required=True, max_length=40),
+    Field("projectType", required=True, max_length=100),
+    Field("message", required=True, max_length=5000),
+    # Honeypot: cualquier valor (incluso solo espacios) se rechaza en el handler
+    Field("_hp", max_length=200, keep_blank=True),
+    Field("recaptchaToken", required=True, max_length=4096),
+    Field("idempotencyKey", max_length=200),
+    Field("locale", max_length=35, pattern=LOCALE_PATTERN),
+])
+
+# Mensaje para email-dispatcher: mismos límites, pero los requeridos dependen de la
+# plantilla (los resuelve ses_sender) y las claves no declaradas pasan tal cual.
+MESSAGE = Schema([
+    Field("template", max_length=100),
+    Field("name", max_length=200),
+    Field("email", max_length=254, pattern=EMAIL_PATTERN),
+    Field("phone", max_length=40),
+    Field("projectType", max_length=100),
+    Field("message", max_length=5000),
+    Field("locale", max_length=35, pattern=LOCALE_PATTERN),
+], extra="allow")
+
+
+def field_errors_message(errors: dict) -> str:
+    """'Invalid fields: email (format), message (too_long)' para respuestas tipo {"error": ...}."""
+    return "Invalid fields: " + ", ".join(f"{k} ({v})" for k, v in errors.items())
@@ -0,0 +1,196 @@
+"""
+Secretos del contenedor (reCAPTCHA, SMTP, ...) con caché en memoria y refresco en
+segundo plano.
+
+Backends (SECRETS_BACKEND):
+  env             variables de entorno (default; compatible con el despliegue actual)
+  secretsmanager  un secreto JSON de Secrets Manager {"RECAPTCHA_SECRET": "...", ...} (SECRETS_ID = nombre/ARN)
+  ssm             parámetros SecureString bajo una ruta de Parameter Store (SECRETS_ID = /orbit/prod/contact-form)
+  file            archivo JSON local (SECRETS_ID = ruta), para pruebas y benchmarks
+
+La primera carga ocurre al crear el store (init del contenedor) o en el prewarm. Después,
+get() nunca llama a la red: devuelve el valor en caché y, pasada la fracción
+SECRETS_REFRESH_AHEAD del TTL, lanza un refresco en un hilo. Si el refresco falla se siguen
+sirviendo los últimos valores buenos. invalidate() fuerza un refresco (p.ej. cuando
+Google o Zoho rechazan la credencial tras una rotación), sin redeploy.
+"""
+import json
+import os
+import threading
+import time
+
+SECRETS_BACKEND = os.getenv("SECRETS_BACKEND", "env").strip().lower()
+SECRETS_ID = os.getenv("SECRETS_ID", "")
+SECRETS_TTL_SECONDS = float(os.getenv("SECRETS_TTL_SECONDS", "300"))
+# Fracción del TTL a partir de la cual se refresca en segundo plano
+SECRETS_REFRESH_AHEAD = float(os.getenv("SECRETS_REFRESH_AHEAD", "0.8"))
+# Reintento tras un refresco fallido (s)
+SECRETS_RETRY_SECONDS = float(os.getenv("SECRETS_RETRY_SECONDS", "30"))
+# Intervalo mínimo entre cargas forzadas por invalidate() (s)
+SECRETS_MIN_REFRESH_SECONDS = float(os.getenv("SECRETS_MIN_REFRESH_SECONDS", "5"))
+
+BACKENDS = ("env", "secretsmanager", "ssm", "file")
+
+
+class SecretsError(Exception):
+    """No se pudieron cargar los secretos del backend configurado."""
+
+
+def _aws_client(service: str):
+    import boto3
+    from botocore.config import Config
+    return boto3.client(service, config=Config(connect_timeout=2, read_timeout=3,
+                                               retries={"max_attempts": 2, "mode": "standard"}))
+
+
+def _load_env(source: str, names) -> dict:
+    return {name: os.getenv(name, "") for name in names}
+
+
+def _load_file(source: str, names) -> dict:
+    with open(source, encoding="utf-8") as f:
+        values = json.load(f)
+    if not isinstance(values, dict):
+        raise SecretsError(f"{source}: expected a JSON object")
+    return values
+
+
+def _load_secretsmanager(source: str, names, get_client=None) -> dict:
+    client = (get_client or (lambda: _aws_client("secretsmanager")))()
+    raw = client.get_secret_value(SecretId=source).get("SecretString") or "{}"
+    try:
+        values = json.loads(raw)
+    except ValueError:
+        raise SecretsError(f"secret {source} is not a JSON object") from None
+    if not isinstance(values, dict):
+        raise SecretsError(f"secret {source} is not a JSON object")
+    return values
+
+
+def _load_ssm(source: str, names, get_client=None) -> dict:
+    client = (get_client or (lambda: _aws_client("ssm")))()
+    path = source.rstrip("/")
+    values, token = {}, None
+    while True:
+        kwargs = {"Path": path, "WithDecryption": True, "Recursive": False}
+        if token:
+            kwargs["NextToken"] = token
+        resp = client.get_parameters_by_path(**kwargs)
+        for param in resp.get("Parameters", []):
+            values[param["Name"].rsplit("/", 1)[-1]] = param["Value"]
+        token = resp.get("NextToken")
+        if not token:
+            return values
+
+
+_LOADERS = {"env": _load_env, "file": _load_file, "secretsmanager": _load_secretsmanager, "ssm": _load_ssm}
+
+
+class SecretStore:
+    """Valores de un backend, cacheados con TTL; refresco no bloqueante."""
+
+    def __init__(self, names, backend: str = SECRETS_BACKEND, source: str = SECRETS_ID,
+                 ttl_seconds: float = SECRETS_TTL_SECONDS, loader=None, clock=time.monotonic):
+        if backend not in BACKENDS:
+            raise ValueError(f"SECRETS_BACKEND must be one of {BACKENDS}, got {backend!r}")
+        if backend != "env" and not source and loader is None:
+            raise ValueError(f"SECRETS_ID is required for SECRETS_BACKEND={backend}")
+        self.names = tuple(names)
+        self.backend = backend
+        self.source = source
+        self.ttl_seconds = ttl_seconds
+        self._loader = loader or _LOADERS[backend]
+        self._clock = clock
+        self._values: dict | None = None
+        self._refresh_at = 0.0
+        self._last_attempt = -float("inf")
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "refreshes": 0, "errors": 0, "invalidations": 0, "last_error": None}
+
+    def _fetch(self) -> dict:
+        values = self._loader(self.source, self.names)
+        return {name: str(values.get(name) or "") for name in self.names}
+
+    def load(self) -> dict:
+        """Carga síncrona (init del contenedor / prewarm). Lanza SecretsError si falla."""
+        self._last_attempt = self._clock()
+        try:
+            values = self._fetch()
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["last_error"] = f"{e.__class__.__name__}: {e}"
+                self._refresh_at = self._clock() + min(SECRETS_RETRY_SECONDS, self.ttl_seconds)
+            raise SecretsError(f"{self.backend} secrets load failed: {e.__class__.__name__}: {e}") from e
+        with self._lock:
+            self._values = values
+            self._refresh_at = self._clock() + self.ttl_seconds * SECRETS_REFRESH_AHEAD
+            self._stats["loads"] += 1
+        return values
+
+    def _refresh(self):
+        try:
+            self.load()
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except SecretsError as e:
+            # Se quedan los valores anteriores; load() ya programó el reintento
+            print("Secrets refresh failed:", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _maybe_refresh(self):
+        with self._lock:
+            if self._refreshing or self._clock() < self._refresh_at:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="secrets-refresh", daemon=True).start()
+
+    def get(self, name: str, default: str = "") -> str:
+        """
+        Valor en caché. Solo bloquea si nunca se cargó (la carga del init falló); si el
+        valor está por vencer, refresca en segundo plano y devuelve el actual.
+        """
+        values = self._values
+        if values is None:
+            if self._clock() < self._refresh_at:
+                return default  # la última carga falló hace poco: no reintentar en cada request
+            try:
+                values = self.load()
+            except SecretsError as e:
+                print("Secrets unavailable:", e)
+                return default
+        else:
+            self._maybe_refresh()
+        return values.get(name) or default
+
+    def needs_refresh(self) -> bool:
+        """Nunca cargado o pasado el punto de refresco (útil para refrescar síncrono en el prewarm)."""
+        return self._values is None or self._clock() >= self._refresh_at
+
+    def invalidate(self):
+        """La credencial fue rechazada (posible rotación): refrescar en la próxima lectura."""
+        with self._lock:
+            self._refresh_at = min(self._refresh_at, self._last_attempt + SECRETS_MIN_REFRESH_SECONDS)
+            self._stats["invalidations"] += 1
+        self._maybe_refresh()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["loaded"] = self._values is not None
+        s["backend"] = self.backend
+        return s
+
+
+def create_store(names) -> SecretStore:
+    """Store del contenedor según SECRETS_*; intenta la primera carga ya (fuera del camino de la request)."""
+    store = SecretStore(names)
+    try:
+        store.load()
+    except SecretsError as e:
+        # El contenedor arranca igual: get() vuelve a intentar y el error queda en stats()
+        print("Secrets initial load failed:", e)
+    return store
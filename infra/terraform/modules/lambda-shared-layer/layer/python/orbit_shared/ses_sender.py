@@ -0,0 +1,582 @@
+"""
+Envío de emails con plantillas SES (SESv2), compartido por email-dispatcher y contact-form.
+
+Es la lógica que antes vivía sólo en el dispatcher: contact-form la usa en proceso
+(DISPATCH_TRANSPORT=inprocess) para notificar al vendor sin el salto Lambda-a-Lambda.
+
+Las funciones reciben el remitente y un getter del cliente sesv2, así cada Lambda
+conserva su propia configuración y el cliente sólo se crea si hay algo que enviar.
+Resultados: {"ok": True, "messageId": "..."} o {"error": "...", ...}.
+
+Los campos requeridos de cada plantilla salen de sus placeholders (orbit_shared.ses_templates,
+los mismos archivos que Terraform sube a SES) y se validan antes de enviar. Con
+SES_CONTENT_MODE=simple el correo se renderiza localmente y se envía como contenido
+Simple (sin depender de la plantilla guardada en SES).
+
+Los destinatarios que vienen en el payload (ContactAckTemplate -> "email") pasan por
+orbit_shared.recipient_check (sintaxis + MX cacheado) antes de SES: un dominio que no recibe
+correo se rechaza con {"error": "Invalid recipient", "reason": ...} en vez de rebotar.
+
+Throttling: cada envío pasa por un token bucket al ritmo de la cuota de la cuenta
+(GetAccount -> SendQuota.MaxSendRate, cacheada). Los throttles y errores transitorios
+de SES se reintentan con backoff exponencial y jitter dentro del presupuesto de la
+request; si se agotan, el error lleva "retryable": True ("SES throttled" o "SES error")
+para distinguirlo de las fallas permanentes ("retryable": False). Con el breaker de SES
+abierto ("SES unavailable") también es reintentable. Un chunk de SendBulkEmail comparte
+un solo presupuesto de SES_MAX_ATTEMPTS llamadas con el reenvío de sus entradas fallidas.
+
+Cada llamada (envío o GetAccount) usa timeouts que caben en lo que queda del deadline actual
+(el de la request, o el del fan-out en contact-form): si los del cliente no caben, va con
+una copia del cliente con connect/read más cortos.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from orbit_shared import circuit_breaker, deadline, emf, recipient_check, ses_templates
+
+# Enrutamiento por plantilla. Los campos de cada una salen de sus placeholders;
+# "provided" son los que pone el sender (no los manda el llamador)
+TEMPLATES = {
+    "ContactAckTemplate": {
+        "to_mode": "payload",
+        "to_key": "email",
+        "provided": ["supportEmail"],
+    },
+    "VendorNotifyTemplate": {
+        "to_mode": "env",
+        "env_key": "VENDOR_EMAIL",
+        "provided": [],
+    },
+    # Resumen de varias VendorNotifyTemplate durante un pico (email-dispatcher vendor_digest)
+    "VendorDigestTemplate": {
+        "to_mode": "env",
+        "env_key": "VENDOR_EMAIL",
+        "provided": [],
+    },
+}
+
+# "template": plantilla guardada en SES (default); "simple": render local + contenido Simple
+SES_CONTENT_MODE = os.getenv("SES_CONTENT_MODE", "template").strip().lower()
+
+# Límite de SESv2 SendBulkEmail por llamada
+BULK_MAX_ENTRIES = 50
+
+# Circuit breaker de SES: una llamada más lenta que esto (ms) cuenta como lenta
+SES_SLOW_CALL_MS = float(os.getenv("SES_SLOW_CALL_MS", "2000"))
+
+# Timeouts del cliente sesv2 (tope por llamada; el presupuesto de la request manda)
+SES_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SES_CONNECT_TIMEOUT_SECONDS", "2"))
+SES_READ_TIMEOUT_SECONDS = float(os.getenv("SES_READ_TIMEOUT_SECONDS", "5"))
+# Presupuesto mínimo (s) para intentar una llamada a SES
+SES_MIN_SECONDS = float(os.getenv("SES_MIN_SECONDS", "0.5"))
+# Escalón (s) de los timeouts recortados al deadline (una copia del cliente por escalón)
+SES_TIMEOUT_STEP_SECONDS = 0.5
+
+# Reintentos ante throttling / errores transitorios (backoff exponencial con jitter completo)
+SES_MAX_ATTEMPTS = int(os.getenv("SES_MAX_ATTEMPTS", "4"))
+SES_BACKOFF_BASE_MS = float(os.getenv("SES_BACKOFF_BASE_MS", "100"))
+SES_BACKOFF_MAX_MS = float(os.getenv("SES_BACKOFF_MAX_MS", "2000"))
+
+# Cuota de envío: cache de GetAccount, fracción que usa cada contenedor y ritmo si GetAccount falla
+SES_QUOTA_TTL_SECONDS = float(os.getenv("SES_QUOTA_TTL_SECONDS", "300"))
+SES_RATE_SHARE = float(os.getenv("SES_RATE_SHARE", "1.0"))
+SES_FALLBACK_SEND_RATE = float(os.getenv("SES_FALLBACK_SEND_RATE", "1"))
+
+# Throttling: se reintenta y no abre el circuito (el bucket y el backoff ya bajan el ritmo)
+SES_THROTTLING_CODES = ("TooManyRequestsException", "Throttling", "ThrottlingException")
+# Errores que indican SES degradado; los 4xx propios del mensaje no abren el circuito
+SES_OUTAGE_CODES = ("ServiceUnavailable", "InternalFailure")
+# Estados de SendBulkEmail por entrada que vale la pena reintentar
+BULK_RETRYABLE_STATUSES = ("ACCOUNT_THROTTLED", "TRANSIENT_FAILURE")
+
+
+def new_client(region: str):
+    import boto3
+    from botocore.config import Config
+    # Sin esto boto espera hasta 60 s por lectura. Los reintentos los hace este módulo
+    # (bucket + backoff con el presupuesto de la request), no boto
+    config = Config(connect_timeout=SES_CONNECT_TIMEOUT_SECONDS, read_timeout=SES_READ_TIMEOUT_SECONDS,
+                    retries={"max_attempts": 1, "mode": "standard"})
+    return boto3.client("sesv2", region_name=region, config=config)
+
+
+_short_clients: dict = {}
+_short_clients_lock = threading.Lock()
+
+
+def _client_for(client, budget_seconds: float):
+    """
+    Cliente cuyos timeouts (connect + read) caben en budget_seconds: el mismo si ya caben, o una
+    copia con timeouts más cortos, cacheada por escalón. Los stand-ins sin config se usan tal cual.
+    """
+    config = getattr(getattr(client, "meta", None), "config", None)
+    connect = getattr(config, "connect_timeout", None)
+    read = getattr(config, "read_timeout", None)
+    if not isinstance(connect, (int, float)) or not isinstance(read, (int, float)) or connect + read <= budget_seconds:
+        return client
+    step = max(SES_MIN_SECONDS, math.floor(budget_seconds / SES_TIMEOUT_STEP_SECONDS) * SES_TIMEOUT_STEP_SECONDS)
+    key = (id(client), step)
+    short = _short_clients.get(key)
+    if short is None:
+        import boto3
+        from botocore.config import Config
+        connect = min(connect, step / 2)
+        short = boto3.client("sesv2", region_name=client.meta.region_name,
+                             config=config.merge(Config(connect_timeout=connect, read_timeout=step - connect)))
+        with _short_clients_lock:
+            short = _short_clients.setdefault(key, short)
+    return short
+
+
+class SendRateLimiter:
+    """
+    Token bucket al ritmo de envío de la cuenta: SendQuota.MaxSendRate de GetAccount,
+    cacheado quota_ttl_seconds. Cada destinatario cuenta como un envío. `share` es la
+    fracción de la cuota que usa este contenedor (todos los contenedores comparten la cuenta).
+    """
+
+    def __init__(self, quota_ttl_seconds: float = SES_QUOTA_TTL_SECONDS, share: float = SES_RATE_SHARE,
+                 fallback_rate: float = SES_FALLBACK_SEND_RATE, clock=time.monotonic, sleep=time.sleep):
+        self.quota_ttl_seconds = quota_ttl_seconds
+        self.share = share
+        self.fallback_rate = fallback_rate
+        self._clock = clock
+        self._sleep = sleep
+        self.rate = max(fallback_rate * share, 0.01)
+        self.burst = max(1.0, self.rate)
+        self.tokens = self.burst
+        self._updated = clock()
+        self._quota: dict | None = None
+        self._quota_expires = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waits": 0, "wait_ms": 0.0, "rejected": 0,
+                       "quota_refreshes": 0, "quota_errors": 0}
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def quota(self, get_client) -> dict:
+        """
+        SendQuota de la cuenta (cacheada). Ajusta el ritmo del bucket al refrescarla. El refresco
+        va en el camino de la request: usa como mucho la mitad del deadline (dejando SES_MIN_SECONDS
+        al envío); si no alcanza, sigue con el ritmo actual y se intenta en la próxima llamada.
+        """
+        now = self._clock()
+        if self._quota is not None and now < self._quota_expires:
+            return self._quota
+        remaining = deadline.current().remaining()
+        budget = min(remaining - SES_MIN_SECONDS, remaining / 2)
+        if budget < SES_MIN_SECONDS:
+            emf.current().increment("ses_quota_deferred")
+            return self._quota or {}
+        ttl = self.quota_ttl_seconds
+        try:
+            with emf.stage("ses_get_account"):
+                quota = _client_for(get_client(), budget).get_account().get("SendQuota") or {}
+            rate = float(quota.get("MaxSendRate") or self.fallback_rate)
+            stat = "quota_refreshes"
+        except Exception as e:
+            # Sin permiso o SES caído: ritmo conservador y se vuelve a intentar pronto
+            print("SES GetAccount error:", repr(e))
+            quota, rate, ttl, stat = {}, self.fallback_rate, min(ttl, 60.0), "quota_errors"
+        with self._lock:
+            first = self._quota is None
+            self._refill(now)
+            self.rate = max(rate * self.share, 0.01)
+            self.burst = max(1.0, self.rate)
+            self.tokens = self.burst if first else min(self.tokens, self.burst)
+            self._quota, self._quota_expires = quota, now + ttl
+            self._stats[stat] += 1
+        return quota
+
+    def acquire(self, get_client, n: int = 1, max_wait: float = math.inf) -> float | None:
+        """
+        Reserva n envíos; duerme lo necesario para no pasar la cuota. Devuelve los
+        segundos esperados o None si habría que esperar más que max_wait.
+        """
+        self.quota(get_client)
+        with self._lock:
+            self._refill(self._clock())
+            # Más que el burst nunca cabe: se espera un burst completo (los lotes se parten con max_batch)
+            need = min(n, self.burst)
+            wait = max(0.0, (need - self.tokens) / self.rate)
+            if wait > max_wait:
+                self._stats["rejected"] += 1
+                return None
+            self.tokens -= n
+            self._stats["acquired"] += n
+            if wait:
+                self._stats["waits"] += 1
+                self._stats["wait_ms"] += wait * 1000
+        if wait:
+            with emf.stage("ses_rate_wait"):
+                self._sleep(wait)
+        return wait
+
+    def max_batch(self, get_client) -> int:
+        """Envíos que SES acepta de golpe (un segundo de cuota): tamaño máximo de cada SendBulkEmail."""
+        self.quota(get_client)
+        return max(1, int(self.burst))
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["wait_ms"] = round(s["wait_ms"], 3)
+            s["rate"] = self.rate
+        return s
+
+
+# Bucket del contenedor (compartido por los hilos del fan-out)
+_rate_limiter = SendRateLimiter()
+
+
+def _breaker():
+    return circuit_breaker.get("ses", slow_call_ms=SES_SLOW_CALL_MS)
+
+
+def _classify(e) -> str:
+    """ClientError de SES -> "throttled" | "transient" | "permanent"."""
+    error = e.response.get("Error", {})
+    status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    # La cuota diaria no se libera con unos segundos de backoff
+    if "daily message quota" in str(error.get("Message", "")).lower():
+        return "permanent"
+    if error.get("Code") in SES_THROTTLING_CODES or status == 429:
+        return "throttled"
+    if status >= 500 or error.get("Code") in SES_OUTAGE_CODES:
+        return "transient"
+    return "permanent"
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Jitter completo: uniforme entre 0 y base * 2^(attempt-1), con tope."""
+    return random.uniform(0, min(SES_BACKOFF_MAX_MS, SES_BACKOFF_BASE_MS * 2 ** (attempt - 1))) / 1000
+
+
+def _circuit_open_error(breaker) -> dict:
+    # Caída temporal de SES: 503 por HTTP, y el llamador reintenta pasado retry_after_seconds
+    return {"error": "SES unavailable", "detail": "circuit open", "retryable": True,
+            "retry_after_seconds": breaker.retry_after()}
+
+
+class _RetryBudget:
+    """Llamadas a SES que le quedan a un envío (un chunk de bulk comparte una con sus reintentos)."""
+
+    def __init__(self, max_attempts: int = SES_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.used = 0
+
+    def take(self) -> bool:
+        if self.used >= self.max_attempts:
+            return False
+        self.used += 1
+        return True
+
+    def left(self) -> int:
+        return self.max_attempts - self.used
+
+
+def _send_with_retries(stage: str, n: int, get_client, call, budget: _RetryBudget | None = None):
+    """
+    Ejecuta call(client) respetando el bucket de la cuota; reintenta throttling y errores
+    transitorios con backoff mientras alcancen `budget` (SES_MAX_ATTEMPTS llamadas por defecto) y
+    el deadline. Cada llamada usa un cliente con timeouts dentro del deadline.
+    Devuelve (resp, None) o (None, error).
+    """
+    from botocore.exceptions import ClientError
+
+    budget = budget or _RetryBudget()
+    breaker = _breaker()
+    while budget.take():
+        attempt = budget.used
+        max_wait = deadline.current().remaining() - SES_MIN_SECONDS
+        if _rate_limiter.acquire(get_client, n, max_wait=max_wait) is None:
+            emf.current().increment("ses_rate_rejected")
+            return None, {"error": "SES throttled", "detail": "local send rate limit", "retryable": True,
+                          "attempts": attempt - 1}
+        if not breaker.allow():
+            return None, _circuit_open_error(breaker)
+        remaining = deadline.current().remaining()
+        if remaining < SES_MIN_SECONDS:
+            return None, {**deadline.DeadlineExceeded(stage, remaining).to_result(), "retryable": True,
+                          "attempts": attempt - 1}
+
+        t0 = time.perf_counter()
+        try:
+            with emf.stage(stage):
+                resp = call(_client_for(get_client(), remaining))
+            breaker.record(True, (time.perf_counter() - t0) * 1000)
+            return resp, None
+        except ClientError as e:
+            kind = _classify(e)
+            breaker.record(kind != "transient", (time.perf_counter() - t0) * 1000)
+            emf.current().put_property("ses_error_code", e.response.get("Error", {}).get("Code"))
+            if kind == "permanent":
+                print("SES error:", str(e))
+                return None, {"error": "SES error", "detail": str(e), "retryable": False}
+
+            emf.current().increment(f"ses_{kind}")
+            delay = _backoff_seconds(attempt)
+            if budget.left() == 0 or delay > deadline.current().remaining() - SES_MIN_SECONDS:
+                print("SES error:", str(e))
+                return None, {"error": "SES throttled" if kind == "throttled" else "SES error",
+                              "detail": str(e), "retryable": True, "attempts": attempt}
+            emf.current().increment("ses_retries")
+            time.sleep(delay)
+        except Exception:
+            # Red / credenciales (BotoCoreError): cuenta como falla y se propaga como antes
+            breaker.record(False, (time.perf_counter() - t0) * 1000)
+            raise
+    return None, {"error": "SES error", "detail": "retry budget exhausted", "retryable": True,
+                  "attempts": budget.used}
+
+
+def warm(get_client) -> dict:
+    """
+    Prewarm: crea el cliente, abre la conexión HTTPS con GetAccount (deja cargada la cuota
+    del bucket) y compila las plantillas. No envía nada.
+    """
+    quota = _rate_limiter.quota(get_client)
+    result = {"max_send_rate": quota.get("MaxSendRate"), "templates": len(ses_templates.get())}
+    if not quota:
+        result.update({"ok": False, "error": "GetAccount failed"})
+    return result
+
+
+def template_fields(template_name):
+    """
+    (required, whitelist) de la plantilla: whitelist = placeholders que manda el llamador;
+    required = esos más el campo de destino. Lanza OSError/ValueError si las plantillas no cargan.
+    """
+    tpl = TEMPLATES[template_name]
+    compiled = ses_templates.get()[template_name]
+    whitelist = [f for f in compiled.field_order if f not in tpl["provided"]]
+    required = list(whitelist)
+    if tpl["to_mode"] == "payload" and tpl["to_key"] not in required:
+        required.insert(0, tpl["to_key"])
+    return required, whitelist
+
+
+def prepare_templated_email(data, from_email, to_email=None):
+    """
+    Valida el mensaje y resuelve destinatario + TemplateData (sin llamar a SES).
+    to_email reemplaza al destinatario de TEMPLATES (rutas del vendor en email-dispatcher).
+    Devuelve (prepared, None) con prepared = {"template", "to_email", "values", "template_data"}
+    o (None, {"error": "..."}).
+    """
+    if not isinstance(data, dict):
+        return None, {"error": "Invalid event"}
+
+    template_name = (data.get("template") or "").strip()
+    tpl = TEMPLATES.get(template_name)
+    if not tpl:
+        return None, {"error": "Unknown template"}
+
+    try:
+        required, whitelist = template_fields(template_name)
+    except (OSError, ValueError) as e:
+        print("SES templates error:", repr(e))
+        return None, {"error": "Templates not available", "detail": str(e)}
+
+    missing = [f for f in required if not str(data.get(f) or "").strip()]
+    if missing:
+        return None, {"error": f"Missing fields: {', '.join(missing)}"}
+
+    if not from_email:
+        return None, {"error": "FROM_EMAIL not configured"}
+
+    # Resolver destinatario
+    to_override = to_email
+    if to_email:
+        to_email = to_email.strip()
+    elif tpl["to_mode"] == "payload":
+        to_email = (data.get(tpl["to_key"]) or "").strip()
+        if not to_email:
+            return None, {"error": f"Missing destination field '{tpl['to_key']}'"}
+    elif tpl["to_mode"] == "env":
+        env_key = tpl["env_key"]
+        to_email = os.getenv(env_key, "").strip()
+        if not to_email:
+            return None, {"error": f"{env_key} not configured"}
+    else:
+        return None, {"error": "Invalid template routing"}
+
+    # Construir TemplateData seguro: solo los placeholders de la plantilla
+    values = {k: data.get(k, "") for k in whitelist}
+    if "supportEmail" in tpl["provided"]:
+        values["supportEmail"] = from_email
+
+    return {"template": template_name, "to_email": to_email, "to_override": bool(to_override), "values": values,
+            "template_data": json.dumps(values)}, None
+
+
+def check_recipient(prepared) -> dict | None:
+    """
+    Sintaxis + MX del destinatario cuando lo puso el llamador (to_mode "payload"); los de
+    env y las rutas del vendor son configuración. None si pasa, o el error a devolver.
+    """
+    if TEMPLATES[prepared["template"]]["to_mode"] != "payload" or prepared.get("to_override"):
+        return None
+    with emf.stage("recipient_check"):
+        result = recipient_check.check(prepared["to_email"])
+    if result.get("error"):
+        return {"error": "Invalid recipient", "reason": result["reason"], "domain": result["domain"],
+                "retryable": False}
+    return None
+
+
+def render_email(data, from_email, to_email=None):
+    """
+    Valida y renderiza localmente (subject, html, text) sin llamar a SES: contenido Simple,
+    previsualización y benchmarks. Devuelve (rendered, None) o (None, {"error": ...}).
+    """
+    prepared, error = prepare_templated_email(data, from_email, to_email)
+    if error:
+        return None, error
+    with emf.stage("template_render"):
+        rendered = ses_templates.get()[prepared["template"]].render(prepared["values"])
+    return {**prepared, **rendered}, None
+
+
+def _simple_content(rendered) -> dict:
+    return {"Simple": {
+        "Subject": {"Data": rendered["subject"], "Charset": "UTF-8"},
+        "Body": {"Text": {"Data": rendered["text"], "Charset": "UTF-8"},
+                 "Html": {"Data": rendered["html"], "Charset": "UTF-8"}},
+    }}
+
+
+def send_templated_email(data, get_client, from_email, to_email=None):
+    """
+    Valida, arma TemplateData y envía por SES.
+    data: dict con al menos {"template": "<name>", ...}; to_email: destinatario explícito (opcional)
+    Devuelve dict {"ok": True, "messageId": "..."} o {"error": "...", "retryable": bool, ...}
+    """
+    if SES_CONTENT_MODE == "simple":
+        prepared, error = render_email(data, from_email, to_email)
+    else:
+        prepared, error = prepare_templated_email(data, from_email, to_email)
+    if error:
+        return error
+    error = check_recipient(prepared)
+    if error:
+        return error
+
+    try:
+        deadline.current().check("ses_send", SES_MIN_SECONDS)
+    except deadline.DeadlineExceeded as e:
+        return e.to_result()
+
+    if SES_CONTENT_MODE == "simple":
+        content = _simple_content(prepared)
+    else:
+        content = {"Template": {"TemplateName": prepared["template"], "TemplateData": prepared["template_data"]}}
+    resp, error = _send_with_retries("ses_send", 1, get_client, lambda client: client.send_email(
+        FromEmailAddress=from_email,
+        Destination={"ToAddresses": [prepared["to_email"]]},
+        Content=content,
+        ReplyToAddresses=[from_email],
+    ))
+    emf.current().put_property("ses_rate_limiter", _rate_limiter.stats())
+    if error:
+        return error
+    return {"ok": True, "messageId": resp.get("MessageId")}
+
+
+def _send_bulk_chunk(template_name, chunk, get_client, from_email, results):
+    """
+    Envía un chunk con SendBulkEmail. Las entradas con estado reintentable
+    (ACCOUNT_THROTTLED, TRANSIENT_FAILURE) se reenvían con backoff; el resto queda en results.
+    Las llamadas del chunk y las de sus reenvíos salen de un mismo presupuesto (SES_MAX_ATTEMPTS).
+    """
+    budget = _RetryBudget()
+    pending = chunk
+    while True:
+        resp, error = _send_with_retries("ses_bulk_send", len(pending), get_client,
+                                         lambda client: client.send_bulk_email(
+            FromEmailAddress=from_email,
+            ReplyToAddresses=[from_email],
+            DefaultContent={"Template": {"TemplateName": template_name, "TemplateData": "{}"}},
+            BulkEmailEntries=[
+                {
+                    "Destination": {"ToAddresses": [p["to_email"]]},
+                    "ReplacementEmailContent": {
+                        "ReplacementTemplate": {"ReplacementTemplateData": p["template_data"]}
+                    },
+                }
+                for _, p in pending
+            ],
+        ), budget)
+        if error:
+            for i, _ in pending:
+                results[i] = {"index": i, **error}
+            return
+
+        entries = resp.get("BulkEmailEntryResults", [])
+        retry = []
+        for (i, p), entry in zip(pending, entries):
+            status = entry.get("Status")
+            if status == "SUCCESS":
+                results[i] = {"index": i, "ok": True, "messageId": entry.get("MessageId")}
+                continue
+            retryable = status in BULK_RETRYABLE_STATUSES
+            results[i] = {"index": i, "error": "SES throttled" if status == "ACCOUNT_THROTTLED" else "SES error",
+                          "detail": f"{status}: {entry.get('Error', '')}", "retryable": retryable}
+            if retryable:
+                retry.append((i, p))
+        # SES devuelve un resultado por entrada; si faltara alguno lo marcamos como error
+        for i, _ in pending[len(entries):]:
+            results[i] = {"index": i, "error": "SES error", "detail": "missing bulk entry result"}
+
+        if not retry:
+            return
+        delay = _backoff_seconds(budget.used)
+        if budget.left() == 0 or delay > deadline.current().remaining() - SES_MIN_SECONDS:
+            return
+        emf.current().increment("ses_bulk_entry_retries", len(retry))
+        time.sleep(delay)
+        pending = retry
+
+
+def send_batch(messages, get_client, from_email):
+    """
+    Envía una lista de mensajes. Los que comparten plantilla se agrupan y se mandan con
+    SESv2 SendBulkEmail (siempre con la plantilla de SES) al ritmo de la cuota: cada llamada lleva hasta BULK_MAX_ENTRIES
+    destinatarios, y no más de los que caben en un segundo de MaxSendRate.
+    Devuelve {"ok", "sent", "failed", "results": [...]} con un resultado por mensaje, en orden.
+    """
+    results = [None] * len(messages)
+    groups = {}
+    for i, data in enumerate(messages):
+        prepared, error = prepare_templated_email(data, from_email)
+        error = error or check_recipient(prepared)
+        if error:
+            results[i] = {"index": i, **error}
+        else:
+            groups.setdefault(prepared["template"], []).append((i, prepared))
+
+    chunk_size = min(BULK_MAX_ENTRIES, _rate_limiter.max_batch(get_client)) if groups else BULK_MAX_ENTRIES
+    for template_name, items in groups.items():
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                deadline.current().check("ses_bulk_send", SES_MIN_SECONDS)
+            except deadline.DeadlineExceeded as e:
+                # Sin presupuesto: los chunks que faltan se reportan como fallidos (el llamador reintenta)
+                for i, _ in chunk:
+                    results[i] = {"index": i, **e.to_result()}
+                continue
+            _send_bulk_chunk(template_name, chunk, get_client, from_email, results)
+
+    failed = sum(1 for r in results if not r.get("ok"))
+    emf.current().increment("batch_messages", len(results))
+    emf.current().increment("batch_failed", failed)
+    if groups:
+        emf.current().put_property("ses_rate_limiter", _rate_limiter.stats())
+    return {"ok": failed == 0, "sent": len(results) - failed, "failed": failed, "results": results}
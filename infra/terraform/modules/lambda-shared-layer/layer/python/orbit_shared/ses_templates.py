@@ -0,0 +1,107 @@
+"""
+Plantillas SES (modules/ses/templates) cargadas y compiladas localmente.
+
+Son los mismos archivos que Terraform sube a SES (aws_ses_template):
+  <archivo>.subject, <archivo>.html, <archivo>.txt
+La capa los empaqueta en orbit_shared/ses_templates/; en local se leen directo del
+módulo ses (o de SES_TEMPLATE_DIR).
+
+Se cargan una vez por contenedor. De los placeholders {{campo}} salen los campos
+que necesita cada plantilla, así el envío se valida antes de llamar a SES, y el
+render local (mismo escape HTML que Handlebars) permite mandar contenido Simple o
+previsualizar / medir las plantillas sin SES.
+"""
+import html
+import os
+import re
+import threading
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Empaquetadas en la capa; si no existen (repo local) se usan las del módulo ses
+PACKAGED_DIR = os.path.join(_HERE, "ses_templates")
+REPO_DIR = os.path.abspath(os.path.join(_HERE, "..", "..", "..", "..", "ses", "templates"))
+
+# Nombre de la plantilla en SES -> archivo base en templates/ (ver modules/ses/main.tf)
+TEMPLATE_FILES = {
+    "ContactAckTemplate": "contact_ack",
+    "VendorNotifyTemplate": "vendor_notify",
+    "VendorDigestTemplate": "vendor_digest",
+}
+
+_PLACEHOLDER = re.compile(r"{{\s*(\w+)\s*}}")
+# Construcciones de Handlebars que el render local no implementa ({{#if}}, {{/if}}, {{{raw}}}, {{> partial}}, ...)
+_UNSUPPORTED = re.compile(r"{{\s*[#/^>!{&]")
+
+
+def template_dir() -> str:
+    env_dir = os.getenv("SES_TEMPLATE_DIR")
+    if env_dir:
+        return env_dir
+    return PACKAGED_DIR if os.path.isdir(PACKAGED_DIR) else REPO_DIR
+
+
+class CompiledTemplate:
+    """Plantilla partida en trozos estáticos + nombres de campo; escape HTML opcional."""
+
+    def __init__(self, source: str, escape: bool = False, origin: str = ""):
+        bad = _UNSUPPORTED.search(source)
+        if bad:
+            raise ValueError(f"{origin}: unsupported Handlebars construct at offset {bad.start()}")
+        parts = _PLACEHOLDER.split(source)
+        self._static = parts[0::2]
+        self.names = tuple(parts[1::2])
+        self._escape = escape
+        self.fields = frozenset(self.names)
+
+    def render(self, values: dict) -> str:
+        out = [self._static[0]]
+        for name, static in zip(self.names, self._static[1:]):
+            value = values.get(name)
+            value = "" if value is None else str(value)
+            out.append(html.escape(value) if self._escape else value)
+            out.append(static)
+        return "".join(out)
+
+
+class SesTemplate:
+    """Subject + HTML + texto de una plantilla SES."""
+
+    def __init__(self, name: str, subject: str, html_source: str, text_source: str):
+        self.name = name
+        self.subject = CompiledTemplate(subject.strip(), origin=f"{name}.subject")
+        self.html = CompiledTemplate(html_source, escape=True, origin=f"{name}.html")
+        self.text = CompiledTemplate(text_source, origin=f"{name}.txt")
+        # Campos que usa la plantilla (los que SES dejaría vacíos si faltan), en orden de aparición
+        self.field_order = tuple(dict.fromkeys(self.subject.names + self.text.names + self.html.names))
+        self.fields = frozenset(self.field_order)
+
+    def render(self, values: dict) -> dict:
+        return {"subject": self.subject.render(values), "html": self.html.render(values),
+                "text": self.text.render(values)}
+
+
+def load(directory: str | None = None) -> dict[str, SesTemplate]:
+    """Lee y compila todas las plantillas de TEMPLATE_FILES desde `directory`."""
+    directory = directory or template_dir()
+    templates = {}
+    for name, base in TEMPLATE_FILES.items():
+        sources = []
+        for ext in ("subject", "html", "txt"):
+            with open(os.path.join(directory, f"{base}.{ext}"), encoding="utf-8") as f:
+                sources.append(f.read())
+        templates[name] = SesTemplate(name, *sources)
+    return templates
+
+
+# Plantillas del contenedor (al primer uso)
+_templates: dict[str, SesTemplate] | None = None
+_lock = threading.Lock()
+
+
+def get() -> dict[str, SesTemplate]:
+    global _templates
+    if _templates is None:
+        with _lock:
+            if _templates is None:
+                _templates = load()
+    return _templates
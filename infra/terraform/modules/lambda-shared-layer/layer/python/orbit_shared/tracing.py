@@ -0,0 +1,277 @@
+"""
+Trazas de una request a través de contact-form y email-dispatcher.
+
+El handler abre una traza (trace_id + span raíz); cada emf.stage() abre un span hijo
+del span actual, así que las etapas que ya se cronometran (recaptcha_verify,
+dispatcher_invoke, ses_send, ...) quedan como spans sin tocar su código. Al invocar
+otra Lambda, inject() agrega al payload la clave PAYLOAD_KEY con el trace_id y el span
+padre (el span actual, p.ej. dispatcher_invoke); el otro lado la toma con extract() y su
+span raíz cuelga de ese padre.
+
+Al terminar, flush() imprime UNA línea JSON {"orbit_trace": {...}} con el inicio y fin
+(epoch, s) de cada span; infra/scripts/trace_waterfall.py junta las líneas de ambos log
+groups y arma la cascada. Con TRACE_XRAY=true además se manda el segmento a X-Ray por
+UDP al daemon de Lambda (AWS_XRAY_DAEMON_ADDRESS), sin el SDK de X-Ray.
+
+Los ids siguen el formato de X-Ray (trace_id "1-<epoch hex>-<24 hex>", span id de 16
+hex). Si Lambda trae _X_AMZN_TRACE_ID (tracing activo) y no llega contexto en el
+payload, se usa su Root para que la traza coincida con la de la consola de X-Ray.
+"""
+import contextvars
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+# Clave del contexto en los payloads entre Lambdas (y en los trabajos de la cola)
+PAYLOAD_KEY = "_trace"
+TRACE_LOG = os.getenv("TRACE_LOG", "true").lower() in ("1", "true", "yes")
+TRACE_XRAY = os.getenv("TRACE_XRAY", "false").lower() in ("1", "true", "yes")
+# Tope de spans por request (reintentos de SES en un lote grande)
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+
+# Inicio del contenedor: en un cold start el span "init" va de aquí al handler
+_IMPORTED_AT = time.time()
+
+_current: contextvars.ContextVar = contextvars.ContextVar("orbit_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("orbit_trace_span", default=None)
+
+
+def new_trace_id() -> str:
+    return f"1-{int(time.time()):08x}-{os.urandom(12).hex()}"
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _lambda_trace_header() -> dict:
+    """Root / Parent / Sampled de _X_AMZN_TRACE_ID (solo con tracing activo en la función)."""
+    header = os.getenv("_X_AMZN_TRACE_ID", "")
+    parts = dict(p.split("=", 1) for p in header.split(";") if "=" in p)
+    return {"trace_id": parts.get("Root"), "parent_id": parts.get("Parent"),
+            "sampled": parts.get("Sampled", "1") == "1"} if parts.get("Root") else {}
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attrs", "error", "_t0")
+
+    def __init__(self, name: str, parent_id: str | None, start: float | None = None):
+        self.name = name
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.start = time.time() if start is None else start
+        self._t0 = time.perf_counter()
+        self.end = None
+        self.attrs = {}
+        self.error = None
+
+    def finish(self):
+        if self.end is None:
+            # Duración con reloj monotónico; el epoch solo ancla el inicio
+            self.end = self.start + (time.perf_counter() - self._t0)
+
+    def to_dict(self) -> dict:
+        end = self.end if self.end is not None else time.time()
+        doc = {"name": self.name, "id": self.span_id, "parent_id": self.parent_id,
+               "start": round(self.start, 6), "end": round(end, 6), "ms": round((end - self.start) * 1000, 3)}
+        if self.attrs:
+            doc["attrs"] = self.attrs
+        if self.error:
+            doc["error"] = self.error
+        return doc
+
+
+class Trace:
+    """Spans de una invocación (o de un trabajo del worker) de un servicio."""
+
+    def __init__(self, service: str, parent: dict | None = None, cold_start: bool = False, **attrs):
+        parent = parent or {}
+        lambda_header = _lambda_trace_header()
+        if parent.get("trace_id"):
+            self.trace_id, self.sampled = parent["trace_id"], bool(parent.get("sampled", True))
+            parent_id = parent.get("parent_id")
+        elif lambda_header:
+            self.trace_id, self.sampled = lambda_header["trace_id"], lambda_header["sampled"]
+            parent_id = lambda_header["parent_id"]
+        else:
+            self.trace_id, self.sampled, parent_id = new_trace_id(), True, None
+        self.service = service
+        self.root = Span(service, parent_id)
+        self.root.attrs.update(attrs, cold_start=cold_start)
+        self.spans = [self.root]
+        self._ids = {self.root.span_id}
+        self.dropped = 0
+        self._token = None
+        self._span_token = None
+        self._flushed = False
+        if cold_start:
+            init = Span("init", self.root.span_id, start=_IMPORTED_AT)
+            init.end = self.root.start
+            self.spans.append(init)
+            self._ids.add(init.span_id)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Span hijo del span actual (o del raíz); se marca con el error si sale una excepción."""
+        parent = _current_span.get()
+        parent_id = parent.span_id if parent is not None and parent.span_id in self._ids else self.root.span_id
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            yield None
+            return
+        s = Span(name, parent_id)
+        if attrs:
+            s.attrs.update(attrs)
+        self.spans.append(s)
+        self._ids.add(s.span_id)
+        token = _current_span.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.error = e.__class__.__name__
+            raise
+        finally:
+            s.finish()
+            _current_span.reset(token)
+
+    def context(self) -> dict:
+        """Contexto a propagar: trace_id + span actual como padre."""
+        s = _current_span.get()
+        parent = s if s is not None and s.span_id in self._ids else self.root
+        return {"trace_id": self.trace_id, "parent_id": parent.span_id, "sampled": self.sampled}
+
+    def to_document(self) -> dict:
+        doc = {"trace_id": self.trace_id, "service": self.service, "spans": [s.to_dict() for s in self.spans]}
+        if self.dropped:
+            doc["dropped_spans"] = self.dropped
+        return doc
+
+    def flush(self, **attrs) -> None:
+        """Cierra el span raíz, imprime la línea de la traza y exporta a X-Ray (una sola vez)."""
+        if self._flushed:
+            return
+        self._flushed = True
+        self.root.attrs.update(attrs)
+        self.root.finish()
+        for token, var in ((self._span_token, _current_span), (self._token, _current)):
+            if token is not None:
+                try:
+                    var.reset(token)
+                except ValueError:
+                    var.set(None)  # flush desde otro contexto: solo se limpia
+        doc = self.to_document()
+        if TRACE_LOG:
+            print(json.dumps({"orbit_trace": doc}, ensure_ascii=False, default=str))
+        if TRACE_XRAY and self.sampled:
+            export_xray(doc)
+
+
+class _NullTrace(Trace):
+    """Sin traza activa (llamadas directas en pruebas, warm-up): no registra nada."""
+
+    def __init__(self):
+        self.trace_id, self.sampled, self.service = None, False, ""
+        self.root = Span("", None)
+        self.spans = []
+        self._ids = set()
+        self.dropped = 0
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        yield None
+
+    def context(self) -> dict:
+        return {}
+
+    def flush(self, **attrs):
+        pass
+
+
+_NULL = _NullTrace()
+
+
+def start(service: str, parent: dict | None = None, cold_start: bool = False, **attrs) -> Trace:
+    """Abre la traza y la deja como actual (parent: contexto de extract(), o None para una nueva)."""
+    trace = Trace(service, parent, cold_start=cold_start, **attrs)
+    trace._token = _current.set(trace)
+    trace._span_token = _current_span.set(trace.root)
+    return trace
+
+
+def current() -> Trace:
+    return _current.get() or _NULL
+
+
+def span(name: str, **attrs):
+    """Context manager: span hijo del actual en la traza actual (no-op sin traza)."""
+    return current().span(name, **attrs)
+
+
+def inject(payload: dict) -> dict:
+    """Copia del payload con el contexto de la traza actual (sin traza, el mismo payload)."""
+    ctx = current().context()
+    return {**payload, PAYLOAD_KEY: ctx} if ctx else payload
+
+
+def extract(event) -> dict | None:
+    """Contexto propagado en el evento/payload (None si no trae o no es válido)."""
+    if not isinstance(event, dict):
+        return None
+    ctx = event.get(PAYLOAD_KEY)
+    if not isinstance(ctx, dict) or not isinstance(ctx.get("trace_id"), str):
+        return None
+    return {"trace_id": ctx["trace_id"][:64], "parent_id": str(ctx.get("parent_id") or "")[:32] or None,
+            "sampled": ctx.get("sampled", True) is not False}
+
+
+# -----------------------------
+# Exportador X-Ray (opcional)
+# -----------------------------
+_XRAY_HEADER = b'{"format": "json", "version": 1}\n'
+_XRAY_MAX_BYTES = 62 * 1024
+
+
+def to_xray_segment(doc: dict) -> dict:
+    """Segmento X-Ray del servicio con los spans como subsegmentos anidados."""
+    spans = doc["spans"]
+    root = spans[0]
+    children: dict[str, list] = {}
+    for s in spans[1:]:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    def node(s: dict) -> dict:
+        seg = {"id": s["id"], "name": s["name"], "start_time": s["start"], "end_time": s["end"]}
+        if s.get("error"):
+            seg["fault"] = True
+        if s.get("attrs"):
+            seg["metadata"] = {"orbit": s["attrs"]}
+        subs = [node(c) for c in children.get(s["id"], [])]
+        if subs:
+            seg["subsegments"] = subs
+        return seg
+
+    segment = node(root)
+    segment["trace_id"] = doc["trace_id"]
+    segment["origin"] = "AWS::Lambda::Function"
+    if root.get("parent_id"):
+        segment["parent_id"] = root["parent_id"]
+    return segment
+
+
+def export_xray(doc: dict) -> bool:
+    """Manda el segmento al daemon de X-Ray por UDP (no bloquea ni lanza)."""
+    address = os.getenv("AWS_XRAY_DAEMON_ADDRESS", "127.0.0.1:2000").split(" ")[0]
+    host, _, port = address.rpartition(":")
+    try:
+        data = _XRAY_HEADER + json.dumps(to_xray_segment(doc), default=str).encode("utf-8")
+        if len(data) > _XRAY_MAX_BYTES:
+            print("X-Ray segment too large, skipped:", len(data))
+            return False
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(data, (host or "127.0.0.1", int(port or 2000)))
+        return True
+    except Exception as e:
+        print("X-Ray export failed:", repr(e))
+        return False
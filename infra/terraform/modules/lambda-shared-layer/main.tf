@@ -0,0 +1,39 @@
+locals {
+  layer_name        = var.layer_name != "" ? var.layer_name : "${var.project}-${var.env}-shared"
+  ses_templates_dir = var.ses_templates_dir != "" ? var.ses_templates_dir : "${path.module}/../ses/templates"
+
+  # layer/ completo (sin bytecode local) + plantillas SES en python/orbit_shared/ses_templates/
+  layer_files = {
+    for f in fileset("${path.module}/layer", "**") :
+    f => "${path.module}/layer/${f}" if !strcontains(f, "__pycache__")
+  }
+  template_files = {
+    for f in fileset(local.ses_templates_dir, "*.{subject,html,txt}") :
+    "python/orbit_shared/ses_templates/${f}" => "${local.ses_templates_dir}/${f}"
+  }
+}
+
+########################################
+# Código compartido por las Lambdas (Lambda Layer)
+# layer/python/orbit_shared -> /opt/python/orbit_shared en el runtime
+########################################
+data "archive_file" "layer_zip" {
+  type        = "zip"
+  output_path = "${path.module}/layer.zip"
+
+  dynamic "source" {
+    for_each = merge(local.layer_files, local.template_files)
+    content {
+      filename = source.key
+      content  = file(source.value)
+    }
+  }
+}
+
+resource "aws_lambda_layer_version" "this" {
+  layer_name          = local.layer_name
+  description         = "Módulos compartidos de ${var.project} (métricas, envío SES, etc.)"
+  filename            = data.archive_file.layer_zip.output_path
+  source_code_hash    = data.archive_file.layer_zip.output_base64sha256
+  compatible_runtimes = var.compatible_runtimes
+}
@@ -0,0 +1,8 @@
+output "layer_arn" {
+  description = "ARN de la versión publicada del layer"
+  value       = aws_lambda_layer_version.this.arn
+}
+
+output "layer_name" {
+  value = aws_lambda_layer_version.this.layer_name
+}
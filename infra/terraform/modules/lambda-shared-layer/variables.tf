@@ -0,0 +1,27 @@
+variable "project" {
+  type        = string
+  description = "Nombre del proyecto"
+}
+
+variable "env" {
+  type        = string
+  description = "Ambiente (dev, prod, etc.)"
+}
+
+variable "layer_name" {
+  type        = string
+  description = "Nombre explícito del layer (opcional)"
+  default     = ""
+}
+
+variable "compatible_runtimes" {
+  type        = list(string)
+  description = "Runtimes compatibles con el layer"
+  default     = ["python3.12"]
+}
+
+variable "ses_templates_dir" {
+  type        = string
+  description = "Directorio con las plantillas SES (<nombre>.subject|.html|.txt) que se empaquetan en la capa; vacío = modules/ses/templates"
+  default     = ""
+}
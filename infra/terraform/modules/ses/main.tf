@@ -1,22 +1,33 @@
-# main.tf — módulo SES (solo plantilla del cliente, hardcodeada)
+# main.tf — módulo SES (plantillas + identidad de dominio)
+#
+# Las plantillas (templates/<nombre>.subject|.html|.txt) también se empaquetan en la
+# capa compartida: orbit_shared.ses_templates las valida y renderiza localmente.
 
 # Requiere que ya tengas configurado el provider "aws" en el root.
 # No usa variables ni outputs. Crea únicamente la plantilla ContactAckTemplate.
 
 resource "aws_ses_template" "contact_ack" {
   name    = "ContactAckTemplate"  # Debe coincidir con el nombre que usa tu Lambda
-  subject = "Hemos recibido tu mensaje"
+  subject = trimspace(file("${path.module}/templates/contact_ack.subject"))
   html    = file("${path.module}/templates/contact_ack.html")
   text    = file("${path.module}/templates/contact_ack.txt")
 }
 
 resource "aws_ses_template" "vendor_notify" {
   name    = "VendorNotifyTemplate"
-  subject = "Alguien ha mandado el formulario de contacto"
+  subject = trimspace(file("${path.module}/templates/vendor_notify.subject"))
   html    = file("${path.module}/templates/vendor_notify.html")
   text    = file("${path.module}/templates/vendor_notify.txt")
 }
 
+# Resumen de notificaciones al vendor durante picos (email-dispatcher, vendor_digest_enabled)
+resource "aws_ses_template" "vendor_digest" {
+  name    = "VendorDigestTemplate"
+  subject = trimspace(file("${path.module}/templates/vendor_digest.subject"))
+  html    = file("${path.module}/templates/vendor_digest.html")
+  text    = file("${path.module}/templates/vendor_digest.txt")
+}
+
 # resource "aws_sesv2_email_identity" "test_email_identity" {
 #   email_identity = var.from_email
 # }
@@ -68,6 +68,13 @@ variable "zoho_smtp_pass" {
   description = "Clave de SMTP de Zoho"
 }
 
+variable "traffic_capture_salt" {
+  type        = string
+  description = "Sal de los seudónimos de la captura de tráfico (misma en ambas Lambdas)"
+  default     = ""
+  sensitive   = true
+}
+
 variable "cors_allow_origins" {
   type        = list(string)
   description = "Lista de origins permitidos para CORS"